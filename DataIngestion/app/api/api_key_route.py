@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DataIngestion.app.db.session import get_db
+from DataIngestion.app.models.user import User
+from DataIngestion.app.schemas.api_key import (
+    ApiKeyCreate,
+    ApiKeyRotate,
+    ApiKeySchema,
+    ApiKeyIssued,
+)
+from DataIngestion.app.services.api_key_service import (
+    list_api_keys,
+    create_api_key,
+    rotate_api_key,
+    revoke_api_key,
+)
+from DataIngestion.app.authorization.permission import require_roles
+from DataIngestion.app.authorization.role import UserRole
+
+api_key_router = APIRouter(
+    prefix="/api/keys",
+    tags=["API Keys"],
+)
+
+
+def _issued(row, plaintext: str) -> ApiKeyIssued:
+    return ApiKeyIssued(
+        **ApiKeySchema.model_validate(row).model_dump(),
+        api_key=plaintext,
+    )
+
+
+@api_key_router.get("/", response_model=list[ApiKeySchema])
+async def api_key_list(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_roles(UserRole.ADMIN)),
+):
+    return await list_api_keys(db)
+
+
+@api_key_router.post("/", response_model=ApiKeyIssued)
+async def api_key_create(
+    body: ApiKeyCreate,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_roles(UserRole.ADMIN)),
+):
+    row, plaintext = await create_api_key(
+        db,
+        source=body.source,
+        scopes=body.scopes,
+        rate_limit_per_minute=body.rate_limit_per_minute,
+        burst=body.burst,
+        expires_at=body.expires_at,
+    )
+    return _issued(row, plaintext)
+
+
+@api_key_router.post("/{key_id}/rotate", response_model=ApiKeyIssued)
+async def api_key_rotate(
+    key_id: str,
+    body: ApiKeyRotate,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_roles(UserRole.ADMIN)),
+):
+    row, plaintext = await rotate_api_key(db, key_id, body.grace_seconds, body.expires_at)
+    return _issued(row, plaintext)
+
+
+@api_key_router.delete("/{key_id}")
+async def api_key_revoke(
+    key_id: str,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_roles(UserRole.ADMIN)),
+):
+    await revoke_api_key(db, key_id)
+    return {"message": "API key revoked"}
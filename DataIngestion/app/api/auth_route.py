@@ -40,7 +40,7 @@ async def login_for_access_token(
 
     return Token(
         access_token=access_token,
-        refresh_token=refresh_token.token,
+        refresh_token=refresh_token,
         token_type="bearer",
     )
 
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, status, Path
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from prometheus_client import Counter
 
 from DataIngestion.app.authorization.permission import require_roles
 from DataIngestion.app.authorization.role import UserRole
@@ -17,9 +18,16 @@ from DataIngestion.app.exceptions.error_event_exception import (
     ErrorEventIngestionException,
 )
 from DataIngestion.app.models.user import User
+from DataIngestion.app.services.api_key_service import require_api_key, ResolvedApiKey
 
 router = APIRouter(prefix="/api/logs")
 
+INGESTED_EVENTS = Counter(
+    "ingested_error_events_total",
+    "Error events accepted by the ingestion API",
+    ["source"],
+)
+
 
 def convert_datetimes(o):
     if isinstance(o, dict):
@@ -35,9 +43,12 @@ def convert_datetimes(o):
 async def receive_error(
     payload: ErrorPayload,
     db: AsyncSession = Depends(get_db),
+    api_key: ResolvedApiKey = Depends(require_api_key("ingest")),
 ):
     raw = payload.model_dump(by_alias=True, exclude_none=False)
     normalized = convert_datetimes(normalize_payload(raw))
+    # The authenticated key, not the payload, identifies who sent the event.
+    normalized["ingestSource"] = api_key.source
 
     try:
         saved = await publish_and_store(
@@ -45,6 +56,7 @@ async def receive_error(
             normalized=normalized,
             kafka_topic=settings.KAFKA_TOPIC,
         )
+        INGESTED_EVENTS.labels(source=api_key.source).inc()
         return {"status": "ok", "id": saved.id}
 
     except Exception:
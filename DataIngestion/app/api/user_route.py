@@ -10,6 +10,7 @@ from DataIngestion.app.services.user_service import (
     get_user,
     delete_user,
     update_user,
+    set_user_active,
 )
 from DataIngestion.app.authorization.permission import require_roles
 from DataIngestion.app.authorization.role import UserRole
@@ -83,3 +84,21 @@ async def user_put(
         return await update_user(db, user_id, user)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+
+
+@user_router.post("/{user_id}/deactivate", response_model=UserSchema)
+async def user_deactivate(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_roles(UserRole.ADMIN)),
+):
+    return await set_user_active(db, user_id, False)
+
+
+@user_router.post("/{user_id}/activate", response_model=UserSchema)
+async def user_activate(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(require_roles(UserRole.ADMIN)),
+):
+    return await set_user_active(db, user_id, True)
@@ -1,13 +1,15 @@
 from fastapi import Depends, HTTPException, status
 
 from DataIngestion.app.services.auth_service import get_current_user
+from DataIngestion.app.services.principal_cache import Principal
 from DataIngestion.app.authorization.role import UserRole
-from DataIngestion.app.models.user import User
 
 
 def require_roles(*allowed_roles: UserRole):
-    def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role not in [role.value for role in allowed_roles]:
+    allowed = frozenset(role.value for role in allowed_roles)
+
+    def role_checker(current_user: Principal = Depends(get_current_user)):
+        if current_user.role not in allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You do not have permission to perform this action",
@@ -43,9 +43,20 @@ class Settings(BaseSettings):
     LOG_FORMAT: str = "json"
 
     # ---------- SECURITY ----------
+    # Legacy single shared key; accepted as an "ingest" key for API_KEY_LEGACY_SOURCE.
     API_KEY: Optional[str] = None
+    API_KEY_LEGACY_SOURCE: str = "default"
+    API_KEY_REFRESH_INTERVAL_SECONDS: int = 30
     CORS_ORIGINS: List[str] = ["*"]
 
+    # ---------- AUTH CACHE ----------
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PRINCIPAL_INVALIDATION_CHANNEL: str = "principal_invalidation"
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: int = 3600
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = 5_000
+    REFRESH_TOKEN_PURGE_MAX_BATCHES: int = 200
+
     # ---------- VALIDATORS (v2 style) ----------
     @field_validator("DATABASE_URL")
     @classmethod
@@ -5,10 +5,25 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy.pool import AsyncAdaptedQueuePool
 from DataIngestion.app.core.config import settings
 from loguru import logger
+from prometheus_client import Gauge
 
 _engine: AsyncEngine | None = None
 
 
+def _pool_stat(stat: str):
+    def read() -> float:
+        return getattr(_engine.sync_engine.pool, stat)() if _engine is not None else 0
+    return read
+
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool")
+DB_POOL_CHECKED_OUT.set_function(_pool_stat("checkedout"))
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size (negative while the pool is filling)")
+DB_POOL_OVERFLOW.set_function(_pool_stat("overflow"))
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool_size")
+DB_POOL_SIZE.set_function(_pool_stat("size"))
+
+
 def get_engine() -> AsyncEngine:
     """
     Return the singleton engine. Raises error if not initialized.
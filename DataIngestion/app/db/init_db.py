@@ -8,6 +8,8 @@ from DataIngestion.app.models.base import Base
 from DataIngestion.app.models.user import User
 from DataIngestion.app.models.refresh_token import RefreshToken
 from DataIngestion.app.models.error_event import ErrorEvent
+from DataIngestion.app.models.api_key import ApiKey
+from DataIngestion.app.models.resolved_fix import ResolvedFix
 from DataIngestion.app.core.config import settings
 
 
@@ -37,6 +39,47 @@ async def create_tables():
     logger.info(f"Tables created successfully in schema {settings.DB_SCHEMA}")
 
 
+async def migrate_refresh_tokens():
+    """
+    Convert a legacy plaintext `token` column into `token_hash` in place.
+    Idempotent: does nothing once the legacy column is gone.
+    """
+    engine = get_engine()
+    table = f"{settings.DB_SCHEMA}.refresh_tokens"
+
+    async with engine.begin() as conn:
+        legacy = await conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = :schema AND table_name = 'refresh_tokens' AND column_name = 'token'"
+            ),
+            {"schema": settings.DB_SCHEMA},
+        )
+        if legacy.scalar() is None:
+            return
+
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS token_hash VARCHAR(64)"))
+        await conn.execute(text(
+            f"UPDATE {table} SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex') "
+            f"WHERE token_hash IS NULL"
+        ))
+        await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN token_hash SET NOT NULL"))
+        await conn.execute(text(f"ALTER TABLE {table} DROP COLUMN token"))
+
+        # create_all() skips indexes on tables that already exist.
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_refresh_tokens_token_hash ON {table} USING hash (token_hash)"
+        ))
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_live ON {table} (user_id) WHERE revoked = false"
+        ))
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires_at ON {table} (expires_at)"
+        ))
+
+    logger.info("Migrated refresh_tokens.token to hashed storage")
+
+
 async def validate_connection():
     """
     Validate DB connectivity.
@@ -57,5 +100,6 @@ async def init_db():
     """
     logger.info("Starting DB initialization...")
     await create_schema()
+    await migrate_refresh_tokens()
     await create_tables()
     logger.info("DB initialization finished")
@@ -0,0 +1,38 @@
+from fastapi import status
+from DataIngestion.app.exceptions.base_exception import AppException
+
+
+class ApiKeyException(AppException):
+    pass
+
+
+class InvalidApiKeyException(ApiKeyException):
+    def __init__(self, detail: str = "Invalid or missing API key"):
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=detail,
+        )
+
+
+class InsufficientScopeException(ApiKeyException):
+    def __init__(self, detail: str = "API key does not grant the required scope"):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail,
+        )
+
+
+class RateLimitExceededException(ApiKeyException):
+    def __init__(self, detail: str = "Rate limit exceeded for this API key"):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+        )
+
+
+class ApiKeyNotFoundException(ApiKeyException):
+    def __init__(self, detail: str = "API key not found"):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=detail,
+        )
@@ -4,6 +4,17 @@ import json
 from aiokafka import AIOKafkaProducer
 from DataIngestion.app.core.config import settings
 from loguru import logger
+from prometheus_client import Counter, Histogram
+
+KAFKA_PUBLISH_SECONDS = Histogram(
+    "kafka_publish_seconds",
+    "Time to publish one event and get the broker ack",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+KAFKA_PUBLISH_FAILURES = Counter(
+    "kafka_publish_failures_total",
+    "Events that could not be published to Kafka",
+)
 
 producer: AIOKafkaProducer | None = None
 
@@ -26,8 +37,10 @@ async def publish_event(topic: str, key: str | None, value: dict):
     p = await get_kafka_producer()
     value_bytes = json.dumps(value, default=str).encode("utf-8")
     try:
-        await p.send_and_wait(topic, value=value_bytes, key=(key.encode("utf-8") if key else None))
+        with KAFKA_PUBLISH_SECONDS.time():
+            await p.send_and_wait(topic, value=value_bytes, key=(key.encode("utf-8") if key else None))
         logger.debug("Published event to kafka topic {}", topic)
     except Exception as e:
+        KAFKA_PUBLISH_FAILURES.inc()
         logger.exception("Failed to publish event to Kafka: {}", e)
         raise
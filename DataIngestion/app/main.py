@@ -8,8 +8,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 import uvicorn
 from asyncio import create_task
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
 from DataIngestion.app.core.config import settings
 from DataIngestion.app.api.routes import router as api_router
@@ -19,9 +20,17 @@ from DataIngestion.app.db.init_db import validate_connection, init_db
 from DataIngestion.app.exceptions.base_exception import AppException
 from DataIngestion.app.kafka.producer import get_kafka_producer, close_kafka_producer
 from DataIngestion.app.kafka.consumer import start_consumer_forever
+from DataIngestion.app.services.refresh_token_services import run_refresh_token_purger
+from DataIngestion.app.services.api_key_service import run_api_key_refresher
+from DataIngestion.app.services.principal_cache import (
+    principal_cache,
+    start_invalidation_listener,
+    stop_invalidation_listener,
+)
 
 from DataIngestion.app.api.auth_route import auth_router
 from DataIngestion.app.api.user_route import user_router
+from DataIngestion.app.api.api_key_route import api_key_router
 
 print("BOOTSTRAP =", settings.KAFKA_BOOTSTRAP_SERVERS)
 
@@ -41,6 +50,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Database error: {e}")
 
+    # Cross-process principal cache invalidation
+    try:
+        await start_invalidation_listener()
+    except Exception as e:
+        logger.warning(f"⚠ Principal invalidation listener unavailable: {e}")
+
+    app.state.refresh_token_purger = create_task(run_refresh_token_purger())
+    app.state.api_key_refresher = create_task(run_api_key_refresher())
+
     # Kafka
     try:
         await get_kafka_producer()
@@ -61,6 +79,9 @@ async def lifespan(app: FastAPI):
 
     logger.info("🛑 Shutting down...")
 
+    app.state.refresh_token_purger.cancel()
+    app.state.api_key_refresher.cancel()
+    await stop_invalidation_listener()
     await close_kafka_producer()
     await dispose_engine()
 
@@ -83,6 +104,7 @@ app.add_middleware(
 app.include_router(api_router)
 app.include_router(auth_router)
 app.include_router(user_router)
+app.include_router(api_key_router)
 
 
 @app.get("/health")
@@ -90,6 +112,16 @@ async def health():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/metrics/auth-cache")
+async def auth_cache_metrics():
+    return principal_cache.stats()
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start = datetime.utcnow()
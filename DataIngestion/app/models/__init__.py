@@ -2,6 +2,8 @@ from DataIngestion.app.models.user import User
 from DataIngestion.app.models.refresh_token import RefreshToken
 from DataIngestion.app.models.token import Token
 from DataIngestion.app.models.error_event import ErrorEvent
+from DataIngestion.app.models.api_key import ApiKey
+from DataIngestion.app.models.resolved_fix import ResolvedFix
 from DataIngestion.app.models.base import Base
 
-__all__ = ["User", "RefreshToken", "Token", "ErrorEvent", "Base"]
+__all__ = ["User", "RefreshToken", "Token", "ErrorEvent", "ApiKey", "ResolvedFix", "Base"]
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, String, Boolean, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from DataIngestion.app.models.base import Base
+
+class ApiKey(Base):
+    __tablename__ = "api_keys"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Public, non-secret half of the presented key; used to find the row.
+    key_id: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
+    # SHA-256 hex digest of the secret half.
+    key_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    source: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
+    scopes: Mapped[list[str]] = mapped_column(ARRAY(String(64)), nullable=False, default=list)
+
+    rate_limit_per_minute: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    burst: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
@@ -1,13 +1,22 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import DateTime, String, Boolean, ForeignKey
+from sqlalchemy import DateTime, String, Boolean, ForeignKey, Index, text
 from DataIngestion.app.models.base import Base
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # Lookups are equality-only on a random digest, so a hash index is O(1).
+        Index("ix_refresh_tokens_token_hash", "token_hash", postgresql_using="hash"),
+        # Serves the login-time revoke of a user's live tokens.
+        Index("ix_refresh_tokens_user_live", "user_id", postgresql_where=text("revoked = false")),
+        # Serves the background purge.
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    token: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    # SHA-256 hex digest of the opaque token; the token itself is never stored.
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False)
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -27,4 +36,4 @@ class RefreshToken(Base):
         nullable=False,
     )
 
-    user = relationship("User", back_populates="refresh_tokens", lazy="selectin")
+    user = relationship("User", back_populates="refresh_tokens", lazy="raise")
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, String, Integer, Float, Text
+from DataIngestion.app.models.base import Base
+
+class ResolvedFix(Base):
+    """A judged and approved fix, reusable for later errors with the same signature."""
+    __tablename__ = "resolved_fixes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # SHA-256 of the normalized error signature (message, function, top frame).
+    fingerprint: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    normalized_text: Mapped[str] = mapped_column(Text, nullable=False)
+
+    source_event_id: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    fix_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # Artifact-store hash of the fix proposals the fix was chosen from.
+    fix_artifact: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    jira_key: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    jira_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    pr_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
+    quality_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+    hallucination_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+    confidence: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    reuse_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_reused_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
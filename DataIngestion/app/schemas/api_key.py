@@ -0,0 +1,34 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ApiKeyCreate(BaseModel):
+    source: str
+    scopes: list[str] = ["ingest"]
+    rate_limit_per_minute: int | None = None
+    burst: int | None = None
+    expires_at: datetime | None = None
+
+
+class ApiKeyRotate(BaseModel):
+    grace_seconds: int = 3600
+    expires_at: datetime | None = None  # Defaults to the rotated key's expiry
+
+
+class ApiKeySchema(BaseModel):
+    key_id: str
+    source: str
+    scopes: list[str]
+    rate_limit_per_minute: int | None
+    burst: int | None
+    revoked: bool
+    expires_at: datetime | None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ApiKeyIssued(ApiKeySchema):
+    # Only returned once, at creation / rotation time.
+    api_key: str
@@ -0,0 +1,316 @@
+"""
+API-key authentication for machine-to-machine ingestion.
+
+Presented keys look like `tk_<key_id>.<secret>`. The key id selects a row
+from an in-memory table that a background task refreshes from Postgres, and
+the secret's SHA-256 is compared in constant time, so verifying a request
+never touches the database.
+"""
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Depends
+from fastapi.security import APIKeyHeader
+from loguru import logger
+from prometheus_client import Counter, Gauge
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DataIngestion.app.core.config import settings
+from DataIngestion.app.db.session import get_session_factory
+from DataIngestion.app.models.api_key import ApiKey
+from DataIngestion.app.exceptions.api_key_exception import (
+    InvalidApiKeyException,
+    InsufficientScopeException,
+    RateLimitExceededException,
+    ApiKeyNotFoundException,
+)
+
+KEY_PREFIX = "tk_"
+LEGACY_KEY_ID = "legacy"
+
+API_KEY_AUTH = Counter(
+    "api_key_auth_total",
+    "API-key authentication attempts",
+    ["source", "outcome"],
+)
+API_KEY_TABLE_SIZE = Gauge(
+    "api_key_table_size",
+    "API keys currently loaded in memory",
+)
+
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+def hash_api_secret(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+# Compared against when the key id is unknown, so misses cost the same as hits.
+_DUMMY_HASH = hash_api_secret(secrets.token_urlsafe(32))
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedApiKey:
+    key_id: str
+    source: str
+    scopes: frozenset[str]
+    key_hash: str
+    rate_limit_per_minute: int | None = None
+    burst: int | None = None
+    expires_at: datetime | None = None
+
+    @classmethod
+    def from_row(cls, row: ApiKey) -> "ResolvedApiKey":
+        return cls(
+            key_id=row.key_id,
+            source=row.source,
+            scopes=frozenset(row.scopes or ()),
+            key_hash=row.key_hash,
+            rate_limit_per_minute=row.rate_limit_per_minute,
+            burst=row.burst,
+            expires_at=row.expires_at,
+        )
+
+    @property
+    def budget_id(self) -> tuple:
+        """
+        Keys sharing a rate budget: same source and limits. A rotated key and
+        its replacement share one during the grace period instead of doubling
+        the source's rate, and changed limits get a fresh bucket.
+        """
+        return self.source, self.rate_limit_per_minute, self.burst
+
+
+class TokenBucket:
+    """Request budget of one source and limits; refills continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: int, burst: int | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ApiKeyTable:
+    """
+    Immutable snapshot of active keys, swapped wholesale on refresh.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, ResolvedApiKey] = {}
+        self._buckets: dict[tuple, TokenBucket] = {}
+
+    def replace(self, keys: list[ResolvedApiKey]) -> None:
+        table = {k.key_id: k for k in keys}
+
+        if settings.API_KEY:
+            table[LEGACY_KEY_ID] = ResolvedApiKey(
+                key_id=LEGACY_KEY_ID,
+                source=settings.API_KEY_LEGACY_SOURCE,
+                scopes=frozenset({"ingest"}),
+                key_hash=hash_api_secret(settings.API_KEY),
+            )
+
+        self._keys = table
+        # Drop buckets no key uses any more (gone, or limits changed); keep the others' state.
+        in_use = {k.budget_id for k in table.values()}
+        self._buckets = {k: b for k, b in self._buckets.items() if k in in_use}
+        API_KEY_TABLE_SIZE.set(len(table))
+
+    def verify(self, presented: str) -> ResolvedApiKey | None:
+        if presented.startswith(KEY_PREFIX) and "." in presented:
+            key_id, _, secret = presented[len(KEY_PREFIX):].partition(".")
+        else:
+            key_id, secret = LEGACY_KEY_ID, presented
+
+        entry = self._keys.get(key_id)
+        expected = entry.key_hash if entry else _DUMMY_HASH
+        matches = hmac.compare_digest(hash_api_secret(secret), expected)
+
+        if not entry or not matches:
+            return None
+        if entry.expires_at and entry.expires_at <= datetime.now(timezone.utc):
+            return None
+        return entry
+
+    def allow(self, key: ResolvedApiKey) -> bool:
+        if not key.rate_limit_per_minute:
+            return True
+
+        bucket = self._buckets.get(key.budget_id)
+        if bucket is None:
+            bucket = self._buckets[key.budget_id] = TokenBucket(key.rate_limit_per_minute, key.burst)
+        return bucket.take()
+
+
+api_key_table = ApiKeyTable()
+api_key_table.replace([])
+
+
+# -------------------------
+# DEPENDENCY
+# -------------------------
+def require_api_key(*required_scopes: str):
+    required = frozenset(required_scopes)
+
+    async def api_key_checker(
+        presented: str | None = Depends(api_key_header),
+    ) -> ResolvedApiKey:
+        if not presented:
+            API_KEY_AUTH.labels(source="unknown", outcome="missing").inc()
+            raise InvalidApiKeyException()
+
+        key = api_key_table.verify(presented)
+        if key is None:
+            API_KEY_AUTH.labels(source="unknown", outcome="invalid").inc()
+            raise InvalidApiKeyException()
+
+        if not required <= key.scopes:
+            API_KEY_AUTH.labels(source=key.source, outcome="forbidden").inc()
+            raise InsufficientScopeException()
+
+        if not api_key_table.allow(key):
+            API_KEY_AUTH.labels(source=key.source, outcome="rate_limited").inc()
+            raise RateLimitExceededException()
+
+        API_KEY_AUTH.labels(source=key.source, outcome="ok").inc()
+        return key
+
+    return api_key_checker
+
+
+# -------------------------
+# BACKGROUND REFRESH
+# -------------------------
+async def load_api_keys(db: AsyncSession) -> list[ResolvedApiKey]:
+    result = await db.execute(
+        select(ApiKey).where(
+            ApiKey.revoked == False,
+            or_(ApiKey.expires_at.is_(None), ApiKey.expires_at > datetime.now(timezone.utc)),
+        )
+    )
+    return [ResolvedApiKey.from_row(row) for row in result.scalars().all()]
+
+
+async def refresh_api_key_table() -> None:
+    async with get_session_factory()() as session:
+        keys = await load_api_keys(session)
+    api_key_table.replace(keys)
+
+
+async def run_api_key_refresher() -> None:
+    while True:
+        try:
+            await refresh_api_key_table()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Keep serving the last good snapshot.
+            logger.warning(f"API key table refresh failed: {e}")
+
+        await asyncio.sleep(settings.API_KEY_REFRESH_INTERVAL_SECONDS)
+
+
+# -------------------------
+# MANAGEMENT
+# -------------------------
+def _generate_key() -> tuple[str, str, str]:
+    key_id = secrets.token_hex(8)
+    secret = secrets.token_urlsafe(32)
+    return key_id, secret, f"{KEY_PREFIX}{key_id}.{secret}"
+
+
+async def list_api_keys(db: AsyncSession) -> list[ApiKey]:
+    result = await db.execute(select(ApiKey).order_by(ApiKey.created_at.desc()))
+    return list(result.scalars().all())
+
+
+async def get_api_key(db: AsyncSession, key_id: str) -> ApiKey:
+    result = await db.execute(select(ApiKey).where(ApiKey.key_id == key_id))
+    row = result.scalar_one_or_none()
+    if not row:
+        raise ApiKeyNotFoundException()
+    return row
+
+
+async def create_api_key(
+    db: AsyncSession,
+    source: str,
+    scopes: list[str],
+    rate_limit_per_minute: int | None = None,
+    burst: int | None = None,
+    expires_at: datetime | None = None,
+) -> tuple[ApiKey, str]:
+    """
+    Returns the stored row and the plaintext key, which is never persisted.
+    """
+    key_id, secret, plaintext = _generate_key()
+
+    row = ApiKey(
+        key_id=key_id,
+        key_hash=hash_api_secret(secret),
+        source=source,
+        scopes=list(scopes),
+        rate_limit_per_minute=rate_limit_per_minute,
+        burst=burst,
+        expires_at=expires_at,
+        revoked=False,
+    )
+    db.add(row)
+    await db.commit()
+    await db.refresh(row)
+
+    await refresh_api_key_table()
+    return row, plaintext
+
+
+async def rotate_api_key(
+    db: AsyncSession,
+    key_id: str,
+    grace_seconds: int,
+    expires_at: datetime | None = None,
+) -> tuple[ApiKey, str]:
+    """
+    Issue a replacement key with the same source, scopes, rate attributes and
+    expiry (unless `expires_at` is given). The old key keeps working for
+    `grace_seconds` so callers can roll over.
+    """
+    old = await get_api_key(db, key_id)
+    if expires_at is None:
+        expires_at = old.expires_at
+
+    grace_end = datetime.now(timezone.utc) + timedelta(seconds=grace_seconds)
+    if old.expires_at is None or old.expires_at > grace_end:
+        old.expires_at = grace_end
+
+    return await create_api_key(
+        db,
+        source=old.source,
+        scopes=list(old.scopes),
+        rate_limit_per_minute=old.rate_limit_per_minute,
+        burst=old.burst,
+        expires_at=expires_at,
+    )
+
+
+async def revoke_api_key(db: AsyncSession, key_id: str) -> None:
+    row = await get_api_key(db, key_id)
+    row.revoked = True
+    await db.commit()
+
+    await refresh_api_key_table()
@@ -8,8 +8,9 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from DataIngestion.app.core.config import settings
-from DataIngestion.app.db.session import get_db
+from DataIngestion.app.db.session import get_session_factory
 from DataIngestion.app.models.user import User
+from DataIngestion.app.services.principal_cache import Principal, principal_cache
 from DataIngestion.app.services.user_service import get_user_by_email
 from DataIngestion.app.utils.auth_utils import verify_password
 from DataIngestion.app.exceptions.auth_exception import (
@@ -52,11 +53,12 @@ def create_access_token(
     data: dict,
     expires_delta: timedelta | None = None,
 ) -> str:
-    expire = datetime.now(timezone.utc) + (
+    now = datetime.now(timezone.utc)
+    expire = now + (
         expires_delta or timedelta(minutes=15)
     )
 
-    to_encode = data | {"exp": expire}
+    to_encode = data | {"iat": now, "exp": expire}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -65,8 +67,11 @@ def create_access_token(
 # -------------------------
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
+    """
+    Resolve the caller from the JWT.
+    A principal cache hit costs no DB round trip; a miss opens its own session.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
@@ -78,11 +83,19 @@ async def get_current_user(
     except InvalidTokenError:
         raise InvalidTokenException()
 
-    user = await get_user_by_email(db, email)
-    if not user:
-        raise UserFromTokenNotFoundException()
+    issued_at = payload.get("iat")
+    principal = principal_cache.get(email, issued_at)
 
-    if not user.is_active:
+    if principal is None:
+        async with get_session_factory()() as db:
+            user = await get_user_by_email(db, email)
+            if not user:
+                raise UserFromTokenNotFoundException()
+            principal = Principal.from_user(user)
+
+        principal_cache.put(email, issued_at, principal)
+
+    if not principal.is_active:
         raise InactiveUserException()
 
-    return user
+    return principal
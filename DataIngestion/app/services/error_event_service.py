@@ -36,6 +36,24 @@ async def mark_error_resolved(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update error status",
         )
+
+async def update_error_status(
+    db: AsyncSession,
+    reference_id: str,
+    new_status: str,
+) -> bool:
+    """
+    Set the status of an error event. Returns False when no row matched.
+    """
+    result = await db.execute(
+        update(ErrorEvent)
+        .where(ErrorEvent.reference_id == reference_id)
+        .values(status=new_status)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
 async def get_all_errors(db: AsyncSession) -> list[ErrorEvent]:
     try:
         result = await db.execute(
@@ -0,0 +1,237 @@
+"""
+In-process principal cache for JWT-authenticated requests.
+
+Entries are keyed by (subject, token issue time) so a cache hit resolves the
+caller without touching Postgres. Writes that change a user (update, delete,
+deactivation) invalidate locally and broadcast a Postgres NOTIFY so every
+other API process drops its copy too.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+
+import asyncpg
+from loguru import logger
+from prometheus_client import Counter, Gauge
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DataIngestion.app.core.config import settings
+
+
+PRINCIPAL_CACHE_HITS = Counter(
+    "principal_cache_hits_total",
+    "Authenticated requests resolved from the principal cache",
+)
+PRINCIPAL_CACHE_MISSES = Counter(
+    "principal_cache_misses_total",
+    "Authenticated requests that had to load the user from the database",
+)
+PRINCIPAL_CACHE_INVALIDATIONS = Counter(
+    "principal_cache_invalidations_total",
+    "Principal cache invalidations",
+    ["origin"],
+)
+PRINCIPAL_CACHE_SIZE = Gauge(
+    "principal_cache_size",
+    "Number of principals currently cached",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Immutable snapshot of the fields authorization needs from a User."""
+    id: int
+    username: str
+    email: str
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            is_active=bool(user.is_active),
+        )
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of principals keyed by (subject, iat).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, int | None], tuple[float, Principal]] = OrderedDict()
+        self._by_subject: dict[str, set[tuple[str, int | None]]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str, issued_at: int | None) -> Principal | None:
+        key = (subject, issued_at)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                PRINCIPAL_CACHE_MISSES.inc()
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            PRINCIPAL_CACHE_HITS.inc()
+            return entry[1]
+
+    def put(self, subject: str, issued_at: int | None, principal: Principal) -> None:
+        key = (subject, issued_at)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            self._by_subject.setdefault(subject, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+            PRINCIPAL_CACHE_SIZE.set(len(self._entries))
+
+    def invalidate(self, subject: str, origin: str = "local") -> None:
+        with self._lock:
+            for key in list(self._by_subject.get(subject, ())):
+                self._drop(key)
+            PRINCIPAL_CACHE_SIZE.set(len(self._entries))
+        PRINCIPAL_CACHE_INVALIDATIONS.labels(origin=origin).inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_subject.clear()
+            PRINCIPAL_CACHE_SIZE.set(0)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+    def _drop(self, key: tuple[str, int | None]) -> None:
+        self._entries.pop(key, None)
+        keys = self._by_subject.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[key[0]]
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+# -------------------------
+# CROSS-PROCESS INVALIDATION
+# -------------------------
+async def notify_principal_invalidation(db: AsyncSession, *subjects: str) -> None:
+    """
+    Queue a NOTIFY inside the caller's transaction.
+    Postgres only delivers it on commit, so a rolled-back write never invalidates.
+    """
+    for subject in subjects:
+        if not subject:
+            continue
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {
+                "channel": settings.PRINCIPAL_INVALIDATION_CHANNEL,
+                "payload": json.dumps({"sub": subject}),
+            },
+        )
+
+
+def _asyncpg_dsn(url: str) -> str:
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+_listener_conn: asyncpg.Connection | None = None
+_listener_task: asyncio.Task | None = None
+
+
+def _on_notification(_conn, _pid, _channel, payload: str) -> None:
+    try:
+        subject = json.loads(payload).get("sub")
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring malformed principal invalidation payload: {payload!r}")
+        return
+
+    if subject:
+        principal_cache.invalidate(subject, origin="notify")
+
+
+async def _listen_forever() -> None:
+    global _listener_conn
+
+    backoff = 1
+    while True:
+        try:
+            _listener_conn = await asyncpg.connect(_asyncpg_dsn(settings.DATABASE_URL))
+            await _listener_conn.add_listener(
+                settings.PRINCIPAL_INVALIDATION_CHANNEL,
+                _on_notification,
+            )
+            logger.info(f"Listening for principal invalidations on '{settings.PRINCIPAL_INVALIDATION_CHANNEL}'")
+            backoff = 1
+
+            # Notifications missed while disconnected are lost, so start clean.
+            principal_cache.clear()
+
+            while not _listener_conn.is_closed():
+                await asyncio.sleep(5)
+
+            logger.warning("Principal invalidation listener connection closed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Principal invalidation listener error: {e}")
+        finally:
+            if _listener_conn is not None and not _listener_conn.is_closed():
+                await _listener_conn.close()
+            _listener_conn = None
+
+        principal_cache.clear()
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+async def start_invalidation_listener() -> None:
+    global _listener_task
+
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_forever())
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener_task
+
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
 import secrets
 
+from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, insert, or_, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
 
+from DataIngestion.app.core.config import settings
+from DataIngestion.app.db.session import get_session_factory
 from DataIngestion.app.models.refresh_token import RefreshToken
 from DataIngestion.app.models.user import User
 from DataIngestion.app.exceptions.refresh_token_exception import (
@@ -13,50 +19,73 @@ from DataIngestion.app.exceptions.refresh_token_exception import (
     ExpiredRefreshTokenException,
     RefreshTokenCreationException,
 )
-from sqlalchemy import update
 
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 
+def hash_refresh_token(token: str) -> str:
+    """
+    Tokens are 512 bits of randomness, so an unsalted SHA-256 is enough to
+    make a leaked table useless while keeping lookups deterministic.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 async def create_refresh_token(
     db: AsyncSession,
     user: User,
-) -> RefreshToken:
-    try:
-        #  Revoke any existing tokens first
-        await revoke_existing_refresh_tokens(db, user.id)
-
-        # Generate new token
-        token = secrets.token_urlsafe(64)
-        expires_at = (
-            datetime.now(timezone.utc)
-            + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+) -> str:
+    """
+    Revoke the user's live tokens and insert a new one in a single statement.
+    Returns the plaintext token; only its hash is persisted.
+    """
+    token = secrets.token_urlsafe(64)
+    expires_at = (
+        datetime.now(timezone.utc)
+        + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+    revoked = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user.id,
+            RefreshToken.revoked == False,
         )
+        .values(revoked=True)
+        .returning(RefreshToken.id)
+        .cte("revoked")
+    )
 
-        refresh_token = RefreshToken(
-            token=token,
+    stmt = (
+        insert(RefreshToken)
+        .values(
+            token_hash=hash_refresh_token(token),
             user_id=user.id,
             expires_at=expires_at,
             revoked=False,
+            created_at=datetime.now(timezone.utc),
         )
+        .add_cte(revoked)
+    )
 
-        db.add(refresh_token)
+    try:
+        await db.execute(stmt)
         await db.commit()
-        await db.refresh(refresh_token)
-
-        return refresh_token
-
     except SQLAlchemyError:
         await db.rollback()
         raise RefreshTokenCreationException()
 
+    return token
+
 
 async def validate_refresh_token(
     db: AsyncSession,
     token: str,
 ) -> RefreshToken:
     result = await db.execute(
-        select(RefreshToken).where(RefreshToken.token == token)
+        select(RefreshToken)
+        .options(joinedload(RefreshToken.user))
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
     )
     refresh_token = result.scalar_one_or_none()
 
@@ -81,18 +110,68 @@ async def revoke_refresh_token(
     refresh_token.revoked = True
     await db.commit()
 
-async def revoke_existing_refresh_tokens(
+
+# -------------------------
+# PURGE
+# -------------------------
+async def purge_refresh_tokens(
     db: AsyncSession,
-    user_id: int,
-):
+    batch_size: int,
+    max_batches: int | None = None,
+) -> int:
     """
-    Revoke all existing refresh tokens for a user.
+    Delete revoked and expired tokens in bounded batches.
+    Each batch is its own short transaction so logins are never blocked for long.
     """
-    await db.execute(
-        update(RefreshToken)
-        .where(
-            RefreshToken.user_id == user_id,
-            RefreshToken.revoked == False,
+    total = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        doomed = (
+            select(RefreshToken.id)
+            .where(
+                or_(
+                    RefreshToken.revoked == True,
+                    RefreshToken.expires_at < datetime.now(timezone.utc),
+                )
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
         )
-        .values(revoked=True)
-    )
\ No newline at end of file
+
+        result = await db.execute(delete(RefreshToken).where(RefreshToken.id.in_(doomed)))
+        await db.commit()
+
+        total += result.rowcount
+        batches += 1
+
+        if result.rowcount < batch_size:
+            break
+
+        # Yield to request handlers between batches.
+        await asyncio.sleep(0)
+
+    return total
+
+
+async def run_refresh_token_purger() -> None:
+    """
+    Background loop purging dead refresh tokens every REFRESH_TOKEN_PURGE_INTERVAL_SECONDS.
+    """
+    while True:
+        try:
+            async with get_session_factory()() as session:
+                purged = await purge_refresh_tokens(
+                    session,
+                    batch_size=settings.REFRESH_TOKEN_PURGE_BATCH_SIZE,
+                    max_batches=settings.REFRESH_TOKEN_PURGE_MAX_BATCHES,
+                )
+            if purged:
+                logger.info(f"Purged {purged} revoked/expired refresh tokens")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Refresh token purge failed: {e}")
+
+        await asyncio.sleep(settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS)
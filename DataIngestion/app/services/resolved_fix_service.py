@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from DataIngestion.app.models.resolved_fix import ResolvedFix
+
+
+async def list_resolved_fixes(db: AsyncSession) -> list[ResolvedFix]:
+    result = await db.execute(select(ResolvedFix).order_by(ResolvedFix.id))
+    return list(result.scalars().all())
+
+
+async def save_resolved_fix(db: AsyncSession, **values) -> None:
+    """
+    Insert a resolved fix; a newer fix for the same fingerprint replaces the
+    older one only if the judge scored it at least as high.
+    """
+    stmt = insert(ResolvedFix).values(**values)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ResolvedFix.fingerprint],
+        set_={
+            key: getattr(excluded, key)
+            for key in values
+            if key != "fingerprint"
+        },
+        where=ResolvedFix.quality_score.is_(None) | (ResolvedFix.quality_score <= excluded.quality_score),
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def record_fix_reuse(db: AsyncSession, fix_id: int) -> None:
+    await db.execute(
+        update(ResolvedFix)
+        .where(ResolvedFix.id == fix_id)
+        .values(
+            reuse_count=ResolvedFix.reuse_count + 1,
+            last_reused_at=datetime.now(timezone.utc),
+        )
+    )
+    await db.commit()
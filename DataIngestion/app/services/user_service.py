@@ -3,6 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from DataIngestion.app.models.user import User
 from DataIngestion.app.schemas.user import UserCreate
+from DataIngestion.app.services.principal_cache import (
+    principal_cache,
+    notify_principal_invalidation,
+)
 from DataIngestion.app.utils.auth_utils import get_password_hash
 
 from DataIngestion.app.exceptions.user_exception import (
@@ -73,15 +77,19 @@ async def create_user(db: AsyncSession, user: UserCreate) -> User:
 # -------------------------
 async def delete_user(db: AsyncSession, user_id: int) -> None:
     user = await get_user(db, user_id)
+    email = user.email
 
     await db.delete(user)
 
     try:
+        await notify_principal_invalidation(db, email)
         await db.commit()
     except Exception:
         await db.rollback()
         raise UserDeleteException()
 
+    principal_cache.invalidate(email)
+
 
 # -------------------------
 # UPDATE
@@ -92,16 +100,42 @@ async def update_user(
     updated_user: UserCreate,
 ) -> User:
     db_user = await get_user(db, user_id)
+    previous_email = db_user.email
 
     db_user.username = updated_user.username
     db_user.email = str(updated_user.email)
     db_user.password = get_password_hash(updated_user.password)
 
     try:
+        await notify_principal_invalidation(db, previous_email, db_user.email)
         await db.commit()
     except Exception:
         await db.rollback()
         raise UserUpdateException()
 
+    principal_cache.invalidate(previous_email)
+    principal_cache.invalidate(db_user.email)
+
+    await db.refresh(db_user)
+    return db_user
+
+
+async def set_user_active(
+    db: AsyncSession,
+    user_id: int,
+    is_active: bool,
+) -> User:
+    db_user = await get_user(db, user_id)
+    db_user.is_active = is_active
+
+    try:
+        await notify_principal_invalidation(db, db_user.email)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise UserUpdateException()
+
+    principal_cache.invalidate(db_user.email)
+
     await db.refresh(db_user)
     return db_user
@@ -0,0 +1,474 @@
+"""
+Ingestion load test.
+
+Generates synthetic Salesforce ErrorPayload streams and drives
+`POST /api/logs/error` over HTTP in open loop: requests leave on a fixed
+(Poisson) arrival schedule whether or not earlier ones have returned, and
+latency is measured from the scheduled send time, so a slow server shows up
+as latency instead of as a lower offered rate.
+
+Reports client latency percentiles, throughput and errors, plus DB pool and
+Kafka publish metrics scraped from the server's /metrics during the run.
+
+Runs locally against Postgres (DATABASE_URL) and an in-process Kafka
+stand-in; `serve` starts the API with the stand-in, `run --spawn` does that
+for you. Each source gets its own API key, provisioned in DATABASE_URL.
+
+    python -m DataIngestion.benchmarks.ingest_load run --spawn --rate 200 --duration 60 --sources 5
+    python -m DataIngestion.benchmarks.ingest_load run --spawn --rate 50 --burst 8:5/30 --duplicate-ratio 0.6
+    python -m DataIngestion.benchmarks.ingest_load serve --port 8099 --kafka-latency-ms 5
+    python -m DataIngestion.benchmarks.ingest_load run --url http://127.0.0.1:8099 --api-key tk_... --rate 100
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+
+# ---------- Payloads ----------
+
+NOUNS = ["Account", "Contact", "Opportunity", "Case", "Lead", "Order", "Invoice", "Quote", "Asset", "Contract"]
+ROLES = ["Service", "Handler", "TriggerHandler", "Batch", "Controller", "Selector", "Sync", "Queueable"]
+METHODS = ["process", "execute", "handleInsert", "handleUpdate", "validate", "sync", "calculate", "run"]
+MESSAGES = [
+    "System.NullPointerException: Attempt to de-reference a null object",
+    "System.DmlException: Insert failed. First exception on row 0; first error: "
+    "REQUIRED_FIELD_MISSING, Required fields are missing: [{field}]: [{field}]",
+    "System.DmlException: Update failed. First exception on row {row}; first error: "
+    "FIELD_CUSTOM_VALIDATION_EXCEPTION, {field} is invalid",
+    "System.LimitException: Too many SOQL queries: 101",
+    "System.QueryException: List has no rows for assignment to SObject",
+    "System.CalloutException: Read timed out",
+    "System.ListException: List index out of bounds: {row}",
+]
+FIELDS = ["Name", "LastName", "Email", "StageName", "CloseDate", "Status", "Amount"]
+LOG_CODES = ["ERROR"] * 6 + ["FATAL"] * 2 + ["WARN"] * 2
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class PayloadGenerator:
+    """
+    ErrorPayload stream. Stack depth is lognormal around `frames_median`; a
+    `duplicate_ratio` share of events are recurrences of an error the same
+    source already sent (same class, message and trace, new referenceId).
+    """
+
+    def __init__(self, sources: list[str], duplicate_ratio: float, frames_median: float, frames_sigma: float,
+                 seed: int | None = None):
+        self.rng = random.Random(seed)
+        self.duplicate_ratio = duplicate_ratio
+        self.frames_mu = math.log(max(frames_median, 1.0))
+        self.frames_sigma = frames_sigma
+        self.classes = [f"{n}{r}" for n in NOUNS for r in ROLES]
+        self.history: dict[str, deque] = {s: deque(maxlen=500) for s in sources}
+        self.duplicates = 0
+        self.frame_counts: list[int] = []
+
+    def stack_trace(self, entry_class: str, method: str) -> str:
+        depth = max(1, round(self.rng.lognormvariate(self.frames_mu, self.frames_sigma)))
+        self.frame_counts.append(depth)
+        frames = [f"Class.{entry_class}.{method}: line {self.rng.randint(5, 400)}, column 1"]
+        for _ in range(depth - 1):
+            frames.append(
+                f"Class.{self.rng.choice(self.classes)}.{self.rng.choice(METHODS)}: "
+                f"line {self.rng.randint(5, 400)}, column {self.rng.randint(1, 40)}"
+            )
+        frames.append("AnonymousBlock: line 1, column 1" if self.rng.random() < 0.3
+                      else f"Trigger.{self.rng.choice(NOUNS)}Trigger: line {self.rng.randint(2, 30)}, column 1")
+        return "\n".join(frames)
+
+    def next(self, source: str) -> dict:
+        history = self.history[source]
+        if history and self.rng.random() < self.duplicate_ratio:
+            self.duplicates += 1
+            payload = dict(self.rng.choice(history))
+        else:
+            entry_class, method = self.rng.choice(self.classes), self.rng.choice(METHODS)
+            message = self.rng.choice(MESSAGES).format(field=self.rng.choice(FIELDS), row=self.rng.randint(0, 199))
+            payload = {
+                "source": entry_class,
+                "function": method,
+                "message": message,
+                "messageCourt": message[:80],
+                "stackTrace": self.stack_trace(entry_class, method),
+                "logCode": self.rng.choice(LOG_CODES),
+            }
+            history.append(payload)
+            payload = dict(payload)
+        payload["referenceId"] = str(uuid.uuid4())
+        payload["createdDate"] = utc_now_iso()
+        return payload
+
+
+# ---------- Arrivals ----------
+
+@dataclass
+class Burst:
+    factor: float
+    length_s: float
+    every_s: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "Burst":
+        """FACTOR:LENGTH/EVERY, e.g. 5:10/60 is 5x the base rate for 10 s of every minute."""
+        factor, _, window = spec.partition(":")
+        length, _, every = window.partition("/")
+        return cls(float(factor), float(length), float(every))
+
+
+def arrival_schedule(rate: float, duration_s: float, sources: list[str], weights: list[float],
+                     burst: Burst | None, rng: random.Random) -> list[tuple[float, str]]:
+    """Send offsets and sources of a Poisson process whose rate steps up during bursts."""
+    schedule, t = [], 0.0
+    while True:
+        current = rate * (burst.factor if burst and (t % burst.every_s) < burst.length_s else 1.0)
+        t += rng.expovariate(current)
+        if t >= duration_s:
+            return schedule
+        schedule.append((t, rng.choices(sources, weights)[0]))
+
+
+def source_weights(count: int, skew: float) -> list[float]:
+    """Zipf-like share per source; skew 0 spreads traffic evenly."""
+    return [1.0 / (i + 1) ** skew for i in range(count)]
+
+
+# ---------- Driver ----------
+
+@dataclass
+class RunStats:
+    latencies_ms: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    per_source: Counter = field(default_factory=Counter)
+    dropped: int = 0
+    max_in_flight: int = 0
+    wall_s: float = 0.0
+
+
+async def drive(client: httpx.AsyncClient, keys: dict[str, str], generator: PayloadGenerator,
+                schedule: list[tuple[float, str]], max_in_flight: int) -> RunStats:
+    stats = RunStats()
+    loop = asyncio.get_running_loop()
+    in_flight: set[asyncio.Task] = set()
+
+    async def send(scheduled: float, source: str) -> None:
+        payload = generator.next(source)
+        try:
+            response = await client.post("/api/logs/error", json=payload, headers={"X-API-Key": keys[source]})
+            stats.statuses[response.status_code] += 1
+            if response.status_code == 201:
+                stats.latencies_ms.append((loop.time() - scheduled) * 1000)
+                stats.per_source[source] += 1
+        except httpx.HTTPError as e:
+            stats.errors[type(e).__name__] += 1
+
+    start = loop.time()
+    for offset, source in schedule:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            # The client itself is saturated; count it rather than silently closing the loop.
+            stats.dropped += 1
+            continue
+        task = asyncio.create_task(send(start + offset, source))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        stats.max_in_flight = max(stats.max_in_flight, len(in_flight))
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    stats.wall_s = loop.time() - start
+    return stats
+
+
+# ---------- Server metrics ----------
+
+GAUGES = ("db_pool_checked_out", "db_pool_overflow", "db_pool_size")
+COUNTERS = ("kafka_publish_failures_total", "ingested_error_events_total")
+
+
+def parse_metrics(text: str) -> dict:
+    snapshot = {"gauges": {}, "counters": Counter(), "publish_buckets": {}, "publish_count": 0.0, "publish_sum": 0.0}
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name in GAUGES:
+                snapshot["gauges"][sample.name] = sample.value
+            elif sample.name in COUNTERS:
+                snapshot["counters"][sample.name] += sample.value
+            elif sample.name == "kafka_publish_seconds_bucket":
+                snapshot["publish_buckets"][float(sample.labels["le"])] = sample.value
+            elif sample.name == "kafka_publish_seconds_count":
+                snapshot["publish_count"] = sample.value
+            elif sample.name == "kafka_publish_seconds_sum":
+                snapshot["publish_sum"] = sample.value
+    return snapshot
+
+
+class MetricsScraper:
+    """Polls /metrics during the run: gauge series plus first and last counter snapshots."""
+
+    def __init__(self, client: httpx.AsyncClient, interval_s: float):
+        self.client = client
+        self.interval_s = interval_s
+        self.series: dict[str, list[float]] = {name: [] for name in GAUGES}
+        self.first: dict | None = None
+        self.last: dict | None = None
+        self.failures = 0
+
+    async def scrape(self) -> None:
+        try:
+            response = await self.client.get("/metrics")
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.failures += 1
+            return
+        snapshot = parse_metrics(response.text)
+        self.first = self.first or snapshot
+        self.last = snapshot
+        for name, value in snapshot["gauges"].items():
+            self.series[name].append(value)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await self.scrape()
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval_s)
+            except asyncio.TimeoutError:
+                pass
+        await self.scrape()
+
+
+def histogram_quantile(buckets: dict[float, float], q: float) -> float | None:
+    """Upper bound of the bucket holding quantile q of a cumulative histogram."""
+    total = buckets.get(math.inf, 0)
+    if not total:
+        return None
+    for bound in sorted(buckets):
+        if buckets[bound] >= q * total:
+            return bound
+    return math.inf
+
+
+# ---------- Report ----------
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(args, stats: RunStats, generator: PayloadGenerator, scheduled: int, scraper: MetricsScraper) -> None:
+    sent = sum(stats.statuses.values()) + sum(stats.errors.values())
+    ok = stats.statuses.get(201, 0)
+    print(f"\noffered {args.rate:g}/s for {args.duration:g}s ({scheduled} scheduled, burst={args.burst or 'none'}), "
+          f"{len(generator.history)} sources, duplicate ratio {args.duplicate_ratio:g}")
+    print(f"sent={sent}  ok={ok}  dropped(client)={stats.dropped}  max in flight={stats.max_in_flight}  "
+          f"wall={stats.wall_s:.1f}s  throughput={ok / stats.wall_s:.1f}/s")
+    print(f"errors={(sent - ok) / max(sent, 1):.2%}  statuses={dict(stats.statuses)}  transport={dict(stats.errors)}")
+    if generator.frame_counts:
+        print(f"stack frames p50={percentile(generator.frame_counts, 50)} p99={percentile(generator.frame_counts, 99)} "
+              f"max={max(generator.frame_counts)}  recurrences={generator.duplicates}")
+
+    if stats.latencies_ms:
+        lat = stats.latencies_ms
+        print(f"\n{'latency ms':<12}{'p50':>9}{'p90':>9}{'p99':>9}{'p99.9':>9}{'max':>9}{'mean':>9}")
+        print(f"{'':<12}{percentile(lat, 50):>9.1f}{percentile(lat, 90):>9.1f}{percentile(lat, 99):>9.1f}"
+              f"{percentile(lat, 99.9):>9.1f}{max(lat):>9.1f}{statistics.mean(lat):>9.1f}")
+    print("per source ok: " + ", ".join(f"{s}={n}" for s, n in sorted(stats.per_source.items())))
+
+    if not scraper.last:
+        print(f"\nserver metrics: unavailable ({scraper.failures} failed scrapes)")
+        return
+    print(f"\nserver ({len(scraper.series['db_pool_checked_out'])} scrapes every {scraper.interval_s:g}s)")
+    for name, values in scraper.series.items():
+        if values:
+            print(f"  {name:<24} mean={statistics.mean(values):7.1f}  max={max(values):7.1f}")
+    first, last = scraper.first, scraper.last
+    for name in COUNTERS:
+        print(f"  {name:<32} +{last['counters'][name] - first['counters'][name]:.0f}")
+    published = last["publish_count"] - first["publish_count"]
+    if published:
+        delta = {b: last["publish_buckets"].get(b, 0) - first["publish_buckets"].get(b, 0) for b in last["publish_buckets"]}
+        print(f"  kafka publish  n={published:.0f}  mean={(last['publish_sum'] - first['publish_sum']) / published * 1000:.1f}ms  "
+              f"p50<={histogram_quantile(delta, 0.5) * 1000:g}ms  p99<={histogram_quantile(delta, 0.99) * 1000:g}ms")
+
+
+# ---------- Setup ----------
+
+async def provision_keys(sources: list[str]) -> dict[str, str]:
+    """One ingest key per source, without a rate limit, in DATABASE_URL."""
+    from DataIngestion.app.db.engine import init_engine, dispose_engine
+    from DataIngestion.app.db.init_db import init_db
+    from DataIngestion.app.db.session import get_session_factory
+    from DataIngestion.app.services.api_key_service import create_api_key
+
+    await init_engine()
+    await init_db()
+    keys = {}
+    async with get_session_factory()() as session:
+        for source in sources:
+            _, plaintext = await create_api_key(session, source=source, scopes=["ingest"])
+            keys[source] = plaintext
+    await dispose_engine()
+    return keys
+
+
+async def wait_until_accepting(client: httpx.AsyncClient, key: str, timeout_s: float) -> None:
+    """Until the server answers and knows the keys (its key table refreshes on an interval)."""
+    deadline = time.monotonic() + timeout_s
+    probe = {"source": "LoadTestProbe", "message": "load test warm-up", "referenceId": str(uuid.uuid4())}
+    while True:
+        try:
+            response = await client.post("/api/logs/error", json=probe, headers={"X-API-Key": key})
+            if response.status_code == 201:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"server at {client.base_url} not accepting ingest requests after {timeout_s:g}s")
+        await asyncio.sleep(0.5)
+
+
+def spawn_server(args) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "DataIngestion.benchmarks.ingest_load", "serve",
+        "--port", str(args.port),
+        "--kafka-latency-ms", str(args.kafka_latency_ms),
+        "--kafka-fail-rate", str(args.kafka_fail_rate),
+    ]
+    return subprocess.Popen(command)
+
+
+async def run(args) -> None:
+    sources = [f"loadtest-{i}" for i in range(args.sources)]
+    if args.api_key:
+        keys = {s: args.api_key[i % len(args.api_key)] for i, s in enumerate(sources)}
+    else:
+        keys = await provision_keys(sources)
+
+    server = spawn_server(args) if args.spawn else None
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    rng = random.Random(args.seed)
+    generator = PayloadGenerator(sources, args.duplicate_ratio, args.frames_median, args.frames_sigma, args.seed)
+    schedule = arrival_schedule(args.rate, args.duration, sources, source_weights(args.sources, args.source_skew),
+                                Burst.parse(args.burst) if args.burst else None, rng)
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    try:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client, \
+                httpx.AsyncClient(base_url=url, timeout=5) as metrics_client:
+            await wait_until_accepting(client, keys[sources[0]], args.startup_timeout)
+
+            scraper = MetricsScraper(metrics_client, args.scrape_interval)
+            stop = asyncio.Event()
+            scraping = asyncio.create_task(scraper.run(stop))
+            stats = await drive(client, keys, generator, schedule, args.max_in_flight)
+            stop.set()
+            await scraping
+
+        report(args, stats, generator, len(schedule), scraper)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+class KafkaStandIn:
+    """Replaces AIOKafkaProducer: acks after a configurable delay and only counts what it was sent."""
+
+    def __init__(self, latency_ms: float, fail_rate: float):
+        self.latency_s = latency_ms / 1000
+        self.fail_rate = fail_rate
+        self.sent = 0
+        self.bytes = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def send_and_wait(self, topic: str, value: bytes | None = None, key: bytes | None = None, **kwargs) -> None:
+        if self.latency_s:
+            await asyncio.sleep(random.expovariate(1 / self.latency_s))
+        if random.random() < self.fail_rate:
+            raise RuntimeError("Kafka stand-in: injected publish failure")
+        self.sent += 1
+        self.bytes += len(value or b"")
+
+
+async def consume_nothing() -> None:
+    await asyncio.Event().wait()
+
+
+def serve(args) -> None:
+    """The ingestion API on DATABASE_URL with the Kafka stand-in instead of a broker."""
+    os.environ.setdefault("KAFKA_BOOTSTRAP_SERVERS", "standin:9092")
+
+    import uvicorn
+    from loguru import logger
+
+    import DataIngestion.app.kafka.producer as kafka_producer
+    import DataIngestion.app.main as main
+
+    kafka_producer.producer = KafkaStandIn(args.kafka_latency_ms, args.kafka_fail_rate)
+    main.start_consumer_forever = consume_nothing
+
+    # Per-request INFO logs would dominate the profile.
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    server_args = argparse.ArgumentParser(add_help=False)
+    server_args.add_argument("--port", type=int, default=8099)
+    server_args.add_argument("--kafka-latency-ms", type=float, default=2.0, help="Mean stand-in publish latency")
+    server_args.add_argument("--kafka-fail-rate", type=float, default=0.0)
+
+    serve_cmd = commands.add_parser("serve", parents=[server_args], help="Run the API with the Kafka stand-in")
+    serve_cmd.add_argument("--log-level", default="WARNING")
+
+    run_cmd = commands.add_parser("run", parents=[server_args], help="Drive load and report")
+    run_cmd.add_argument("--url", help="Target server (default: http://127.0.0.1:PORT)")
+    run_cmd.add_argument("--spawn", action="store_true", help="Start `serve` in a subprocess for the run")
+    run_cmd.add_argument("--api-key", action="append", help="Use these keys instead of provisioning (repeatable)")
+    run_cmd.add_argument("--rate", type=float, default=100.0, help="Mean arrivals per second")
+    run_cmd.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals")
+    run_cmd.add_argument("--burst", help="FACTOR:LENGTH/EVERY seconds, e.g. 5:10/60")
+    run_cmd.add_argument("--sources", type=int, default=3, help="Distinct sources, one API key each")
+    run_cmd.add_argument("--source-skew", type=float, default=1.0, help="Zipf exponent of traffic per source")
+    run_cmd.add_argument("--duplicate-ratio", type=float, default=0.3, help="Share of recurrences of earlier errors")
+    run_cmd.add_argument("--frames-median", type=float, default=6.0, help="Median stack-trace depth")
+    run_cmd.add_argument("--frames-sigma", type=float, default=0.8, help="Lognormal sigma of stack-trace depth")
+    run_cmd.add_argument("--max-in-flight", type=int, default=1000, help="Client-side cap; excess arrivals are dropped")
+    run_cmd.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout, seconds")
+    run_cmd.add_argument("--scrape-interval", type=float, default=1.0)
+    run_cmd.add_argument("--startup-timeout", type=float, default=60.0)
+    run_cmd.add_argument("--seed", type=int)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        asyncio.run(run(args))
@@ -0,0 +1,125 @@
+"""
+Refresh-token growth benchmark.
+
+Seeds the refresh_tokens table up to several sizes (default: 0, 100k, 1M rows,
+i.e. the residue of that many logins) and measures `/api/auth/token` and
+`/users/` latency in-process at each step. Latency should stay flat.
+
+Requires a local Postgres reachable through DATABASE_URL. Kafka is not used.
+
+    python -m DataIngestion.benchmarks.refresh_token_growth --sizes 0 100000 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+from DataIngestion.app.core.config import settings
+from DataIngestion.app.db.engine import init_engine, dispose_engine, get_engine
+from DataIngestion.app.db.init_db import init_db
+from DataIngestion.app.main import app
+from DataIngestion.app.models.user import User
+from DataIngestion.app.db.session import get_session_factory
+from DataIngestion.app.utils.auth_utils import get_password_hash
+
+
+BENCH_PASSWORD = "bench-password"
+
+
+async def create_bench_user() -> User:
+    suffix = uuid.uuid4().hex[:8]
+    async with get_session_factory()() as session:
+        user = User(
+            username=f"bench_{suffix}",
+            email=f"bench_{suffix}@example.com",
+            password=get_password_hash(BENCH_PASSWORD),
+            role="admin",
+            is_active=True,
+        )
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+        return user
+
+
+async def seed_tokens(user_id: int, target_rows: int) -> None:
+    """
+    Top the table up to `target_rows` revoked tokens, as N past logins would leave behind.
+    """
+    table = f"{settings.DB_SCHEMA}.refresh_tokens"
+    async with get_engine().begin() as conn:
+        current = (await conn.execute(text(f"SELECT count(*) FROM {table}"))).scalar()
+        missing = max(0, target_rows - current)
+        if not missing:
+            return
+        await conn.execute(
+            text(
+                f"INSERT INTO {table} (token_hash, user_id, expires_at, revoked, created_at) "
+                f"SELECT encode(sha256(convert_to(gen_random_uuid()::text, 'UTF8')), 'hex'), "
+                f"       :user_id, now() + interval '7 days', true, now() "
+                f"FROM generate_series(1, :n)"
+            ),
+            {"user_id": user_id, "n": missing},
+        )
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(client: httpx.AsyncClient, email: str, iterations: int) -> dict[str, list[float]]:
+    timings: dict[str, list[float]] = {"/api/auth/token": [], "/users/": []}
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/auth/token",
+            data={"username": email, "password": BENCH_PASSWORD},
+        )
+        timings["/api/auth/token"].append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+        start = time.perf_counter()
+        response = await client.get("/users/")
+        timings["/users/"].append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+    return timings
+
+
+async def main(sizes: list[int], iterations: int) -> None:
+    await init_engine()
+    await init_db()
+
+    user = await create_bench_user()
+    transport = httpx.ASGITransport(app=app)
+
+    print(f"{'rows':>10} {'endpoint':<18} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in sizes:
+            await seed_tokens(user.id, size)
+            timings = await measure(client, user.email, iterations)
+            for endpoint, samples in timings.items():
+                print(
+                    f"{size:>10} {endpoint:<18} "
+                    f"{percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f} "
+                    f"{statistics.mean(samples):>8.2f}"
+                )
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.iterations))
@@ -12,59 +12,95 @@ openrouter_model = os.getenv(
 )
 
 from langchain.chat_models import init_chat_model
+from agents.core.llm_cache import llm_cache  # persistent response cache (LLM_CACHE_ENABLED)
+from agents.core.llm_router import route  # budgets, 429 cooldowns and failover (LLM_ROUTER_ENABLED)
 
+LLM_ROUTER_ENABLED = os.getenv("LLM_ROUTER_ENABLED", "true").lower() == "true"
+# Retries and 429 backoff are the router's job; SDK retries would stall the call on one key.
+SDK_MAX_RETRIES = 0 if LLM_ROUTER_ENABLED else 2
 
-coordinator_brain_gemini = init_chat_model(
+
+_gemini_flash = init_chat_model(
     "gemini-2.5-flash",
-    model_provider="google_genai"
+    model_provider="google_genai",
+    temperature=0,
+    max_retries=SDK_MAX_RETRIES,
+    cache=llm_cache,
 )
 
 
 import os
 from langchain_openai import ChatOpenAI  # or from langchain.chat_models import ChatOpenAI
 
-coordinator_brain_openrouter = ChatOpenAI(
+_coordinator_openrouter = ChatOpenAI(
     model="xiaomi/mimo-v2-flash:free",  #qwen/Qwen3-4B:free,  # nex-agi/deepseek-v3.1-nex-n1:free
     temperature=0,
     openai_api_key=os.getenv("OPR1"),  # Change environment variable name
     openai_api_base="https://openrouter.ai/api/v1",  # This is the key change
     max_tokens=2048,
     timeout=None,
-    max_retries=2,
+    max_retries=SDK_MAX_RETRIES,
+    cache=llm_cache,
 )
-context_retrieval_brain_openrouter = ChatOpenAI(
+_context_retrieval_openrouter = ChatOpenAI(
     model="arcee-ai/trinity-mini:free",  # nvidia/nemotron-3-nano-30b-a3b:free
     temperature=0,
     openai_api_key=os.getenv("OPR2"),  # Change environment variable name
     openai_api_base="https://openrouter.ai/api/v1",  # This is the key change
     max_tokens=2048,
     timeout=None,
-    max_retries=2,
+    max_retries=SDK_MAX_RETRIES,
+    cache=llm_cache,
 )
-fix_proposal_brain_openrouter = ChatOpenAI(
+_fix_proposal_openrouter = ChatOpenAI(
     model="xiaomi/mimo-v2-flash:free",  # meta-llama/llama-3.2-3b-instruct:free 
     temperature=0,
     openai_api_key=os.getenv("OPR3"),  # Change environment variable name
     openai_api_base="https://openrouter.ai/api/v1",  # This is the key change
     max_tokens=2048,
     timeout=None,
-    max_retries=2,
+    max_retries=SDK_MAX_RETRIES,
+    cache=llm_cache,
 )
-judge_brain_openrouter = ChatOpenAI(
+_judge_openrouter = ChatOpenAI(
     model="meta-llama/llama-3.2-3b-instruct:free",  # mistralai/devstral-2512:free
     temperature=0,
     openai_api_key=os.getenv("OPR5"),  # Change environment variable name
     openai_api_base="https://openrouter.ai/api/v1",  # This is the key change
     max_tokens=2048,
     timeout=None,
-    max_retries=2,
+    max_retries=SDK_MAX_RETRIES,
+    cache=llm_cache,
 )
-fix_application_brain_openrouter = ChatOpenAI(
+_fix_application_openrouter = ChatOpenAI(
     model="mistralai/devstral-2512:free",
     temperature=0,
     api_key=os.getenv("OPR4"),  # ✅ MUST be api_key
     base_url="https://openrouter.ai/api/v1",  # ✅ new name
     max_tokens=2048,
     timeout=None,
-    max_retries=2,
-)
\ No newline at end of file
+    max_retries=SDK_MAX_RETRIES,
+    cache=llm_cache,
+)
+
+
+# =========================
+# Routed models (what the agents import)
+# =========================
+if LLM_ROUTER_ENABLED:
+    _gemini_fallback = (_gemini_flash, "gemini", "GOOGLE_API_KEY")
+
+    coordinator_brain_gemini = route(_gemini_flash, "gemini", "GOOGLE_API_KEY",
+                                     alternates=[(_coordinator_openrouter, "openrouter", "OPR1")])
+    coordinator_brain_openrouter = route(_coordinator_openrouter, "openrouter", "OPR1", alternates=[_gemini_fallback])
+    context_retrieval_brain_openrouter = route(_context_retrieval_openrouter, "openrouter", "OPR2", alternates=[_gemini_fallback])
+    fix_proposal_brain_openrouter = route(_fix_proposal_openrouter, "openrouter", "OPR3", alternates=[_gemini_fallback])
+    judge_brain_openrouter = route(_judge_openrouter, "openrouter", "OPR5", alternates=[_gemini_fallback])
+    fix_application_brain_openrouter = route(_fix_application_openrouter, "openrouter", "OPR4", alternates=[_gemini_fallback])
+else:
+    coordinator_brain_gemini = _gemini_flash
+    coordinator_brain_openrouter = _coordinator_openrouter
+    context_retrieval_brain_openrouter = _context_retrieval_openrouter
+    fix_proposal_brain_openrouter = _fix_proposal_openrouter
+    judge_brain_openrouter = _judge_openrouter
+    fix_application_brain_openrouter = _fix_application_openrouter
@@ -0,0 +1,93 @@
+"""
+LLM calls and wall time per event: deep-agent coordinator vs. pipeline mode.
+
+Runs the same error events through AgentOrchestrator(mode="agent") and
+AgentOrchestrator(mode="pipeline") with the LLM cache bypassed, counting
+model calls and tokens with RunRecorder. Both modes run the real stages,
+so point JIRA_*, REPO_PATH and the GitHub token at sandboxes first.
+
+    python -m agents.benchmarks.coordinator_modes --events events.jsonl --repeat 2
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from agents.coordinator.agent import AgentOrchestrator
+from agents.core.llm_cache import bypass_llm_cache
+from agents.core.results import RunRecorder
+from agents.worker import build_problem
+
+SAMPLE_EVENT = {
+    "stackTrace": "Class.SimpleProcess.createContactWithError: line 10, column 1\nAnonymousBlock: line 1, column 1",
+    "source": "SimpleProcess",
+    "message": "Insert failed. First exception on row 0; first error: REQUIRED_FIELD_MISSING, "
+               "Required fields are missing: [Name]: [Name]",
+    "function": "createContactWithError",
+    "referenceId": "benchmark-sample",
+}
+
+
+def load_events(path):
+    if not path:
+        return [SAMPLE_EVENT]
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def run_mode(mode: str, events: list, repeat: int) -> list:
+    orchestrator = AgentOrchestrator(mode=mode)
+    samples = []
+    for _ in range(repeat):
+        for event in events:
+            recorder = RunRecorder()
+            start = time.perf_counter()
+            try:
+                with bypass_llm_cache():
+                    await orchestrator.arun(build_problem(event), config={"callbacks": [recorder]}, event=event)
+                ok = True
+            except Exception as e:
+                print(f"  {mode}: event failed: {e}")
+                ok = False
+            samples.append({
+                "ok": ok,
+                "seconds": time.perf_counter() - start,
+                "llm_calls": sum(t["calls"] for t in recorder.tokens.values()),
+                "tokens": sum(t["input"] + t["output"] for t in recorder.tokens.values()),
+            })
+    return samples
+
+
+def report(mode: str, samples: list) -> dict:
+    ok = [s for s in samples if s["ok"]] or samples
+    row = {
+        "llm_calls": statistics.mean(s["llm_calls"] for s in ok),
+        "tokens": statistics.mean(s["tokens"] for s in ok),
+        "seconds": statistics.mean(s["seconds"] for s in ok),
+        "p95_s": sorted(s["seconds"] for s in ok)[int(0.95 * (len(ok) - 1))],
+    }
+    print(
+        f"{mode:<9} events={len(samples):4d} failed={len(samples) - len([s for s in samples if s['ok']]):3d}  "
+        f"llm_calls={row['llm_calls']:6.1f}  tokens={row['tokens']:9.0f}  "
+        f"wall mean={row['seconds']:7.2f} s  p95={row['p95_s']:7.2f} s"
+    )
+    return row
+
+
+async def main(path, repeat: int) -> None:
+    events = load_events(path)
+    agent = report("agent", await run_mode("agent", events, repeat))
+    pipeline = report("pipeline", await run_mode("pipeline", events, repeat))
+
+    print(f"\nLLM calls saved per event: {agent['llm_calls'] - pipeline['llm_calls']:.1f}")
+    print(f"tokens saved per event:    {agent['tokens'] - pipeline['tokens']:.0f}")
+    print(f"wall time saved per event: {agent['seconds'] - pipeline['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", help="JSONL file of error events (defaults to one sample event)")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.repeat))
@@ -0,0 +1,443 @@
+"""
+Local stand-ins for the pipeline's external dependencies (see replay.py).
+
+Each fake sleeps according to a latency Profile and fails at its configured
+rate, so the harness exercises the same pools, timeouts, router cooldowns
+and retries as production without any network access:
+
+- FakeChatModel: scripted JSON per stage prompt (proposal, judge, coordinator
+  decision) and scripted tool calls for the fix-application agent
+- FakeSalesforce: SOQL over a synthetic ApexClass corpus plus sObject describes
+- FakeWeaviate / FakeTavily: keyword search over the errors.csv corpus
+- fake Jira and GitHub calls, and a local bare git remote for the git tools
+"""
+import asyncio
+import csv
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "..", "trash", "errors.csv")
+
+rng = random.Random(int(os.getenv("REPLAY_SEED", "7")))
+
+
+# ---------- Latency and Failures ----------
+
+class FakeServiceError(Exception):
+    """Raised by a fake at its failure rate; `status_code` drives the router's classification."""
+
+    def __init__(self, service: str, status_code: int):
+        super().__init__(f"{service}: {status_code} injected failure")
+        self.status_code = status_code
+
+
+@dataclass
+class Profile:
+    """Latency distribution (seconds) and failure rate of one fake dependency."""
+    dist: str = "fixed"  # fixed | uniform | lognormal
+    a: float = 0.0       # fixed: value, uniform: low, lognormal: median (all ms)
+    b: float = 0.0       # uniform: high (ms), lognormal: sigma
+    fail_rate: float = 0.0
+    fail_status: int = 503
+
+    @classmethod
+    def parse(cls, spec: str) -> "Profile":
+        """'fixed:50', 'uniform:20,80' or 'lognormal:800,0.5' (milliseconds)."""
+        dist, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v]
+        return cls(dist, *(values + [0.0, 0.0])[:2])
+
+    def sample_s(self) -> float:
+        if self.dist == "uniform":
+            return rng.uniform(self.a, self.b) / 1000
+        if self.dist == "lognormal":
+            return rng.lognormvariate(0.0, self.b) * self.a / 1000
+        return self.a / 1000
+
+    def check(self, service: str) -> None:
+        if self.fail_rate and rng.random() < self.fail_rate:
+            raise FakeServiceError(service, self.fail_status)
+
+    def wait(self, service: str) -> None:
+        time.sleep(self.sample_s())
+        self.check(service)
+
+    async def await_(self, service: str) -> None:
+        await asyncio.sleep(self.sample_s())
+        self.check(service)
+
+
+DEFAULT_PROFILES = {
+    "llm": Profile("lognormal", 1200, 0.5, fail_status=429),
+    "sf": Profile("lognormal", 120, 0.4),
+    "weaviate": Profile("lognormal", 80, 0.4),
+    "tavily": Profile("lognormal", 600, 0.5),
+    "jira": Profile("lognormal", 400, 0.3),
+    "github": Profile("lognormal", 500, 0.3),
+    "publish": Profile("fixed", 5),
+}
+
+
+# ---------- Corpus ----------
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [row for row in csv.DictReader(f) if row.get("error")]
+
+
+def class_name_for(row: Dict[str, str], index: int) -> str:
+    base = re.sub(r"[^A-Za-z]", "", (row.get("category") or "Error").replace("Exception", "")) or "Error"
+    return f"{base}Service{index}"
+
+
+def synthetic_events(rows: List[Dict[str, str]], variants: int = 1) -> List[Dict[str, Any]]:
+    """Error events shaped like DataIngestion's ErrorPayload, `variants` per corpus row."""
+    events = []
+    for i, row in enumerate(rows):
+        class_name = class_name_for(row, i)
+        for v in range(variants):
+            method = f"process{v % 3}"
+            line = 12 + 20 * (v % 3) + rng.randint(1, 8)
+            record_id = "001" + uuid.uuid4().hex[:12]
+            events.append({
+                "referenceId": str(uuid.uuid4()),
+                "source": rng.choice(["SalesApp", "ServicePortal", "Integration"]),
+                "function": method,
+                "logCode": rng.choice(["ERROR", "ERROR", "FATAL", "WARN"]),
+                "severity": rng.choice(["CRITICAL", "HIGH", "MEDIUM", "MEDIUM", "LOW"]),
+                "message": f"{row['error']} (record {record_id})" if v else row["error"],
+                "stackTrace": f"Class.{class_name}.{method}: line {line}, column 1\n"
+                              f"Class.{class_name}.run: line 80, column 1\n"
+                              f"AnonymousBlock: line 1, column 1",
+            })
+    return events
+
+
+def apex_class(name: str, methods: int = 3, filler_lines: int = 14) -> str:
+    lines = [f"public with sharing class {name} {{"]
+    for m in range(methods):
+        lines.append(f"    public static void process{m}(List<Contact> records) {{")
+        for k in range(filler_lines):
+            lines.append(f"        Integer step{k} = records.size() + {k};")
+        lines.append("        insert records;")
+        lines.append("    }")
+    lines.append("    public void run() {")
+    lines.extend(f"        process{m}(new List<Contact>());" for m in range(methods))
+    lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def apex_test_class(name: str) -> str:
+    return (
+        f"@isTest\nprivate class {name}Test {{\n"
+        f"    @isTest static void processInsertsContacts() {{\n"
+        f"        List<Contact> records = new List<Contact>{{ new Contact(LastName = 'Test') }};\n"
+        f"        {name}.process0(records);\n"
+        f"        System.assertEquals(1, [SELECT COUNT() FROM Contact]);\n"
+        f"    }}\n}}"
+    )
+
+
+def apex_corpus(events: List[Dict[str, Any]], filler_classes: int = 200) -> List[Dict[str, Any]]:
+    """ApexClass records: every class named in the events, its test, and unrelated filler."""
+    names = sorted({
+        m.group(1) for e in events for m in [re.search(r"Class\.(\w+)\.", e.get("stackTrace") or "")] if m
+    })
+    bodies = {}
+    for name in names:
+        bodies[name] = apex_class(name)
+        bodies[f"{name}Test"] = apex_test_class(name)
+    for i in range(filler_classes):
+        bodies[f"Util{i}"] = apex_class(f"Util{i}", methods=rng.randint(1, 6))
+
+    modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for i, (name, body) in enumerate(sorted(bodies.items())):
+        stamp = (modified + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+        records.append({
+            "Id": f"01p{i:015d}",
+            "Name": name,
+            "Body": body,
+            "LastModifiedDate": stamp,
+            "SystemModstamp": stamp,
+            "LengthWithoutComments": len(body),
+        })
+    return records
+
+
+# ---------- Chat Model ----------
+
+def _tool_name(tool: Any) -> Optional[str]:
+    if isinstance(tool, dict):
+        return tool.get("name") or (tool.get("function") or {}).get("name")
+    return getattr(tool, "name", None)
+
+
+def _first_json(messages, kind: str) -> Any:
+    for m in messages:
+        if m.type == kind and isinstance(m.content, str):
+            try:
+                return json.loads(m.content.split("\n\nThe judge rejected")[0])
+            except ValueError:
+                continue
+    return None
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering each pipeline prompt with a plausible scripted reply."""
+
+    model_name: str = "fake-model"
+    profile: Any = None
+    approve_rate: float = 0.8
+    tool_names: tuple = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tool_names": tuple(_tool_name(t) for t in tools)})
+
+    def _reply(self, messages) -> AIMessage:
+        system = "\n".join(m.content for m in messages if m.type == "system" and isinstance(m.content, str))
+        if "FIX APPLICATION AGENT" in system:
+            return self._apply(messages)
+        if "SALESFORCE FIX JUDGE" in system:
+            payload = _first_json(messages, "human") or {}
+            ids = [p.get("id") for p in payload.get("fix_proposals") or [] if isinstance(p, dict)]
+            approved = bool(ids) and rng.random() < self.approve_rate
+            return AIMessage(json.dumps({
+                "approved": approved,
+                "quality_score": 88 if approved else 55,
+                "hallucination_score": 8 if approved else 40,
+                "confidence": 0.85 if approved else 0.5,
+                "best_fix_id": ids[0] if ids else None,
+                "reasons": ["scripted verdict"],
+                "feedback_for_regeneration": None if approved else "Guard the DML with required-field checks.",
+            }))
+        if "FIX PROPOSAL AGENT" in system:
+            context = _first_json(messages, "human") or {}
+            faulty = (context.get("salesforce_context") or {}).get("faulty_class") or {}
+            name = faulty.get("Name") or "UnknownClass"
+            fix = {"title": f"Validate required fields in {name}", "explanation": "Scripted fix",
+                   "code": "if (records.isEmpty()) { return; }", "language": "apex",
+                   "risk": "LOW", "effort": "LOW", "confidence": 0.8}
+            return AIMessage(json.dumps([{
+                "id": "FIX-001",
+                "title": fix["title"],
+                "root_cause": "Required field missing on insert",
+                "description": fix["explanation"],
+                "apex_fix": fix["code"],
+                "risk": "LOW", "effort": "LOW", "confidence": 0.8, "assumptions": [],
+                "jira_payload": {"title": fix["title"], "description": {"root_cause": "Required field missing", "fixes": [fix]},
+                                 "priority": "MEDIUM", "labels": ["talos", "benchmark"], "components": [name]},
+            }]))
+        if "ORCHESTRATOR" in system:
+            summary = _first_json(messages, "human") or {}
+            ids = summary.get("fix_ids") or []
+            return AIMessage(json.dumps({"decision": "apply" if ids else "stop", "fix_id": ids[0] if ids else None,
+                                         "reason": "scripted"}))
+        return AIMessage("{}")
+
+    def _apply(self, messages) -> AIMessage:
+        payload = _first_json(messages, "human") or {}
+        fix = (payload.get("fixes") or [{}])[0]
+        jira_key = (payload.get("jira") or {}).get("key") or "BENCH-0"
+        path = (fix.get("faulty_class") or {}).get("path") or "Unknown.cls"
+        branch = f"fix/{jira_key}-{fix.get('id', 'FIX-001')}-bench"
+        body = (payload.get("faulty_class") or {}).get("Body") or ""
+        steps = [
+            ("git_create_branch", {"branch_name": branch}),
+            ("apply_apex_patch", {"file_path": path, "content": f"{body}\n// {jira_key}: {fix.get('title')}\n"}),
+            ("git_commit", {"message": f"{jira_key}: {fix.get('title')} ({fix.get('id')})"}),
+            ("git_push", {"branch_name": branch}),
+            ("github_create_pr", {"head": branch, "base": "main", "title": f"{jira_key}: {fix.get('title')}",
+                                  "body": f"Fixes {jira_key}"}),
+        ]
+        done = sum(1 for m in messages if isinstance(m, ToolMessage))
+        if done < len(steps) and steps[done][0] in self.tool_names:
+            name, args = steps[done]
+            return AIMessage("", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"}])
+
+        pr = next((m.content for m in reversed(messages) if isinstance(m, ToolMessage) and "pull" in str(m.content)), None)
+        return AIMessage(json.dumps([{"fix_id": fix.get("id"), "branch": branch, "commit": "bench",
+                                      "pull_request": pr, "jira_key": jira_key}]))
+
+    def _result(self, messages) -> ChatResult:
+        message = self._reply(messages)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        usage = {"input_tokens": prompt_chars // 4, "output_tokens": len(str(message.content)) // 4}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        message.usage_metadata = usage
+        message.response_metadata = {"model_name": self.model_name}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.profile.wait(self.model_name)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await self.profile.await_(self.model_name)
+        return self._result(messages)
+
+
+# ---------- Salesforce ----------
+
+SOBJECT_FIELDS = {
+    "Contact": ["Id", "FirstName", "LastName", "Email", "AccountId"],
+    "Account": ["Id", "Name", "Industry", "OwnerId"],
+    "Lead": ["Id", "FirstName", "LastName", "Company", "Status"],
+    "Invoice__c": ["Id", "Name", "Amount__c", "Account__c"],
+}
+
+
+class FakeSObject:
+    def __init__(self, name: str, profile: Profile):
+        self.name = name
+        self.profile = profile
+
+    def describe(self) -> Dict[str, Any]:
+        self.profile.wait("sf describe")
+        return {"name": self.name, "fields": [
+            {"name": f, "label": f.replace("__c", "").replace("Id", " ID").strip(), "type": "string",
+             "nillable": f not in ("LastName", "Name", "Company"), "length": 255, "picklistValues": []}
+            for f in SOBJECT_FIELDS[self.name]
+        ]}
+
+
+class FakeSalesforce:
+    """The subset of simple_salesforce the agents use, over an in-memory ApexClass table."""
+
+    def __init__(self, classes: List[Dict[str, Any]], profile: Profile):
+        self.classes = classes
+        self.profile = profile
+
+    def query_all(self, soql: str, **kwargs) -> Dict[str, Any]:
+        self.profile.wait("sf query")
+        source = re.search(r"\bFROM\s+(\w+)", soql, flags=re.IGNORECASE).group(1)
+        if source.lower() == "entitydefinition":
+            records = [{"QualifiedApiName": n} for n in SOBJECT_FIELDS]
+        else:
+            fields = [f.strip() for f in re.search(r"SELECT\s+(.*?)\s+FROM", soql, flags=re.IGNORECASE | re.S).group(1).split(",")]
+            records = [{f: c.get(f) for f in fields} for c in self.classes]
+        return {"totalSize": len(records), "done": True, "records": records}
+
+    query = query_all
+
+    def __getattr__(self, name: str):
+        if name in SOBJECT_FIELDS:
+            return FakeSObject(name, self.profile)
+        raise AttributeError(name)
+
+
+# ---------- Weaviate and Tavily ----------
+
+def _ranked(rows: List[Dict[str, str]], query: str, limit: int) -> List[Dict[str, str]]:
+    terms = set(re.findall(r"[a-z_]{3,}", query.lower()))
+    scored = sorted(rows, key=lambda r: -len(terms & set(re.findall(r"[a-z_]{3,}", r["error"].lower()))))
+    return scored[:limit]
+
+
+class FakeWeaviate:
+    """Stands in for the Weaviate client, its `Errors` collection and near_text queries."""
+
+    def __init__(self, rows: List[Dict[str, str]], profile: Profile):
+        self.rows = rows
+        self.profile = profile
+        self.collections = SimpleNamespace(use=lambda name: SimpleNamespace(query=self))
+
+    def is_ready(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def near_text(self, query: str, limit: int = 3, return_properties=None):
+        self.profile.wait("weaviate")
+        return SimpleNamespace(objects=[
+            SimpleNamespace(properties={"error": r["error"], "solution": r["solution"], "category": r["category"]})
+            for r in _ranked(self.rows, query, limit)
+        ])
+
+
+class FakeTavily:
+    def __init__(self, rows: List[Dict[str, str]], profile: Profile):
+        self.rows = rows
+        self.profile = profile
+
+    def search(self, query: str, max_results: int = 3, **kwargs) -> Dict[str, Any]:
+        self.profile.wait("tavily")
+        return {"results": [
+            {"title": r["category"], "content": f"{r['solution']}. {r.get('notes') or ''}"}
+            for r in _ranked(self.rows, query, max_results)
+        ]}
+
+
+# ---------- Jira and GitHub ----------
+
+_issue_numbers = itertools.count(1)
+_pr_numbers = itertools.count(1)
+
+
+def fake_jira(profile: Profile):
+    async def acreate_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
+        await profile.await_("jira")
+        key = f"BENCH-{next(_issue_numbers)}"
+        return {"jira_key": key, "jira_url": f"https://jira.invalid/browse/{key}"}
+
+    def create_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
+        profile.wait("jira")
+        key = f"BENCH-{next(_issue_numbers)}"
+        return {"jira_key": key, "jira_url": f"https://jira.invalid/browse/{key}"}
+
+    return create_jira_bug, acreate_jira_bug
+
+
+def fake_github(profile: Profile):
+    async def open_pr(head: str, base: str, title: str, body: str) -> dict:
+        await profile.await_("github")
+        number = next(_pr_numbers)
+        return {"url": f"https://github.com/bench/salesforce/pull/{number}", "number": number}
+
+    return open_pr
+
+
+# ---------- Git ----------
+
+def local_git_remote(root: str, classes: List[Dict[str, Any]]) -> str:
+    """A working copy of the Apex classes with a local bare repo as `origin`; returns its path."""
+    remote = os.path.join(root, "remote.git")
+    work = os.path.join(root, "work")
+    classes_dir = os.path.join(work, "force-app", "main", "default", "classes")
+
+    def git(*args, cwd=work):
+        subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+    os.makedirs(classes_dir, exist_ok=True)
+    git("init", "--bare", "-b", "main", remote, cwd=root)
+    git("init", "-b", "main")
+    git("config", "user.email", "bench@localhost")
+    git("config", "user.name", "bench")
+    for c in classes:
+        with open(os.path.join(classes_dir, f"{c['Name']}.cls"), "w", encoding="utf-8") as f:
+            f.write(c["Body"])
+    git("add", ".")
+    git("commit", "-q", "-m", "Synthetic Apex corpus")
+    git("remote", "add", "origin", remote)
+    git("push", "-q", "-u", "origin", "main")
+    return work
@@ -0,0 +1,51 @@
+"""
+Per-event orchestrator setup overhead.
+
+Compares what every event used to pay (compiling a fresh AgentOrchestrator,
+i.e. five deep-agent graphs) against fetching the shared, prebuilt one.
+No LLM calls are made; only graph construction is timed.
+
+    python -m agents.benchmarks.orchestrator_setup --events 20
+"""
+import argparse
+import statistics
+import time
+
+from agents.coordinator.agent import AgentOrchestrator, get_orchestrator
+
+
+def time_calls(fn, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<28} mean={statistics.mean(samples):9.3f} ms  "
+        f"median={statistics.median(samples):9.3f} ms  max={max(samples):9.3f} ms"
+    )
+
+
+def main(events: int) -> None:
+    start = time.perf_counter()
+    get_orchestrator(rebuild=True)
+    print(f"warm-up build: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    rebuilt = time_calls(AgentOrchestrator, events)
+    shared = time_calls(get_orchestrator, events)
+
+    report("rebuild per event", rebuilt)
+    report("shared prebuilt graph", shared)
+    saved = statistics.mean(rebuilt) - statistics.mean(shared)
+    print(f"\nsetup overhead removed per event: {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+    main(args.events)
@@ -0,0 +1,242 @@
+"""
+Offline replay benchmark for the full agent pipeline.
+
+Replays a corpus through the worker's `handle_task` (scheduler, orchestrator,
+result building, publish) or straight through `arun_orchestrator`, with every
+external dependency replaced by a local fake from fakes.py. Reports
+events/sec and p50/p95/p99 per stage for each concurrency level, so
+throughput and latency regressions show up before production.
+
+Corpus: agents/trash/errors.csv (with --variants synthetic variants per row)
+and/or recorded production events (--events, one JSON ErrorPayload per line).
+
+    python -m agents.benchmarks.replay --concurrency 1,4,16 --variants 3
+    python -m agents.benchmarks.replay --entry orchestrator --latency llm=lognormal:2000,0.6 --fail llm=0.05
+    python -m agents.benchmarks.replay --apply --concurrency 1   # adds git + GitHub on a local remote
+
+Runs in pipeline mode (ORCHESTRATOR_MODE=pipeline): the fake chat model
+scripts stage outputs, not the deep-agent coordinator's tool routing.
+The fix-application stage is off unless --apply is given; it shares one git
+working copy across events, as the worker does.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from agents.benchmarks import fakes
+
+STAGES = ("context-retrieval", "fix-proposal", "judge-fix", "create_jira_bug", "fix-application")
+
+
+# ---------- Setup ----------
+
+def configure_env(args, repo_path: str) -> None:
+    """Settings the agents read at import time; must run before any agents module is imported."""
+    os.environ.update({
+        "ORCHESTRATOR_MODE": "pipeline",
+        "PIPELINE_APPLY_FIXES": "true" if args.apply else "false",
+        "CHECKPOINT_BACKEND": "none",
+        "FIX_REUSE_ENABLED": "false",
+        "LLM_CACHE_ENABLED": "false",
+        "REPO_PATH": repo_path,
+        # Caches and artifacts go to the temp dir, not the real data dir.
+        "AGENT_DATA_DIR": os.path.join(os.path.dirname(repo_path), "data"),
+        "WORKER_MAX_CONCURRENCY": str(max(args.levels)),
+    })
+    for key in ("SF_USERNAME", "SF_PASSWORD", "WEAVIATE_URL", "AGENT_TRACE_FILE"):
+        os.environ.pop(key, None)
+    # Model clients validate that a key exists; the fakes never use it.
+    for key in ("OPR1", "OPR2", "OPR3", "OPR4", "OPR5", "GOOGLE_API_KEY", "TAVILY_API_KEY"):
+        os.environ.setdefault(key, "offline")
+
+
+def install_fakes(args, profiles: Dict[str, fakes.Profile], rows, classes) -> None:
+    import agents.LLMs as llms
+
+    def fake_model(name: str):
+        model = fakes.FakeChatModel(model_name=f"fake-{name}", profile=profiles["llm"], approve_rate=args.approve_rate)
+        if not llms.LLM_ROUTER_ENABLED:
+            return model
+        # Through the router, so injected 429s exercise cooldowns and failover.
+        alternate = fakes.FakeChatModel(model_name=f"fake-{name}-alt", profile=profiles["llm"],
+                                        approve_rate=args.approve_rate)
+        return llms.route(model, "fake", f"FAKE_{name.upper()}", alternates=[(alternate, "fake-alt", "FAKE_ALT")])
+
+    for name in ("coordinator_brain_gemini", "coordinator_brain_openrouter", "context_retrieval_brain_openrouter",
+                 "fix_proposal_brain_openrouter", "judge_brain_openrouter", "fix_application_brain_openrouter"):
+        setattr(llms, name, fake_model(name.split("_brain")[0]))
+
+    import agents.context_retrieval.agent as context
+    context.client = fakes.FakeWeaviate(rows, profiles["weaviate"])
+    context.tavily_client = fakes.FakeTavily(rows, profiles["tavily"])
+    context.sf = fakes.FakeSalesforce(classes, profiles["sf"])
+
+    import agents.tools.jira.create_jira as jira
+    jira.create_jira_bug, jira.acreate_jira_bug = fakes.fake_jira(profiles["jira"])
+
+    import agents.tools.github.github as github
+    github._agithub_open_pr = fakes.fake_github(profiles["github"])
+
+
+class FakeProducer:
+    def __init__(self, profile: fakes.Profile):
+        self.profile = profile
+        self.results: Dict[Any, dict] = {}
+
+    async def send_and_wait(self, topic: str, value: bytes, **kwargs) -> None:
+        await self.profile.await_("publish")
+        payload = json.loads(value)
+        self.results[payload.get("event_id")] = payload
+
+
+# ---------- Runs ----------
+
+async def run_worker_level(events: List[dict], level: int, producer: FakeProducer) -> List[dict]:
+    import agents.worker as worker
+
+    async def publish(producer_, event_id, payload):
+        # No Postgres: publishing is the end of the line.
+        await producer_.send_and_wait(worker.OUTPUT_TOPIC, worker.canonical_bytes(payload))
+
+    async def remember(event, payload):
+        return None
+
+    worker.publish_and_resolve = publish
+    worker.fix_store.remember = remember
+    worker.scheduler.slots = level
+
+    async def one(i: int, event: dict) -> dict:
+        msg = SimpleNamespace(topic=worker.INPUT_TOPIC, partition=0, offset=i, key=None, headers=[],
+                              value=json.dumps(event).encode("utf-8"))
+        start = time.perf_counter()
+        try:
+            await worker.handle_task(producer, msg)
+            ok = True
+        except Exception as e:
+            print(f"  event {event.get('referenceId')} failed: {e}")
+            ok = False
+        payload = producer.results.get(event.get("referenceId")) or {}
+        return {"ok": ok, "seconds": time.perf_counter() - start, "timings": payload.get("timings") or {}}
+
+    return await asyncio.gather(*(one(i, e) for i, e in enumerate(events)))
+
+
+async def run_orchestrator_level(events: List[dict], level: int) -> List[dict]:
+    from agents.coordinator.agent import arun_orchestrator
+    from agents.core.results import RunRecorder
+    from agents.worker import build_problem
+
+    gate = asyncio.Semaphore(level)
+
+    async def one(event: dict) -> dict:
+        async with gate:
+            recorder = RunRecorder()
+            start = time.perf_counter()
+            try:
+                await arun_orchestrator(build_problem(event), event.get("referenceId"),
+                                        config={"callbacks": [recorder]}, event=event)
+                ok = True
+            except Exception as e:
+                print(f"  event {event.get('referenceId')} failed: {e}")
+                ok = False
+            return {"ok": ok, "seconds": time.perf_counter() - start,
+                    "timings": {"total_s": recorder.elapsed_s, "stages": recorder.stages}}
+
+    return await asyncio.gather(*(one(e) for e in events))
+
+
+# ---------- Report ----------
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def report(level: int, samples: List[dict], wall_s: float) -> None:
+    ok = [s for s in samples if s["ok"]]
+    print(f"\nconcurrency={level}  events={len(samples)}  failed={len(samples) - len(ok)}  "
+          f"wall={wall_s:.2f}s  throughput={len(ok) / wall_s:.2f} events/s")
+    print(f"  {'stage':<20}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+
+    rows = [("end-to-end", [s["seconds"] for s in ok]),
+            ("orchestrator", [s["timings"]["total_s"] for s in ok if s["timings"].get("total_s") is not None])]
+    for stage in STAGES:
+        rows.append((stage, [
+            s["timings"]["stages"][stage]["seconds"] / max(s["timings"]["stages"][stage]["calls"], 1)
+            for s in ok if stage in (s["timings"].get("stages") or {})
+        ]))
+    for name, values in rows:
+        if values:
+            ms = [v * 1000 for v in values]
+            print(f"  {name:<20}{len(ms):>6}{percentile(ms, 0.50):>10.1f}{percentile(ms, 0.95):>10.1f}"
+                  f"{percentile(ms, 0.99):>10.1f}{statistics.mean(ms):>10.1f}")
+
+
+# ---------- Main ----------
+
+def parse_profiles(latency: List[str], fail: List[str]) -> Dict[str, fakes.Profile]:
+    profiles = dict(fakes.DEFAULT_PROFILES)
+    for item in latency:
+        name, _, spec = item.partition("=")
+        old = profiles[name]
+        profiles[name] = fakes.Profile.parse(spec)
+        profiles[name].fail_rate, profiles[name].fail_status = old.fail_rate, old.fail_status
+    for item in fail:
+        name, _, rate = item.partition("=")
+        profiles[name].fail_rate = float(rate)
+    return profiles
+
+
+def load_events(args, rows) -> List[dict]:
+    events = fakes.synthetic_events(rows, args.variants) if args.variants else []
+    for path in args.events or []:
+        with open(path, "r", encoding="utf-8") as f:
+            events += [json.loads(line) for line in f if line.strip()]
+    return events[: args.limit] if args.limit else events
+
+
+async def main(args) -> None:
+    rows = fakes.load_corpus()
+    events = load_events(args, rows)
+    classes = fakes.apex_corpus(events, args.filler_classes)
+    profiles = parse_profiles(args.latency, args.fail)
+
+    with tempfile.TemporaryDirectory(prefix="talos-replay-") as root:
+        repo = fakes.local_git_remote(root, classes)
+        configure_env(args, repo)
+        install_fakes(args, profiles, rows, classes)
+
+        print(f"{len(events)} events, {len(classes)} Apex classes, entry={args.entry}, apply={args.apply}")
+        for level in args.levels:
+            # Fresh ids per level so published results don't collide.
+            batch = [dict(e, referenceId=f"{e.get('referenceId')}-c{level}") for e in events]
+            start = time.perf_counter()
+            if args.entry == "worker":
+                samples = await run_worker_level(batch, level, FakeProducer(profiles["publish"]))
+            else:
+                samples = await run_orchestrator_level(batch, level)
+            report(level, samples, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entry", choices=("worker", "orchestrator"), default="worker")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--variants", type=int, default=1, help="Synthetic events per errors.csv row (0: none)")
+    parser.add_argument("--events", action="append", help="JSONL file of recorded events (repeatable)")
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most this many events per level")
+    parser.add_argument("--filler-classes", type=int, default=200, help="Unrelated ApexClass records in the fake org")
+    parser.add_argument("--approve-rate", type=float, default=0.8, help="Share of judge verdicts that approve")
+    parser.add_argument("--apply", action="store_true", help="Run fix-application against the local git remote")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="service=dist:params in ms, e.g. llm=lognormal:1200,0.5 or sf=fixed:50")
+    parser.add_argument("--fail", action="append", default=[], help="service=rate, e.g. llm=0.05")
+    args = parser.parse_args()
+    args.levels = [int(c) for c in args.concurrency.split(",") if c]
+    asyncio.run(main(args))
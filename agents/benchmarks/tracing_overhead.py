@@ -0,0 +1,45 @@
+"""
+Cost of one tracing span.
+
+Times a no-op function with and without `@traced` (metrics only, or metrics
+plus the JSONL sink when AGENT_TRACE_FILE is set) and reports the per-span
+overhead against a reference stage latency.
+
+    python -m agents.benchmarks.tracing_overhead --calls 100000 --stage-ms 200
+"""
+import argparse
+import time
+
+from agents.core.tracing import traced
+
+
+def noop():
+    return "x" * 64
+
+
+def per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--stage-ms", type=float, default=200.0,
+                        help="Typical duration of the cheapest traced stage (e.g. a Weaviate query)")
+    args = parser.parse_args()
+
+    plain = per_call_us(noop, args.calls)
+    with_span = per_call_us(traced("benchmark_noop")(noop), args.calls)
+    overhead = with_span - plain
+
+    print(f"plain call            {plain:8.2f} us")
+    print(f"traced call           {with_span:8.2f} us")
+    print(f"overhead per span     {overhead:8.2f} us")
+    print(f"share of a {args.stage_ms:.0f} ms stage  {overhead / (args.stage_ms * 1000) * 100:8.4f} %")
+
+
+if __name__ == "__main__":
+    main()
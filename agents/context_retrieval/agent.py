@@ -3,10 +3,14 @@ import sys
 import os
 import json
 import re
+import asyncio
+import time
 from typing import Optional, List, Tuple, Dict, Any
 from datetime import datetime
+import requests
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
+from prometheus_client import Histogram
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
@@ -14,12 +18,35 @@ from deepagents import create_deep_agent
 from langchain_core.tools import StructuredTool
 import weaviate
 from weaviate.auth import Auth
-from agents.LLMs import context_retrieval_brain_openrouter,coordinator_brain_gemini  # This should be an instance
+from weaviate.classes.init import AdditionalConfig, Timeout
+from agents.core.context_cache import DESCRIBE, TAVILY, WEAVIATE, context_cache, normalize_query
+from agents.core.offload import run_blocking
+from agents.core.tracing import traced
+from agents.context_retrieval.apex_cache import APEX_CACHE_ENABLED, ApexClassCache
+from agents.context_retrieval.apex_index import ApexReferenceIndex, detect_sobject
+from agents.context_retrieval.packer import budget_for, pack_salesforce_context, parse_stack_trace
+from agents.LLMs import context_retrieval_brain_openrouter,coordinator_brain_gemini,fix_proposal_brain_openrouter  # This should be an instance
 from tavily import TavilyClient
 from simple_salesforce import Salesforce, SalesforceAuthenticationFailed
 
 load_dotenv()
 
+# Retrieval runs Weaviate, web and Salesforce concurrently; each source gets its
+# own deadline, all of them bounded by the overall SLO. Late sources are reported, not awaited.
+CONTEXT_SLO_S = float(os.getenv("CONTEXT_SLO_S", "20"))
+SOURCE_DEADLINES_S = {
+    "weaviate": float(os.getenv("CONTEXT_DEADLINE_WEAVIATE_S", "5")),
+    "web": float(os.getenv("CONTEXT_DEADLINE_WEB_S", "8")),
+    "salesforce": float(os.getenv("CONTEXT_DEADLINE_SALESFORCE_S", "15")),
+}
+
+CONTEXT_SOURCE_SECONDS = Histogram(
+    "agent_context_source_seconds",
+    "Context retrieval time per source and outcome",
+    ["source", "status"],  # ok | timeout | error | skipped
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 10, 15, 20, 30),
+)
+
 # ========================================
 # AGENT PROMPT
 # ========================================
@@ -41,6 +68,8 @@ try:
     client = weaviate.connect_to_weaviate_cloud(
         cluster_url=WEAVIATE_URL,
         auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
+        # Lets the thread finish soon after its retrieval deadline instead of hanging on
+        additional_config=AdditionalConfig(timeout=Timeout(query=int(SOURCE_DEADLINES_S["weaviate"]) + 1)),
     )
     print("Weaviate ready:", client.is_ready())
 except Exception as e:
@@ -48,6 +77,9 @@ except Exception as e:
 
 CLASS_NAME = "Errors"
 
+# Token budget of the Salesforce context, sized for the model that reads it first.
+CONTEXT_BUDGET = budget_for(getattr(fix_proposal_brain_openrouter, "model_name", None))
+
 def close_client():
     global client
     try:
@@ -79,13 +111,27 @@ SF_USERNAME = os.getenv("SF_USERNAME")
 SF_PASSWORD = os.getenv("SF_PASSWORD")
 SF_SECURITY_TOKEN = os.getenv("SF_SECURITY_TOKEN")
 
+class TimeoutSession(requests.Session):
+    """requests.Session with a default timeout; simple_salesforce sets none, so a hung call holds its pool thread."""
+
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(*args, **kwargs)
+
 sf = None
 try:
     if SF_USERNAME and SF_PASSWORD:
         sf = Salesforce(
             username=SF_USERNAME,
             password=SF_PASSWORD,
-            security_token=SF_SECURITY_TOKEN
+            security_token=SF_SECURITY_TOKEN,
+            # Lets the thread finish soon after its retrieval deadline instead of hanging on
+            session=TimeoutSession(SOURCE_DEADLINES_S["salesforce"] + 1),
         )
         print("✅ Salesforce connection established.")
     else:
@@ -110,50 +156,73 @@ class ErrorInput(BaseModel):
 # ========================================
 # SEARCH FUNCTIONS
 # ========================================
+def cached(namespace, key: str, loader):
+    """Through the context cache when it is on; loader errors are not cached."""
+    if context_cache is None:
+        return loader()
+    return context_cache.get_or_load(namespace, key, loader)
+
 def search_weaviate(query: str) -> List[Dict[str, str]]:
     if not client:
         return []
 
     try:
-        collection = client.collections.use(CLASS_NAME)
-        response = collection.query.near_text(
-            query=query,
-            limit=3,
-            return_properties=["error", "solution", "category"],
-        )
-
-        results = []
-        for obj in response.objects or []:
-            p = obj.properties or {}
-            results.append({
-                "error": p.get("error", ""),
-                "solution": p.get("solution", ""),
-                "category": p.get("category", ""),
-            })
-        return results
+        return cached_weaviate(query)
     except Exception as e:
         print("Weaviate search error:", e)
         return []
 
+@traced("search_weaviate")
+def cached_weaviate(query: str) -> List[Dict[str, str]]:
+    """search_weaviate without the fallback: errors propagate (and are never cached)."""
+    return cached(WEAVIATE, f"{CLASS_NAME}:3:{normalize_query(query)}", lambda: _search_weaviate(query))
+
+def _search_weaviate(query: str) -> List[Dict[str, str]]:
+    collection = client.collections.use(CLASS_NAME)
+    response = collection.query.near_text(
+        query=query,
+        limit=3,
+        return_properties=["error", "solution", "category"],
+    )
+
+    results = []
+    for obj in response.objects or []:
+        p = obj.properties or {}
+        results.append({
+            "error": p.get("error", ""),
+            "solution": p.get("solution", ""),
+            "category": p.get("category", ""),
+        })
+    return results
+
 def search_web(query: str, max_results: int = 3) -> List[Dict[str, str]]:
     if not tavily_client:
         return []
 
     try:
-        resp = tavily_client.search(
-            query=query,
-            max_results=max_results,
-            search_depth="basic",
-            include_raw_content=False,
-        )
-        return [{
-            "title": r.get("title", ""),
-            "content": r.get("content", "")
-        } for r in resp.get("results", [])]
+        return cached_web(query, max_results)
     except Exception as e:
         print("Web search error:", e)
         return []
 
+@traced("tavily_search")
+def cached_web(query: str, max_results: int = 3) -> List[Dict[str, str]]:
+    """search_web without the fallback: errors propagate (and are never cached)."""
+    return cached(TAVILY, f"{max_results}:{normalize_query(query)}", lambda: _search_web(query, max_results))
+
+def _search_web(query: str, max_results: int) -> List[Dict[str, str]]:
+    resp = tavily_client.search(
+        query=query,
+        max_results=max_results,
+        search_depth="basic",
+        include_raw_content=False,
+        timeout=SOURCE_DEADLINES_S["web"] + 1,
+    )
+    return [{
+        "title": r.get("title", ""),
+        "content": r.get("content", "")
+    } for r in resp.get("results", [])]
+
 # ======================================================
 # SUMMARIZATION (RULE-BASED, FAST, SAFE)
 # ======================================================
@@ -187,9 +256,6 @@ def summarize_web(items: List[Dict[str, str]]) -> Dict[str, Any]:
 # SALESFORCE HELPERS & FIELD DETECTION
 # ========================================
 
-# simple in-memory cache for sObject describe() results (per process)
-_DESCRIBE_CACHE: Dict[str, Dict[str, Any]] = {}
-
 # Field synonyms for common mappings (expand as you encounter more cases)
 FIELD_SYNONYMS = {
     "Contact": {
@@ -244,19 +310,19 @@ def extract_missing_fields_from_message(message: str) -> List[str]:
 
     return list(fields)
 
+@traced()
 def get_sobject_fields_metadata(sobject_api_name: str) -> Dict[str, Any]:
     """
     Return a mapping apiName -> metadata for fields on the sObject.
-    Uses a simple in-memory cache to avoid repeated describe calls.
+    Describes go through the context cache (API names are case-insensitive);
+    an object that can't be described is retried after the negative TTL.
     """
     if not sf or not sobject_api_name:
         return {}
 
-    # Normalize: try to use passed form (e.g., Contact, Account)
-    cache_key = sobject_api_name
-    if cache_key in _DESCRIBE_CACHE:
-        return _DESCRIBE_CACHE[cache_key]
+    return cached(DESCRIBE, sobject_api_name.lower(), lambda: _describe_fields(sobject_api_name))
 
+def _describe_fields(sobject_api_name: str) -> Dict[str, Any]:
     desc = None
     try:
         # simple_salesforce exposes objects as attributes: sf.Contact.describe()
@@ -284,7 +350,6 @@ def get_sobject_fields_metadata(sobject_api_name: str) -> Dict[str, Any]:
                 continue
 
     if not desc:
-        _DESCRIBE_CACHE[cache_key] = {}
         return {}
 
     fields_meta = {}
@@ -299,7 +364,6 @@ def get_sobject_fields_metadata(sobject_api_name: str) -> Dict[str, Any]:
             "deprecatedAndHidden": f.get("deprecatedAndHidden", False)
         }
 
-    _DESCRIBE_CACHE[cache_key] = fields_meta
     return fields_meta
 
 def map_requested_field_to_api(sobject: str, requested: str, sobject_fields: Dict[str, Any]) -> Tuple[str, List[str]]:
@@ -342,10 +406,21 @@ def map_requested_field_to_api(sobject: str, requested: str, sobject_fields: Dic
     candidates = list(dict.fromkeys(candidates))
     return (candidates[0] if candidates else "", candidates)
 
+# Local, incrementally synced copy of ApexClass (worker keeps it current in the background)
+apex_cache = ApexClassCache(lambda: sf) if APEX_CACHE_ENABLED else None
+# Tests and sObjects per class, re-indexed as the cache picks up changed classes
+apex_index = None
+if apex_cache is not None:
+    apex_index = ApexReferenceIndex()
+    apex_cache.subscribe(apex_index.apply)
+
+@traced()
 def get_apex_classes() -> List[Dict[str, Any]]:
     """Retrieve ApexClass Id, Name, Body (full body)"""
     if not sf:
         return []
+    if apex_cache is not None:
+        return apex_cache.all()
     try:
         result = sf.query_all("SELECT Id, Name, Body FROM ApexClass")
         return result.get("records", [])
@@ -353,6 +428,15 @@ def get_apex_classes() -> List[Dict[str, Any]]:
         print("❌ Error fetching Apex classes:", e)
         return []
 
+def get_apex_class(name: str) -> Optional[Dict[str, Any]]:
+    """One ApexClass by name, without listing the org when the cache is on."""
+    if not sf or not name:
+        return None
+    if apex_cache is not None:
+        return apex_cache.get(name)
+    return next((a for a in get_apex_classes() if a.get("Name") == name), None)
+
+@traced()
 def get_test_classes(related_class_name: Optional[str] = None,
                      related_sobject: Optional[str] = None) -> List[Dict[str, Any]]:
     """
@@ -363,7 +447,13 @@ def get_test_classes(related_class_name: Optional[str] = None,
       - Detects references to sObject via plain name, __c form, List< SObject >, new SObject( ... )
       - Inclusion logic is tolerant: tests are included when either test-like markers OR references match,
         depending on which filters are provided.
+    With the Apex cache on, answered from the reference index instead of scanning every body.
     """
+    if apex_index is not None and sf:
+        apex_cache.ensure_fresh()
+        matched = (apex_cache.get(name) for name in apex_index.test_classes(related_class_name, related_sobject))
+        return [{"Id": a.get("Id"), "Name": a.get("Name"), "Body": a.get("Body")} for a in matched if a]
+
     apex_list = get_apex_classes()
     if not apex_list:
         return []
@@ -453,6 +543,7 @@ def get_test_classes(related_class_name: Optional[str] = None,
     return matched_tests
 
 
+@traced()
 def get_custom_objects() -> List[str]:
     if not sf:
         return []
@@ -465,26 +556,35 @@ def get_custom_objects() -> List[str]:
         print("❌ Error fetching custom objects:", e)
         return []
 
+# Describes most errors need; custom objects from the org are added at prefetch time
+PREFETCH_SOBJECTS = ["Contact", "Account", "Lead"]
+PREFETCH_MAX_CUSTOM_OBJECTS = int(os.getenv("CONTEXT_PREFETCH_MAX_CUSTOM_OBJECTS", "50"))
+
+def prefetch_describes() -> int:
+    """Warm the describe cache for the common sObjects and the org's custom objects."""
+    if not sf:
+        return 0
+    custom = [name for name in get_custom_objects() if name.endswith("__c")][:PREFETCH_MAX_CUSTOM_OBJECTS]
+    warmed = 0
+    for name in PREFETCH_SOBJECTS + custom:
+        try:
+            if get_sobject_fields_metadata(name):
+                warmed += 1
+        except Exception as e:
+            print(f"Describe prefetch failed for {name}:", e)
+    print(f"Prefetched {warmed} sObject describes")
+    return warmed
+
 def extract_class_name_from_trace(stack_trace: str) -> str:
-    if not stack_trace:
-        return ""
-    m = re.search(r"Class\.([A-Za-z0-9_]+)\.", stack_trace)
-    return m.group(1) if m else ""
+    for frame in parse_stack_trace(stack_trace):
+        if frame.kind == "Class":
+            return frame.class_name
+    return ""
 
 def detect_sobject_from_body(body: str) -> str:
-    if not body:
-        return ""
-    patterns = [
-        r"new\s+([A-Z][A-Za-z0-9_]+)\s*\(",
-        r"List<\s*([A-Z][A-Za-z0-9_]+)\s*>",
-        r"(?:insert|update|delete|upsert)\s+([A-Z][A-Za-z0-9_]+)"
-    ]
-    for p in patterns:
-        m = re.search(p, body, flags=re.IGNORECASE)
-        if m:
-            return m.group(1)
-    return ""
+    return detect_sobject(body)
 
+@traced()
 def retrieve_salesforce_context(input_json: Dict[str, Any]) -> Dict[str, Any]:
     """
     Enriched Salesforce context:
@@ -492,12 +592,15 @@ def retrieve_salesforce_context(input_json: Dict[str, Any]) -> Dict[str, Any]:
     - related_sobject (string)
     - missing_fields_detected (list)
     - missing_fields_enriched (list of dicts with mapping and metadata)
-    - test_classes (list)
+    - test_classes (list, most relevant first)
+    - packing (token budget report)
+    Class bodies are sliced around the stack frames to fit CONTEXT_BUDGET.
     """
     if not sf:
         return {}
 
     stack = input_json.get("stackTrace") or ""
+    frames = parse_stack_trace(stack)
     class_name = extract_class_name_from_trace(stack)
     guessed_sobject = None
 
@@ -511,13 +614,13 @@ def retrieve_salesforce_context(input_json: Dict[str, Any]) -> Dict[str, Any]:
         elif "lead" in text:
             guessed_sobject = "Lead"
 
-    apex_list = get_apex_classes()
-    faulty_class = next((a for a in apex_list if a.get("Name") == class_name), None) if class_name else None
+    faulty_class = get_apex_class(class_name) if class_name else None
 
     # detect sobject from the class body if possible, else use guessed
     sobject = ""
     if faulty_class:
-        sobject = detect_sobject_from_body(faulty_class.get("Body", "")) or ""
+        indexed = apex_index.refs(faulty_class.get("Name")) if apex_index is not None else None
+        sobject = (indexed.primary_sobject if indexed else detect_sobject_from_body(faulty_class.get("Body", ""))) or ""
     if not sobject and guessed_sobject:
         sobject = guessed_sobject
 
@@ -556,7 +659,7 @@ def retrieve_salesforce_context(input_json: Dict[str, Any]) -> Dict[str, Any]:
 
     test_classes = get_test_classes(related_class_name=class_name, related_sobject=sobject) if class_name or sobject else []
 
-    return {
+    return pack_salesforce_context({
         "faulty_class": {
             "Id": faulty_class.get("Id"),
             "Name": faulty_class.get("Name"),
@@ -566,13 +669,12 @@ def retrieve_salesforce_context(input_json: Dict[str, Any]) -> Dict[str, Any]:
         "missing_fields_detected": missing_fields,
         "missing_fields_enriched": fields_enriched,
         "test_classes": test_classes
-    }
+    }, frames, CONTEXT_BUDGET)
 
 # ========================================
 # COMBINED CONTEXT RETRIEVAL
 # ========================================
-def retrieve_context_from_json(input_json: Dict[str, Any]) -> Dict[str, Any]:
-    # Build a query string
+def build_query(input_json: Dict[str, Any]) -> str:
     query_parts = [
         input_json.get("message_short", ""),
         input_json.get("message", ""),
@@ -580,55 +682,105 @@ def retrieve_context_from_json(input_json: Dict[str, Any]) -> Dict[str, Any]:
         input_json.get("function", ""),
         input_json.get("source", "")
     ]
-    query = " | ".join([p for p in query_parts if p])
+    return " | ".join([p for p in query_parts if p])
 
-    vector_result = search_weaviate(query)
-    web_result = search_web(query)
 
-    # Add Salesforce context (enriched)
-    sf_context = {}
-    try:
-        sf_context = retrieve_salesforce_context(input_json)
-    except Exception as e:
-        print("Error retrieving Salesforce context:", e)
-        sf_context = {}
+async def _fetch_source(name: str, configured: bool, fn, arg, deadline_s: float) -> Tuple[Any, Dict[str, Any]]:
+    """One source under its deadline: (result or None, status block)."""
+    started = time.perf_counter()
+    result, status = None, "ok"
+    if not configured:
+        status = "skipped"
+    else:
+        try:
+            # The pool thread can't be interrupted; a late result is simply dropped.
+            result = await asyncio.wait_for(run_blocking(fn, arg), timeout=max(deadline_s, 0.0))
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except Exception as e:
+            print(f"Error retrieving {name} context:", e)
+            status = "error"
+    elapsed = time.perf_counter() - started
+    CONTEXT_SOURCE_SECONDS.labels(source=name, status=status).observe(elapsed)
+    block = {"status": status, "latency_ms": round(elapsed * 1000), "deadline_ms": round(deadline_s * 1000)}
+    if isinstance(result, (list, dict)):
+        block["items"] = len(result)
+    return result, block
+
+
+async def aretrieve_context_from_json(input_json: Dict[str, Any], slo_s: float = CONTEXT_SLO_S) -> Dict[str, Any]:
+    """
+    Weaviate, web and Salesforce retrieval in parallel. Returns whatever
+    arrived within each source's deadline (capped by `slo_s`), with a
+    per-source status/latency block; `partial` is set when any source failed.
+    """
+    query = build_query(input_json)
+    started = time.perf_counter()
+    sources = {
+        # The raising variants, so a failed search reports "error" instead of an empty hit list.
+        "weaviate": (client is not None, cached_weaviate, query),
+        "web": (tavily_client is not None, cached_web, query),
+        "salesforce": (sf is not None, retrieve_salesforce_context, input_json),
+    }
+    fetched = await asyncio.gather(*(
+        _fetch_source(name, configured, fn, arg, min(SOURCE_DEADLINES_S[name], slo_s))
+        for name, (configured, fn, arg) in sources.items()
+    ))
+    (vector_result, weaviate_status), (web_result, web_status), (sf_context, sf_status) = fetched
 
     return {
         "query": query,
         "retrieved_at": datetime.utcnow().isoformat() + "Z",
         "results": {
-            "weaviate": summarize_weaviate(vector_result),
-            "web": summarize_web(web_result),
+            "weaviate": summarize_weaviate(vector_result or []),
+            "web": summarize_web(web_result or []),
         },
-        "salesforce_context": sf_context
+        "salesforce_context": sf_context or {},
+        "sources": {"weaviate": weaviate_status, "web": web_status, "salesforce": sf_status},
+        "partial": any(b["status"] in ("timeout", "error") for _, b in fetched),
+        "latency_ms": round((time.perf_counter() - started) * 1000),
     }
 
+
+def retrieve_context_from_json(input_json: Dict[str, Any]) -> Dict[str, Any]:
+    # Sync callers (the tool's func) run outside any event loop.
+    return asyncio.run(aretrieve_context_from_json(input_json))
+
 # ========================================
 # MAIN TOOL FUNCTION - FIXED VERSION
 # ========================================
-def retrieve_salesforce_context_tool(error_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Main tool function with clean signature.
-    This will be called with {'error_data': {...}}
-    """
+def _error_dict(error_data: Any) -> Dict[str, Any]:
     if not error_data:
         error_data = {}
-    
+
     # Ensure we have a dict
     if isinstance(error_data, str):
         try:
             error_data = json.loads(error_data)
         except:
             error_data = {"input": error_data}
-    
+    return error_data
+
+
+def retrieve_salesforce_context_tool(error_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Main tool function with clean signature.
+    This will be called with {'error_data': {...}}
+    """
     # Call your existing function
-    return retrieve_context_from_json(error_data)
+    return retrieve_context_from_json(_error_dict(error_data))
+
+
+async def aretrieve_salesforce_context_tool(error_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Weaviate, Tavily and simple_salesforce are sync clients; each source runs on the bounded tool pool.
+    return await aretrieve_context_from_json(_error_dict(error_data))
 
 # ========================================
 # CREATE THE TOOL - CORRECT STRUCTURE
 # ========================================
 retriever_tool = StructuredTool.from_function(
     func=retrieve_salesforce_context_tool,
+    coroutine=aretrieve_salesforce_context_tool,
     name="retrieve_salesforce_context",
     description="Receive JSON input (error object), search Weaviate, web, and Salesforce, return top context.",
     args_schema=ErrorInput,
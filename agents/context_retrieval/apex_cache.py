@@ -0,0 +1,305 @@
+# agents/context_retrieval/apex_cache.py
+"""
+Local copy of the org's Apex classes.
+
+Every event used to download the full source of every ApexClass
+(`SELECT Id, Name, Body FROM ApexClass`), twice. The classes now live in a
+SQLite file that is loaded once and then kept current incrementally: each
+sync fetches only classes whose SystemModstamp is at or after the stored
+watermark, page by page (query / query_more) instead of buffering with
+query_all, and drops classes whose Id no longer exists. Lookups are served
+from an in-memory snapshot, so finding a class by name is a dict access.
+
+Lookups always serve the local copy; only a host with no copy yet syncs
+inline. The worker keeps it current on a background schedule (run_syncer);
+a process without a syncer refreshes a copy older than
+APEX_CACHE_MAX_STALENESS_S in a background thread. A failed sync keeps
+serving the last good copy and isn't retried for APEX_SYNC_RETRY_S.
+Subscribers (the reference index) are told which classes changed on every
+snapshot swap.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+from prometheus_client import Counter, Gauge
+
+from agents.core.config import data_path
+from agents.core.offload import run_blocking
+
+APEX_CACHE_ENABLED = os.getenv("APEX_CACHE_ENABLED", "true").lower() == "true"
+APEX_CACHE_PATH = os.getenv("APEX_CACHE_PATH") or data_path("apex_cache.sqlite3")
+APEX_SYNC_INTERVAL_S = int(os.getenv("APEX_SYNC_INTERVAL_S", "300"))
+APEX_CACHE_MAX_STALENESS_S = int(os.getenv("APEX_CACHE_MAX_STALENESS_S", "900"))
+# After a failed sync, lookups don't trigger another attempt for this long.
+APEX_SYNC_RETRY_S = int(os.getenv("APEX_SYNC_RETRY_S", "60"))
+# Salesforce accepts 200-2000; large Body fields make smaller pages safer.
+APEX_SYNC_PAGE_SIZE = int(os.getenv("APEX_SYNC_PAGE_SIZE", "200"))
+# Re-read changes this far behind the watermark, for transactions that committed late.
+APEX_SYNC_OVERLAP_S = int(os.getenv("APEX_SYNC_OVERLAP_S", "60"))
+
+FIELDS = ("Id", "Name", "Body", "LastModifiedDate", "SystemModstamp", "LengthWithoutComments")
+
+APEX_CACHE_SYNCS = Counter(
+    "agent_apex_cache_syncs_total",
+    "Apex class cache syncs by mode and outcome",
+    ["mode", "outcome"],  # mode: full | incremental
+)
+APEX_CACHE_RECORDS = Counter(
+    "agent_apex_cache_records_synced_total",
+    "ApexClass records fetched from Salesforce, and local records deleted",
+    ["change"],  # upserted | deleted
+)
+APEX_CACHE_SIZE = Gauge(
+    "agent_apex_cache_classes",
+    "Apex classes held in the local cache",
+)
+
+
+def soql_datetime(stamp: str, minus_s: int = 0) -> str:
+    """Salesforce's '2024-05-01T10:00:00.000+0000' as a SOQL literal, shifted back `minus_s`."""
+    moment = datetime.strptime(stamp[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    return (moment - timedelta(seconds=minus_s)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class ApexClassCache:
+    def __init__(self, client: Callable[[], Any], path: str = APEX_CACHE_PATH,
+                 page_size: int = APEX_SYNC_PAGE_SIZE, max_staleness_s: int = APEX_CACHE_MAX_STALENESS_S):
+        # A callable, so the Salesforce client can be created (or replaced) after this cache.
+        self.client = client
+        self.path = path
+        self.page_size = page_size
+        self.max_staleness_s = max_staleness_s
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[Callable[[List[Dict[str, Any]], List[str]], None]] = []
+        self._loaded = False
+        self._syncer_running = False
+        self.synced_at = 0.0
+        self.failed_at = 0.0
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS apex_class (
+                id                TEXT PRIMARY KEY,
+                name              TEXT NOT NULL,
+                body              TEXT,
+                last_modified     TEXT,
+                system_modstamp   TEXT,
+                length            INTEGER
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_apex_class_name ON apex_class (name COLLATE NOCASE)")
+        conn.execute("CREATE TABLE IF NOT EXISTS apex_sync (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL + busy timeout for other processes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM apex_sync WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO apex_sync (key, value) VALUES (?, ?)", (key, value))
+
+    # ---------- Reads ----------
+
+    def _load(self) -> None:
+        """Swap in a fresh snapshot of the SQLite table."""
+        rows = self._conn().execute(
+            "SELECT id, name, body, last_modified, system_modstamp, length FROM apex_class"
+        ).fetchall()
+        previous = self._by_name
+        self._by_name = {row[1].lower(): dict(zip(FIELDS, row)) for row in rows}
+        self._loaded = True
+        APEX_CACHE_SIZE.set(len(self._by_name))
+
+        changed = [
+            record for key, record in self._by_name.items()
+            if key not in previous
+            or (previous[key]["Id"], previous[key]["SystemModstamp"]) != (record["Id"], record["SystemModstamp"])
+        ]
+        removed = [previous[key]["Name"] for key in previous.keys() - self._by_name.keys()]
+        if changed or removed:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber(changed, removed)
+                except Exception as e:
+                    logger.warning(f"⚠ Apex cache subscriber failed: {e}")
+
+    def subscribe(self, callback: Callable[[List[Dict[str, Any]], List[str]], None]) -> None:
+        """`callback(changed_records, removed_names)` after each snapshot swap, and now for the current one."""
+        self._subscribers.append(callback)
+        if self._by_name:
+            callback(list(self._by_name.values()), [])
+
+    def _backing_off(self) -> bool:
+        return time.time() - self.failed_at < APEX_SYNC_RETRY_S
+
+    def ensure_fresh(self) -> None:
+        """Load the local copy on first use. Blocks on Salesforce only when this host has never synced."""
+        if not self._loaded:
+            self._load()
+            self.synced_at = float(self._meta("synced_at") or 0)
+        if self._backing_off():
+            return
+
+        if not self.synced_at:
+            with self._sync_lock:
+                # Another thread may have finished (or failed) the first sync while we waited.
+                if not self.synced_at and not self._backing_off():
+                    self._sync()
+            return
+
+        if self._syncer_running or time.time() - self.synced_at <= self.max_staleness_s:
+            return
+        if self._sync_lock.acquire(blocking=False):
+            threading.Thread(target=self._sync_in_background, name="apex-cache-sync", daemon=True).start()
+
+    def _sync_in_background(self) -> None:
+        # Runs with _sync_lock already held by ensure_fresh.
+        try:
+            self._sync()
+        except Exception as e:
+            logger.warning(f"⚠ Apex class sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """The class called `name` (Apex names are case-insensitive), or None."""
+        if not name:
+            return None
+        self.ensure_fresh()
+        return self._by_name.get(name.lower())
+
+    def all(self) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        return list(self._by_name.values())
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    # ---------- Sync ----------
+
+    def _pages(self, sf, soql: str, page_size: Optional[int] = None):
+        """Yield record pages as Salesforce returns them; only one page is held at a time."""
+        headers = {"Sforce-Query-Options": f"batchSize={page_size or self.page_size}"}
+        result = sf.query(soql, headers=headers)
+        while True:
+            yield result.get("records", [])
+            if result.get("done", True) or not result.get("nextRecordsUrl"):
+                return
+            result = sf.query_more(result["nextRecordsUrl"], identifier_is_url=True, headers=headers)
+
+    def _upsert(self, records: List[Dict[str, Any]]) -> None:
+        rows = [
+            (r.get("Id"), r.get("Name"), r.get("Body"), r.get("LastModifiedDate"),
+             r.get("SystemModstamp"), r.get("LengthWithoutComments"))
+            for r in records if r.get("Id") and r.get("Name")
+        ]
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            # A renamed class keeps its Id; a recreated one keeps its name.
+            conn.executemany("DELETE FROM apex_class WHERE id = ? OR name = ? COLLATE NOCASE",
+                             [(row[0], row[1]) for row in rows])
+            conn.executemany(
+                "INSERT INTO apex_class (id, name, body, last_modified, system_modstamp, length) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        APEX_CACHE_RECORDS.labels(change="upserted").inc(len(rows))
+
+    def _drop_deleted(self, sf) -> int:
+        """Remove local classes whose Id is gone from the org (an Id-only query, no bodies)."""
+        live = set()
+        for page in self._pages(sf, "SELECT Id FROM ApexClass", page_size=2000):
+            live.update(r["Id"] for r in page)
+        local = {row[0] for row in self._conn().execute("SELECT id FROM apex_class")}
+        gone = local - live
+        if gone:
+            self._conn().executemany("DELETE FROM apex_class WHERE id = ?", [(i,) for i in gone])
+            APEX_CACHE_RECORDS.labels(change="deleted").inc(len(gone))
+        return len(gone)
+
+    def sync(self, full: bool = False) -> int:
+        """
+        Bring the local copy up to date; returns the number of classes fetched.
+        Without a watermark (first run) or with `full`, fetches everything.
+        """
+        with self._sync_lock:
+            return self._sync(full)
+
+    def _sync(self, full: bool = False) -> int:
+        """sync() with _sync_lock held."""
+        sf = self.client()
+        if sf is None:
+            return 0
+
+        watermark = None if full else self._meta("watermark")
+        mode = "incremental" if watermark else "full"
+        started = time.time()
+        soql = f"SELECT {', '.join(FIELDS)} FROM ApexClass"
+        if watermark:
+            soql += f" WHERE SystemModstamp >= {soql_datetime(watermark, APEX_SYNC_OVERLAP_S)}"
+        soql += " ORDER BY SystemModstamp"
+
+        fetched, newest = 0, watermark
+        try:
+            if full:
+                self._conn().execute("DELETE FROM apex_class")
+            for page in self._pages(sf, soql):
+                self._upsert(page)
+                fetched += len(page)
+                stamps = [r["SystemModstamp"] for r in page if r.get("SystemModstamp")]
+                if stamps:
+                    newest = max([newest, *stamps]) if newest else max(stamps)
+                # Progress survives an interrupted full load.
+                if newest:
+                    self._set_meta("watermark", newest)
+            deleted = self._drop_deleted(sf) if watermark else 0
+        except Exception as e:
+            self.failed_at = time.time()
+            APEX_CACHE_SYNCS.labels(mode=mode, outcome="error").inc()
+            logger.warning(f"⚠ Apex class sync ({mode}) failed, serving the cached copy: {e}")
+            if not self._loaded:
+                self._load()
+            return fetched
+
+        self.failed_at = 0.0
+        self.synced_at = started
+        self._set_meta("synced_at", str(started))
+        self._load()
+        APEX_CACHE_SYNCS.labels(mode=mode, outcome="ok").inc()
+        logger.info(f"📚 Apex class cache {mode} sync: {fetched} fetched, {deleted} deleted, "
+                    f"{len(self._by_name)} classes ({time.time() - started:.1f}s)")
+        return fetched
+
+    async def run_syncer(self, interval_s: int = APEX_SYNC_INTERVAL_S) -> None:
+        """Keep the copy current in the background (worker); lookups then never sync."""
+        self._syncer_running = True
+        while True:
+            try:
+                await run_blocking(self.sync)
+            except Exception as e:
+                logger.warning(f"⚠ Apex class sync failed: {e}")
+            await asyncio.sleep(interval_s)
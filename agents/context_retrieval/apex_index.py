@@ -0,0 +1,164 @@
+# agents/context_retrieval/apex_index.py
+"""
+Reference index over the cached Apex classes.
+
+Finding the tests for a failing class used to run several regexes over
+every class body in the org, per event. The index does that work once per
+class when the Apex cache picks it up (and again only when it changes):
+
+  class -> is_test, referenced types, referenced sObjects, primary sObject
+  type / sObject -> classes referencing it (reverse maps)
+
+so "tests referencing class C or sObject S" is a couple of set lookups.
+References are identifiers, compared case-insensitively as Apex does:
+capitalized names (class and sObject names by convention, `__c` included)
+and the targets of `new X(`, `List<X>` and DML statements.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+_TYPE_NAME = re.compile(r"\b[A-Z][A-Za-z0-9_]*\b")
+_TEST_MARKERS = ("@istest", "testmethod", "system.assert")
+_TEST_METHOD = re.compile(r"\btest[A-Za-z0-9_]*\b")
+# In priority order: the first pattern that matches names the class's sObject.
+_SOBJECT_PATTERNS = (
+    re.compile(r"new\s+([A-Z][A-Za-z0-9_]+)\s*\(", re.IGNORECASE),
+    re.compile(r"List<\s*([A-Z][A-Za-z0-9_]+)\s*>", re.IGNORECASE),
+    re.compile(r"(?:insert|update|delete|upsert)\s+([A-Z][A-Za-z0-9_]+)", re.IGNORECASE),
+)
+# Platform types every class mentions; indexing them would only bloat the reverse map.
+_BUILTINS = frozenset(t.lower() for t in (
+    "System", "String", "Integer", "Long", "Decimal", "Double", "Boolean", "Date", "Datetime", "Time", "Id",
+    "Blob", "Object", "SObject", "List", "Map", "Set", "Schema", "Database", "Test", "Exception", "Math", "JSON",
+    "Limits", "UserInfo", "Trigger", "DmlException", "QueryException", "Http", "HttpRequest", "HttpResponse",
+))
+
+
+def is_test_class(body: str, name: str) -> bool:
+    """@isTest, testMethod, System.assert, a *Test name or a test* identifier."""
+    if not body:
+        return False
+    lowered = body.lower()
+    if any(marker in lowered for marker in _TEST_MARKERS):
+        return True
+    if name and name.lower().endswith("test"):
+        return True
+    return bool(_TEST_METHOD.search(body))
+
+
+def detect_sobject(body: str) -> str:
+    if not body:
+        return ""
+    for pattern in _SOBJECT_PATTERNS:
+        m = pattern.search(body)
+        if m:
+            return m.group(1)
+    return ""
+
+
+@dataclass(frozen=True)
+class ClassRefs:
+    name: str
+    is_test: bool
+    types: FrozenSet[str]      # lowercased type-like identifiers
+    sobjects: FrozenSet[str]   # lowercased new/List/DML targets
+    primary_sobject: str       # as written; what detect_sobject returns
+
+
+def extract_refs(record: Dict[str, Any]) -> ClassRefs:
+    name = record.get("Name") or ""
+    body = record.get("Body") or ""
+    types = {t.lower() for t in _TYPE_NAME.findall(body)} - _BUILTINS
+    types.discard(name.lower())
+    sobjects = {m.lower() for pattern in _SOBJECT_PATTERNS for m in pattern.findall(body)} - _BUILTINS
+    return ClassRefs(
+        name=name,
+        is_test=is_test_class(body, name),
+        types=frozenset(types),
+        sobjects=frozenset(sobjects),
+        primary_sobject=detect_sobject(body),
+    )
+
+
+class ApexReferenceIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._refs: Dict[str, ClassRefs] = {}
+        self._tests: Set[str] = set()
+        self._type_referrers: Dict[str, Set[str]] = {}
+        self._sobject_referrers: Dict[str, Set[str]] = {}
+
+    # ---------- Maintenance ----------
+
+    def _drop(self, key: str) -> None:
+        refs = self._refs.pop(key, None)
+        if refs is None:
+            return
+        self._tests.discard(key)
+        for reverse, targets in ((self._type_referrers, refs.types), (self._sobject_referrers, refs.sobjects)):
+            for target in targets:
+                referrers = reverse.get(target)
+                if referrers is not None:
+                    referrers.discard(key)
+                    if not referrers:
+                        del reverse[target]
+
+    def apply(self, changed: List[Dict[str, Any]], removed: List[str]) -> None:
+        """Apex cache subscriber: re-index changed classes, forget removed ones."""
+        # Regexes run outside the lock; only the dict updates hold it.
+        extracted = [extract_refs(record) for record in changed if record.get("Name")]
+        with self._lock:
+            for name in removed:
+                self._drop(name.lower())
+            for refs in extracted:
+                key = refs.name.lower()
+                self._drop(key)
+                self._refs[key] = refs
+                if refs.is_test:
+                    self._tests.add(key)
+                for target in refs.types:
+                    self._type_referrers.setdefault(target, set()).add(key)
+                for target in refs.sobjects:
+                    self._sobject_referrers.setdefault(target, set()).add(key)
+
+    # ---------- Queries ----------
+
+    def refs(self, name: str) -> Optional[ClassRefs]:
+        return self._refs.get((name or "").lower())
+
+    def referrers_of_class(self, name: str) -> Set[str]:
+        with self._lock:
+            return set(self._type_referrers.get(name.lower(), ()))
+
+    def referrers_of_sobject(self, sobject: str) -> Set[str]:
+        key = sobject.lower()
+        with self._lock:
+            found = set()
+            for candidate in (key, f"{key}__c"):
+                found |= self._type_referrers.get(candidate, set())
+                found |= self._sobject_referrers.get(candidate, set())
+            return found
+
+    def test_classes(self, related_class: Optional[str] = None, related_sobject: Optional[str] = None) -> List[str]:
+        """
+        Names of matching classes, with get_test_classes' inclusion rules:
+        both filters -> tests referencing either; one filter -> tests or
+        referencing classes; none -> all tests.
+        """
+        with self._lock:
+            by_class = self.referrers_of_class(related_class) if related_class else set()
+            by_sobject = self.referrers_of_sobject(related_sobject) if related_sobject else set()
+            if related_class and related_sobject:
+                keys = self._tests & (by_class | by_sobject)
+            elif related_class:
+                keys = self._tests | by_class
+            elif related_sobject:
+                keys = self._tests | by_sobject
+            else:
+                keys = self._tests
+            return sorted(self._refs[k].name for k in keys)
+
+    def __len__(self) -> int:
+        return len(self._refs)
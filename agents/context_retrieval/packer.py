@@ -0,0 +1,327 @@
+# agents/context_retrieval/packer.py
+"""
+Token-budgeted packing of the Salesforce context.
+
+The Apex stack trace names the exact methods and lines that failed, so the
+context passed to fix-proposal and judge-fix only needs those methods (or a
+line window around them), plus the few test classes most related to them.
+The packer slices the faulty class around every frame, ranks test classes,
+and fills a per-model token budget in priority order: the top frame first,
+then the other frames, then tests.
+
+A faulty class that fits its share of the budget is kept whole. Otherwise
+its Body becomes a line-numbered excerpt and `excerpt` is set; the
+fix-application agent then reads the full file from the repo before patching.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from prometheus_client import Histogram
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# Per-model overrides, e.g. "xiaomi/mimo-v2-flash:free=12000,mistralai/devstral-2512:free=24000".
+CONTEXT_TOKEN_BUDGETS = os.getenv("CONTEXT_TOKEN_BUDGETS", "")
+CONTEXT_TOP_K_TESTS = int(os.getenv("CONTEXT_TOP_K_TESTS", "3"))
+# Lines kept on each side of a frame line when its method can't be delimited.
+CONTEXT_LINE_WINDOW = int(os.getenv("CONTEXT_LINE_WINDOW", "15"))
+# Share of the budget the faulty class may use before it is sliced.
+FAULTY_CLASS_SHARE = float(os.getenv("CONTEXT_FAULTY_CLASS_SHARE", "0.6"))
+# Frames listed in the problem text; the rest are counted, not shown.
+MAX_PROBLEM_FRAMES = int(os.getenv("CONTEXT_MAX_PROBLEM_FRAMES", "20"))
+# Bound for stack traces without any parsable frame.
+PROBLEM_STACK_TOKENS = int(os.getenv("CONTEXT_PROBLEM_STACK_TOKENS", "500"))
+
+CHARS_PER_TOKEN = 4
+
+CONTEXT_TOKENS_SAVED = Histogram(
+    "agent_context_tokens_saved",
+    "Tokens removed from the Salesforce context by the packer, per event",
+    buckets=(0, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+
+_FRAME = re.compile(r"\b(?:(Class|Trigger)\.([\w.<>]+)|(AnonymousBlock)): line (\d+), column (\d+)")
+_STRING = re.compile(r"'(?:\\.|[^'\\])*'")
+_MODIFIERS = r"(?:(?:public|private|protected|global|static|override|virtual|abstract|final|testmethod|webservice)\s+|@\w+(?:\([^)]*\))?\s+)*"
+
+
+# ---------- Stack Trace ----------
+
+@dataclass(frozen=True)
+class StackFrame:
+    kind: str                  # "Class" | "Trigger" | "AnonymousBlock"
+    class_name: Optional[str]  # top-level class or trigger name
+    method: Optional[str]      # None for triggers and anonymous blocks
+    inner_class: Optional[str]
+    line: int
+    column: int
+
+    @property
+    def label(self) -> str:
+        if self.kind == "AnonymousBlock":
+            return f"AnonymousBlock: line {self.line}, column {self.column}"
+        path = ".".join(p for p in (self.class_name, self.inner_class, self.method) if p)
+        return f"{self.kind}.{path}: line {self.line}, column {self.column}"
+
+
+def parse_stack_trace(stack: str) -> List[StackFrame]:
+    """Every Apex frame in the trace, innermost first, without consecutive repeats."""
+    frames: List[StackFrame] = []
+    for m in _FRAME.finditer(stack or ""):
+        kind, path, anonymous, line, column = m.groups()
+        if anonymous:
+            frame = StackFrame("AnonymousBlock", None, None, None, int(line), int(column))
+        elif kind == "Trigger":
+            frame = StackFrame("Trigger", path, None, None, int(line), int(column))
+        else:
+            parts = path.split(".")
+            frame = StackFrame(
+                "Class",
+                parts[0],
+                parts[-1] if len(parts) > 1 else None,
+                parts[1] if len(parts) > 2 else None,
+                int(line),
+                int(column),
+            )
+        if not frames or frames[-1] != frame:
+            frames.append(frame)
+    return frames
+
+
+def format_frames(frames: List[StackFrame], limit: int = MAX_PROBLEM_FRAMES) -> str:
+    lines = [f"  {i}. {f.label}" for i, f in enumerate(frames[:limit], 1)]
+    if len(frames) > limit:
+        lines.append(f"  ... {len(frames) - limit} more frames")
+    return "\n".join(lines)
+
+
+# ---------- Token Budget ----------
+
+def estimate_tokens(value: Any) -> int:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return len(text) // CHARS_PER_TOKEN
+
+
+def budget_for(model_name: Optional[str]) -> int:
+    for item in CONTEXT_TOKEN_BUDGETS.split(","):
+        name, _, tokens = item.rpartition("=")
+        if name.strip() and name.strip() == model_name:
+            return int(tokens)
+    return CONTEXT_TOKEN_BUDGET
+
+
+# ---------- Slicing ----------
+
+def _code(line: str) -> str:
+    """Line without string literals and // comments, for brace counting."""
+    return _STRING.sub("''", line).split("//", 1)[0]
+
+
+def method_range(lines: List[str], method: str, line_hint: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """
+    1-based inclusive (start, end) of a method declaration, matched by braces.
+    With several overloads, the one containing `line_hint` wins.
+    """
+    name = "" if method == "<init>" else re.escape(method)
+    if not name:
+        return None
+    declaration = re.compile(rf"^\s*{_MODIFIERS}(?:[\w<>,\[\]\s.]+\s+)?{name}\s*\(")
+
+    ranges = []
+    for i, text in enumerate(lines):
+        if not declaration.match(text) or text.rstrip().endswith(";"):
+            continue
+        depth, opened = 0, False
+        for j in range(i, len(lines)):
+            code = _code(lines[j])
+            depth += code.count("{") - code.count("}")
+            opened = opened or "{" in code
+            if opened and depth <= 0:
+                ranges.append((i + 1, j + 1))
+                break
+
+    if not ranges:
+        return None
+    if line_hint:
+        for start, end in ranges:
+            if start <= line_hint <= end:
+                return start, end
+    return ranges[0]
+
+
+def _window(line: int, total: int) -> Tuple[int, int]:
+    return max(1, line - CONTEXT_LINE_WINDOW), min(total, line + CONTEXT_LINE_WINDOW)
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def render_excerpt(lines: List[str], ranges: List[Tuple[int, int]]) -> str:
+    """Numbered source lines for `ranges`, with markers where lines are left out."""
+    out, last = [], 0
+    for start, end in _merge(ranges):
+        if start > last + 1:
+            out.append(f"     ... lines {last + 1}-{start - 1} omitted")
+        out.extend(f"{n:>4}| {lines[n - 1]}" for n in range(start, end + 1))
+        last = end
+    if last < len(lines):
+        out.append(f"     ... lines {last + 1}-{len(lines)} omitted")
+    return "\n".join(out)
+
+
+def _header_range(lines: List[str]) -> List[Tuple[int, int]]:
+    for i, text in enumerate(lines):
+        if re.search(r"\b(class|trigger)\s+\w+", text, flags=re.IGNORECASE):
+            return [(i + 1, i + 1)]
+    return []
+
+
+def frame_ranges(lines: List[str], frames: List[StackFrame]) -> List[Tuple[int, int]]:
+    """Ranges for each frame in order: the whole method when found, else a line window."""
+    ranges = []
+    for f in frames:
+        found = method_range(lines, f.method, f.line) if f.method else None
+        if found and found[1] - found[0] <= 4 * CONTEXT_LINE_WINDOW:
+            ranges.append(found)
+        elif f.line <= len(lines):
+            ranges.append(_window(f.line, len(lines)))
+    return ranges
+
+
+def slice_class(body: str, frames: List[StackFrame], max_tokens: int) -> Tuple[str, int]:
+    """Excerpt of `body` around `frames`, adding frames in order while within `max_tokens`."""
+    lines = body.splitlines()
+    kept = _header_range(lines)
+    excerpt = render_excerpt(lines, kept)
+    used = 0
+    for r in frame_ranges(lines, frames):
+        candidate = render_excerpt(lines, kept + [r])
+        if used and estimate_tokens(candidate) > max_tokens:
+            break  # The top frame is always kept, even over budget.
+        kept.append(r)
+        excerpt, used = candidate, used + 1
+    return excerpt, used
+
+
+# ---------- Test Ranking ----------
+
+def rank_test_classes(tests: List[Dict[str, Any]], class_name: Optional[str],
+                      frames: List[StackFrame], sobject: Optional[str]) -> List[Dict[str, Any]]:
+    """Tests ordered by how directly they exercise the failing class and methods."""
+    methods = {f.method for f in frames if f.method and f.class_name == class_name and f.method != "<init>"}
+
+    def score(test: Dict[str, Any]) -> float:
+        body = test.get("Body") or ""
+        name = test.get("Name") or ""
+        s = 0.0
+        if class_name:
+            if name.lower() in (f"{class_name}test".lower(), f"{class_name}_test".lower(), f"test{class_name}".lower()):
+                s += 10
+            s += 3 * min(len(re.findall(rf"\b{re.escape(class_name)}\b", body)), 5)
+        for m in methods:
+            if re.search(rf"\.\s*{re.escape(m)}\s*\(", body):
+                s += 5
+        if sobject and re.search(rf"\b{re.escape(sobject)}\b", body):
+            s += 1
+        if "@istest" in body.lower():
+            s += 1
+        return s
+
+    return sorted(tests, key=score, reverse=True)
+
+
+def _test_ranges(lines: List[str], class_name: Optional[str], frames: List[StackFrame]) -> List[Tuple[int, int]]:
+    """Test methods that call into the failing class; the first window if none do."""
+    needles = [n for n in {class_name, *(f.method for f in frames if f.method)} if n and n != "<init>"]
+    ranges = []
+    for i, text in enumerate(lines):
+        if any(re.search(rf"\b{re.escape(n)}\b", text) for n in needles):
+            enclosing = None
+            for j in range(i, -1, -1):
+                m = re.match(rf"^\s*{_MODIFIERS}(?:[\w<>,\[\]\s.]+\s+)?(\w+)\s*\(", lines[j])
+                if m and not lines[j].rstrip().endswith(";") and m.group(1) not in ("if", "for", "while", "catch", "switch"):
+                    enclosing = method_range(lines, m.group(1), i + 1)
+                    break
+            ranges.append(enclosing or _window(i + 1, len(lines)))
+    return ranges or [(1, min(len(lines), 2 * CONTEXT_LINE_WINDOW))]
+
+
+# ---------- Packing ----------
+
+def pack_salesforce_context(context: Dict[str, Any], frames: List[StackFrame],
+                            budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+                            top_k_tests: int = CONTEXT_TOP_K_TESTS) -> Dict[str, Any]:
+    """
+    Copy of `context` that fits `budget_tokens`, with a `packing` report.
+    Everything but the faulty class and test bodies is kept as is.
+    """
+    if not context:
+        return context
+
+    original_tokens = estimate_tokens(context)
+    packed = {k: v for k, v in context.items() if k not in ("faulty_class", "test_classes")}
+    remaining = budget_tokens - estimate_tokens(packed)
+
+    faulty = context.get("faulty_class")
+    class_name = faulty.get("Name") if faulty else None
+    class_frames = [f for f in frames if f.kind == "Class" and f.class_name == class_name]
+    excerpt = False
+    if faulty:
+        body = faulty.get("Body") or ""
+        share = int(max(remaining, 0) * FAULTY_CLASS_SHARE)
+        if estimate_tokens(body) > share and class_frames:
+            body, _ = slice_class(body, class_frames, share)
+            excerpt = True
+        packed["faulty_class"] = {
+            "Id": faulty.get("Id"),
+            "Name": class_name,
+            "Body": body,
+            "excerpt": excerpt,
+            "total_lines": len((faulty.get("Body") or "").splitlines()),
+        }
+        remaining -= estimate_tokens(packed["faulty_class"])
+
+    tests = rank_test_classes(context.get("test_classes") or [], class_name, frames, context.get("related_sobject"))
+    kept_tests = []
+    for test in tests[:top_k_tests]:
+        lines = (test.get("Body") or "").splitlines()
+        entry = {
+            "Id": test.get("Id"),
+            "Name": test.get("Name"),
+            "Body": render_excerpt(lines, _header_range(lines) + _test_ranges(lines, class_name, class_frames)),
+            "excerpt": True,
+        }
+        cost = estimate_tokens(entry)
+        if cost > remaining:
+            break
+        kept_tests.append(entry)
+        remaining -= cost
+    packed["test_classes"] = kept_tests
+
+    packed_tokens = estimate_tokens(packed)
+    packed["packing"] = {
+        "budget_tokens": budget_tokens,
+        "original_tokens": original_tokens,
+        "packed_tokens": packed_tokens,
+        "tokens_saved": max(original_tokens - packed_tokens, 0),
+        "frames": [f.label for f in frames],
+        "faulty_class_excerpt": excerpt,
+        "tests_kept": len(kept_tests),
+        "tests_total": len(tests),
+    }
+    CONTEXT_TOKENS_SAVED.observe(packed["packing"]["tokens_saved"])
+    logger.info(
+        f"📦 Packed Salesforce context: {original_tokens} → {packed_tokens} tokens "
+        f"(budget {budget_tokens}, {len(kept_tests)}/{len(tests)} tests)"
+    )
+    return packed
@@ -1,10 +1,15 @@
 # orchestrator.py
 import sys, os
+import threading
+import uuid
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from deepagents import create_deep_agent, CompiledSubAgent
 from agents.LLMs import coordinator_brain_openrouter
+from agents.core.checkpoints import current_event_id, get_checkpointer, thread_id_for
+from agents.core.tracing import with_tracing
 from agents.context_retrieval.agent import build_agent as build_context_agent
+from agents.coordinator.pipeline import create_pipeline
 from agents.fix_proposal.agent import build_agent as build_fix_proposal_agent
 from agents.fix_application.agent import build_agent as build_fix_application_agent
 from agents.judge_fix.agent import build_agent as build_judge_fix_agent
@@ -19,13 +24,20 @@ prompt_file_path = os.path.join(BASE_DIR, "prompt.md")
 
 with open(prompt_file_path, "r", encoding="utf-8") as f:
     ORCHESTRATOR_PROMPT = f.read()
-def create_orchestrator(additional_tools=None, model=coordinator_brain_openrouter):
+
+# "agent": the coordinator LLM drives the subagents (prompt.md).
+# "pipeline": fixed LangGraph state machine, coordinator LLM only for ambiguous verdicts.
+ORCHESTRATOR_MODE = os.getenv("ORCHESTRATOR_MODE", "agent").lower()
+
+
+def create_orchestrator(additional_tools=None, model=coordinator_brain_openrouter, checkpointer=None):
     """
     Creates the orchestrator agent with sub-agents.
     
     Args:
         additional_tools: Optional list of extra tools to provide
         model: Optional model override for the orchestrator
+        checkpointer: Optional LangGraph checkpointer (durable resume per thread)
     
     Returns:
         The orchestrator agent
@@ -87,8 +99,9 @@ Detects hallucinations, scores quality, selects best fix, and approves or reject
     orchestrator = create_deep_agent(
         system_prompt=ORCHESTRATOR_PROMPT,
         subagents=subagents,
-        model=coordinator_brain_openrouter,
+        model=model or coordinator_brain_openrouter,
         tools=additional_tools or [jira_create_tool],
+        checkpointer=checkpointer,
         interrupt_on={
     "fix-application": {
         "*": {"reason": "Workflow completed"}
@@ -108,22 +121,61 @@ Detects hallucinations, scores quality, selects best fix, and approves or reject
 class AgentOrchestrator:
     """Orchestrates multiple agents in a coordinated workflow."""
     
-    def __init__(self, additional_tools=None, model=coordinator_brain_openrouter):
-        self.orchestrator = create_orchestrator(additional_tools, model)
+    def __init__(self, additional_tools=None, model=coordinator_brain_openrouter, checkpointer=None, mode=None):
+        self.checkpointer = checkpointer
+        self.mode = mode or ORCHESTRATOR_MODE
+        if self.mode == "pipeline":
+            self.orchestrator = create_pipeline(checkpointer)
+        else:
+            self.orchestrator = create_orchestrator(additional_tools, model, checkpointer)
+
+    def initial_state(self, problem_description, event=None):
+        state = {"messages": [{"role": "user", "content": problem_description}]}
+        if self.mode == "pipeline" and event is not None:
+            # Retrieval takes the error object itself rather than the problem text.
+            state["event"] = event
+        return state
     
-    def run(self, problem_description: str, config=None):
+    def run(self, problem_description: str, config=None, thread_id=None, event=None):
         """
         Execute the orchestrator workflow.
         
+        The compiled graph is shared between concurrent callers, so every
+        invocation gets its own config and thread id.
+        
         Args:
             problem_description: The bug description or stack trace
             config: Optional configuration dict
+            thread_id: Optional thread id (defaults to a fresh UUID)
+            event: Optional error object (used by the pipeline mode's retrieval)
         
         Returns:
             Final result from the orchestrator
         """
-        messages = [{"role": "user", "content": problem_description}]
-        return self.orchestrator.invoke({"messages": messages}, config=config)
+        return self.orchestrator.invoke(self.initial_state(problem_description, event),
+                                        config=invocation_config(config, thread_id))
+    
+    async def arun(self, problem_description: str, config=None, thread_id=None, event=None):
+        """
+        Async twin of `run`: drives the graph on the caller's event loop.
+        
+        Tools with a native coroutine (git, GitHub, Jira) run without a
+        thread; sync-only SDK tools are offloaded to the bounded tool pool.
+        With a checkpointer, a thread that already has state (a redelivered
+        event) is resumed, or returned as-is if it had finished.
+        """
+        config = invocation_config(config, thread_id)
+
+        if self.checkpointer is not None and thread_id:
+            state = await self.orchestrator.aget_state(config)
+            if state.values.get("messages"):
+                if any(task.interrupts for task in state.tasks) or not state.next:
+                    # Finished before the crash; only the publish was lost.
+                    return state.values
+                # Resume from the last completed step instead of starting over.
+                return await self.orchestrator.ainvoke(None, config=config)
+
+        return await self.orchestrator.ainvoke(self.initial_state(problem_description, event), config=config)
     
     def stream(self, problem_description: str, config=None):
         """
@@ -200,11 +252,69 @@ class AgentOrchestrator:
         )
 
 
+def invocation_config(config=None, thread_id=None):
+    """Copy `config` and give it its own thread id so shared graphs never mix runs."""
+    config = dict(config or {})
+    configurable = dict(config.get("configurable") or {})
+    configurable.setdefault("thread_id", thread_id or str(uuid.uuid4()))
+    config["configurable"] = configurable
+    return config
+
+
+# Process-wide orchestrator: compiling the five deep-agent graphs is far more
+# expensive than running the coordinator's first LLM call, so build it once.
+_shared_orchestrator = None
+_shared_lock = threading.Lock()
+
+
+def get_orchestrator(additional_tools=None, model=None, rebuild=False):
+    """
+    Return the shared orchestrator, building it on first use.
+    
+    Args:
+        additional_tools: Tool override; builds a dedicated, uncached orchestrator
+        model: Coordinator model override; builds a dedicated, uncached orchestrator
+        rebuild: Replace the shared orchestrator with a freshly compiled one
+    
+    Returns:
+        An AgentOrchestrator
+    """
+    global _shared_orchestrator
+
+    if additional_tools is not None or model is not None:
+        return AgentOrchestrator(additional_tools, model or coordinator_brain_openrouter)
+
+    if os.getenv("ORCHESTRATOR_REBUILD_PER_EVENT", "false").lower() == "true":
+        return AgentOrchestrator(checkpointer=get_checkpointer())
+
+    with _shared_lock:
+        if _shared_orchestrator is None or rebuild:
+            _shared_orchestrator = AgentOrchestrator(checkpointer=get_checkpointer())
+        return _shared_orchestrator
+
+
+def warm_orchestrator():
+    """Build the shared orchestrator ahead of the first event (worker startup)."""
+    return get_orchestrator()
+
+
 # Convenience functions
-def run_orchestrator(problem_description: str):
+def run_orchestrator(problem_description: str, event_id=None, event=None):
     """Quick run function for simple usage."""
-    orchestrator = AgentOrchestrator()
-    return orchestrator.run(problem_description)
+    orchestrator = get_orchestrator()
+    thread_id = thread_id_for(event_id) if event_id else None
+    return orchestrator.run(problem_description, thread_id=thread_id, event=event)
+
+
+async def arun_orchestrator(problem_description: str, event_id=None, config=None, event=None):
+    """Async run function for callers already on an event loop (worker, server)."""
+    orchestrator = get_orchestrator()
+    thread_id = thread_id_for(event_id) if event_id else None
+    token = current_event_id.set(event_id)
+    try:
+        return await orchestrator.arun(problem_description, config=with_tracing(config), thread_id=thread_id, event=event)
+    finally:
+        current_event_id.reset(token)
 
 
 ## Create a global orchestrator instance
@@ -0,0 +1,218 @@
+# agents/coordinator/fanout.py
+"""
+Parallel fix-proposal fan-out (pipeline mode).
+
+Instead of one proposal model judged and regenerated in series, the
+proposal prompt runs concurrently on several model/temperature variants,
+each under its own timeout. Candidate sets are judged together: once the
+first set arrives, the others get FANOUT_GRACE_S to join it, and the judge
+evaluates everything that has arrived in a single call. An approved verdict
+wins and the stragglers are cancelled; otherwise the next arrivals are
+judged the same way.
+
+Width and timeout are chosen by the event's priority class, so CRITICAL
+errors get the widest, fastest fan-out. Variants are "model[@temperature]"
+with model one of MODELS. A temperature above 0 bypasses the LLM cache.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from prometheus_client import Counter, Histogram
+
+from agents.LLMs import (
+    coordinator_brain_gemini,
+    coordinator_brain_openrouter,
+    fix_proposal_brain_openrouter,
+    judge_brain_openrouter,
+)
+from agents.kafka.scheduler import DEFAULT_LOGCODE_PRIORITY, parse_mapping, priority_class
+
+FANOUT_ENABLED = os.getenv("FANOUT_ENABLED", "true").lower() == "true"
+FANOUT_GRACE_S = float(os.getenv("FANOUT_GRACE_S", "10"))
+
+MODELS = {
+    "fix_proposal": fix_proposal_brain_openrouter,
+    "coordinator": coordinator_brain_openrouter,
+    "gemini": coordinator_brain_gemini,
+    "judge": judge_brain_openrouter,
+}
+
+# Per priority class; FANOUT_VARIANTS_<CLASS> / FANOUT_TIMEOUT_S_<CLASS> override.
+DEFAULT_VARIANTS = {
+    "CRITICAL": "fix_proposal,gemini,fix_proposal@0.7",
+    "HIGH": "fix_proposal,gemini",
+}
+DEFAULT_TIMEOUTS_S = {
+    "CRITICAL": 45.0,
+    "HIGH": 60.0,
+}
+FANOUT_VARIANTS = os.getenv("FANOUT_VARIANTS", "fix_proposal")
+FANOUT_TIMEOUT_S = float(os.getenv("FANOUT_TIMEOUT_S", "90"))
+
+LOGCODE_CLASSES = {
+    k.upper(): v.upper()
+    for k, v in parse_mapping(os.getenv("WORKER_LOGCODE_PRIORITY", DEFAULT_LOGCODE_PRIORITY)).items()
+}
+
+FANOUT_VARIANT_RESULTS = Counter(
+    "agent_fanout_variants_total",
+    "Fix-proposal fan-out variants by outcome",
+    ["variant", "outcome"],  # won | rejected | empty | timeout | error | cancelled
+)
+FANOUT_DURATION = Histogram(
+    "agent_fanout_seconds",
+    "Time from fan-out start to a decision, by priority class",
+    ["priority"],
+    buckets=(1, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300),
+)
+
+
+@dataclass(frozen=True)
+class Variant:
+    model_key: str
+    temperature: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return self.model_key if self.temperature is None else f"{self.model_key}@{self.temperature:g}"
+
+    def model(self):
+        model = MODELS[self.model_key]
+        return model if self.temperature is None else model.bind(temperature=self.temperature)
+
+
+@dataclass
+class FanoutPlan:
+    priority: str
+    variants: List[Variant]
+    timeout_s: float
+
+    @property
+    def wide(self) -> bool:
+        return FANOUT_ENABLED and len(self.variants) > 1
+
+
+@dataclass
+class FanoutResult:
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    verdicts: List[Any] = field(default_factory=list)
+    outcomes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def verdict(self) -> Any:
+        return self.verdicts[-1] if self.verdicts else None
+
+
+def parse_variants(spec: str) -> List[Variant]:
+    variants = []
+    for item in spec.split(","):
+        name, _, temperature = item.strip().partition("@")
+        if name not in MODELS:
+            logger.warning(f"⚠ Unknown fan-out model '{name}' ignored")
+            continue
+        variants.append(Variant(name, float(temperature) if temperature else None))
+    return variants or [Variant("fix_proposal")]
+
+
+def plan_for(event: dict) -> FanoutPlan:
+    priority = priority_class(event, LOGCODE_CLASSES)
+    spec = os.getenv(f"FANOUT_VARIANTS_{priority}") or DEFAULT_VARIANTS.get(priority) or FANOUT_VARIANTS
+    timeout = os.getenv(f"FANOUT_TIMEOUT_S_{priority}")
+    return FanoutPlan(
+        priority=priority,
+        variants=parse_variants(spec),
+        timeout_s=float(timeout) if timeout else DEFAULT_TIMEOUTS_S.get(priority, FANOUT_TIMEOUT_S),
+    )
+
+
+def merge_candidates(batch: List[tuple], first_set: int) -> List[Dict[str, Any]]:
+    """
+    One proposal array out of several candidate sets. Ids are renumbered per
+    set (FIX-101, FIX-201, ...) so they stay unique and valid in branch names.
+    """
+    merged = []
+    for k, (variant, proposals) in enumerate(batch, first_set):
+        for n, proposal in enumerate(proposals, 1):
+            if isinstance(proposal, dict):
+                merged.append({
+                    **proposal,
+                    "id": f"FIX-{k}{n:02d}",
+                    "original_id": proposal.get("id"),
+                    "candidate_set": variant.label,
+                })
+    return merged
+
+
+async def fan_out(
+    plan: FanoutPlan,
+    propose: Callable[[Variant], Awaitable[List[dict]]],
+    judge: Callable[[List[dict]], Awaitable[Any]],
+    approved: Callable[[Any], bool],
+    grace_s: float = FANOUT_GRACE_S,
+) -> FanoutResult:
+    """
+    Run `propose` for every variant and `judge` on each batch of arrivals
+    until `approved(verdict)`; pending variants are then cancelled. A
+    verdict's `fix_id` names the winning candidate.
+    """
+    started = time.monotonic()
+    tasks = {asyncio.ensure_future(asyncio.wait_for(propose(v), plan.timeout_s)): v for v in plan.variants}
+    pending = set(tasks)
+    result = FanoutResult()
+    sets = 0
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if pending and grace_s > 0:
+                # Let near-simultaneous sets join this judge call.
+                joined, pending = await asyncio.wait(pending, timeout=grace_s)
+                done |= joined
+
+            batch = []
+            for task in sorted(done, key=lambda t: plan.variants.index(tasks[t])):
+                variant = tasks[task]
+                try:
+                    proposals = task.result()
+                except asyncio.TimeoutError:
+                    result.outcomes[variant.label] = "timeout"
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠ Fan-out variant {variant.label} failed: {e}")
+                    result.outcomes[variant.label] = "error"
+                    continue
+                if not proposals:
+                    result.outcomes[variant.label] = "empty"
+                    continue
+                batch.append((variant, proposals))
+
+            if not batch:
+                continue
+            candidates = merge_candidates(batch, sets + 1)
+            sets += len(batch)
+            result.candidates.extend(candidates)
+
+            verdict = await judge(candidates)
+            result.verdicts.append(verdict)
+            won = approved(verdict)
+            for variant, _ in batch:
+                result.outcomes[variant.label] = "rejected"
+            if won:
+                winner = next((c["candidate_set"] for c in candidates if c["id"] == getattr(verdict, "fix_id", None)), None)
+                if winner:
+                    result.outcomes[winner] = "won"
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+            result.outcomes[tasks[task].label] = "cancelled"
+        for label, outcome in result.outcomes.items():
+            FANOUT_VARIANT_RESULTS.labels(variant=label, outcome=outcome).inc()
+        FANOUT_DURATION.labels(priority=plan.priority).observe(time.monotonic() - started)
+
+    logger.info(f"🔀 Fan-out ({plan.priority}, {len(plan.variants)} variants): {result.outcomes}")
+    return result
@@ -0,0 +1,330 @@
+# agents/coordinator/pipeline.py
+"""
+Deterministic orchestration mode (ORCHESTRATOR_MODE=pipeline).
+
+The workflow in coordinator/prompt.md is fixed, so this mode runs it as an
+explicit LangGraph state machine instead of letting the coordinator LLM pick
+each `task` call:
+
+    context-retrieval → fix-proposal → judge-fix → create_jira_bug → fix-application → finish
+                             ↑              │
+                             └──────────────┤ rejected: regenerate with the judge's feedback
+                                            └─ rejected after PIPELINE_MAX_REGENERATIONS → finish
+
+Retrieval calls the context tool directly; proposal and judge call their
+models once with their own prompts. The coordinator model is only asked
+when the judge's verdict can't be acted on as is (unparsable, approved
+without a known fix, or approved against its own thresholds).
+
+High-priority events can fan the proposal stage out across several models
+(agents.coordinator.fanout); such a round is judged inside the stage.
+
+Each stage appends (stage, output) to `outputs`, labelled like the deep-agent
+subagent calls, so `agents.core.results.build_result` reads both modes alike.
+"""
+import json
+import operator
+import os
+from dataclasses import dataclass
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from loguru import logger
+
+from agents.LLMs import coordinator_brain_gemini, coordinator_brain_openrouter, fix_proposal_brain_openrouter
+from agents.context_retrieval.agent import aretrieve_salesforce_context_tool
+from agents.coordinator.fanout import FanoutPlan, Variant, fan_out, plan_for
+from agents.core.results import parse_json_loose, stage_tag
+from agents.fix_application.agent import build_agent as build_fix_application_agent
+from agents.fix_proposal.agent import PROMPT as FIX_PROPOSAL_PROMPT
+from agents.judge_fix.agent import PROMPT as JUDGE_PROMPT
+from agents.tools.jira.create_jira import acreate_jira_bug_wrapper
+
+# Regeneration rounds after the first proposal (coordinator/prompt.md: "maximum of 2").
+PIPELINE_MAX_REGENERATIONS = int(os.getenv("PIPELINE_MAX_REGENERATIONS", "2"))
+PIPELINE_APPLY_FIXES = os.getenv("PIPELINE_APPLY_FIXES", "true").lower() == "true"
+
+# Approval conditions from judge_fix/prompt.md; an "approved" verdict outside them is ambiguous.
+MIN_QUALITY = 80
+MAX_HALLUCINATION = 20
+MIN_CONFIDENCE = 0.7
+
+DECISION_PROMPT = """You are the ORCHESTRATOR of a Salesforce bug-fixing workflow.
+The judge's verdict below cannot be acted on as is. Decide the next step.
+
+Answer with STRICT JSON only:
+{"decision": "apply" | "regenerate" | "stop", "fix_id": "<id of the fix to apply or null>", "reason": "<short reason>"}
+
+- apply: one listed fix is clearly approved by the judge
+- regenerate: the proposals should be regenerated with the judge's feedback
+- stop: no safe fix can be applied
+"""
+
+
+class PipelineState(TypedDict, total=False):
+    messages: Annotated[list, add_messages]
+    outputs: Annotated[list, operator.add]
+    event: Dict[str, Any]
+    context: Dict[str, Any]
+    proposals: List[Dict[str, Any]]
+    judge: Dict[str, Any]
+    rounds: int
+    fanned_out: bool
+    decision: str
+    fix_id: Optional[str]
+    jira: Dict[str, Any]
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _text(message: AIMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return "\n".join(c.get("text", "") if isinstance(c, dict) else str(c) for c in content)
+    return content
+
+
+def event_from(state: PipelineState) -> Dict[str, Any]:
+    """The error object: given by the caller, or recovered from the first message."""
+    if state.get("event"):
+        return state["event"]
+    first = next((m for m in state.get("messages", []) if isinstance(m, HumanMessage)), None)
+    content = first.content if first is not None else ""
+    parsed = parse_json_loose(content) if isinstance(content, str) else content
+    return parsed if isinstance(parsed, dict) else {"message": content}
+
+
+def fix_by_id(proposals: List[Dict[str, Any]], fix_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    return next((p for p in proposals if isinstance(p, dict) and p.get("id") == fix_id), None)
+
+
+def is_ambiguous(judge: Dict[str, Any], proposals: List[Dict[str, Any]]) -> bool:
+    if not judge or not isinstance(judge.get("approved"), bool):
+        return True
+    if not judge["approved"]:
+        return False
+    try:
+        within = (
+            float(judge.get("quality_score")) >= MIN_QUALITY
+            and float(judge.get("hallucination_score")) <= MAX_HALLUCINATION
+            and float(judge.get("confidence")) >= MIN_CONFIDENCE
+        )
+    except (TypeError, ValueError):
+        return True
+    return not within or fix_by_id(proposals, judge.get("best_fix_id")) is None
+
+
+# ---------- Stages ----------
+
+async def retrieve(state: PipelineState) -> dict:
+    context = await aretrieve_salesforce_context_tool(event_from(state))
+    return {"context": context, "outputs": [("context-retrieval", _dumps(context))]}
+
+
+@dataclass
+class Verdict:
+    judge: Dict[str, Any]
+    decision: str
+    fix_id: Optional[str]
+    text: str
+
+    def update(self) -> dict:
+        return {
+            "judge": self.judge,
+            "decision": self.decision,
+            "fix_id": self.fix_id,
+            "messages": [AIMessage(self.text, name="judge-fix")],
+            "outputs": [("judge-fix", self.text)],
+        }
+
+
+async def evaluate(context: Dict[str, Any], proposals: List[Dict[str, Any]], rounds: int) -> Verdict:
+    """One judge call over `proposals`, turned into the next step."""
+    payload = {"context": context, "fix_proposals": proposals}
+    reply = await coordinator_brain_gemini.ainvoke([SystemMessage(JUDGE_PROMPT), HumanMessage(_dumps(payload))])
+    verdict = parse_json_loose(_text(reply))
+    verdict = verdict if isinstance(verdict, dict) else {}
+
+    if not is_ambiguous(verdict, proposals):
+        decision = "apply" if verdict["approved"] else "regenerate"
+        fix_id = verdict.get("best_fix_id")
+    else:
+        decision, fix_id = await decide(verdict, proposals, _text(reply))
+
+    if decision == "regenerate" and rounds > PIPELINE_MAX_REGENERATIONS:
+        decision = "stop"
+    return Verdict(verdict, decision, fix_id, _text(reply))
+
+
+def proposal_input(state: PipelineState) -> str:
+    content = _dumps(state["context"])
+    feedback = (state.get("judge") or {}).get("feedback_for_regeneration")
+    if state.get("rounds") and feedback:
+        content += f"\n\nThe judge rejected the previous proposals. Feedback:\n{feedback}"
+    return content
+
+
+def parse_proposals(text: str) -> List[Dict[str, Any]]:
+    proposals = parse_json_loose(text)
+    if isinstance(proposals, dict):
+        proposals = [proposals]
+    return proposals if isinstance(proposals, list) else []
+
+
+async def propose(state: PipelineState) -> dict:
+    plan = plan_for(event_from(state))
+    if plan.wide:
+        return await propose_fanout(state, plan)
+
+    reply = await fix_proposal_brain_openrouter.ainvoke(
+        [SystemMessage(FIX_PROPOSAL_PROMPT), HumanMessage(proposal_input(state))]
+    )
+    return {
+        "proposals": parse_proposals(_text(reply)),
+        "rounds": state.get("rounds", 0) + 1,
+        "fanned_out": False,
+        "messages": [AIMessage(_text(reply), name="fix-proposal")],
+        "outputs": [("fix-proposal", _text(reply))],
+    }
+
+
+async def propose_fanout(state: PipelineState, plan: FanoutPlan) -> dict:
+    """Proposal and judgment in one stage: variants run concurrently, batches are judged as they arrive."""
+    rounds = state.get("rounds", 0) + 1
+    content = proposal_input(state)
+
+    async def run_variant(variant: Variant) -> List[Dict[str, Any]]:
+        reply = await variant.model().ainvoke([SystemMessage(FIX_PROPOSAL_PROMPT), HumanMessage(content)])
+        return parse_proposals(_text(reply))
+
+    async def judge_batch(candidates: List[Dict[str, Any]]) -> Verdict:
+        return await evaluate(state["context"], candidates, rounds)
+
+    result = await fan_out(plan, run_variant, judge_batch, approved=lambda v: v.decision == "apply")
+    update = {
+        "proposals": result.candidates,
+        "rounds": rounds,
+        "fanned_out": True,
+        "outputs": [("fix-proposal", _dumps(result.candidates))],
+    }
+    verdict = result.verdict
+    if verdict is None:
+        # Every variant timed out, failed or returned nothing.
+        update["decision"] = "regenerate" if rounds <= PIPELINE_MAX_REGENERATIONS else "stop"
+        update["fix_id"] = None
+        return update
+
+    update.update(judge=verdict.judge, decision=verdict.decision, fix_id=verdict.fix_id)
+    update["messages"] = [AIMessage(v.text, name="judge-fix") for v in result.verdicts]
+    update["outputs"] += [("judge-fix", v.text) for v in result.verdicts]
+    return update
+
+
+async def judge(state: PipelineState) -> dict:
+    verdict = await evaluate(state["context"], state.get("proposals", []), state.get("rounds", 0))
+    return verdict.update()
+
+
+async def decide(verdict: Dict[str, Any], proposals: List[Dict[str, Any]], raw: str) -> tuple:
+    """Ask the coordinator model what to do with a verdict the rules can't settle."""
+    summary = {
+        "judge": verdict or raw,
+        "fix_ids": [p.get("id") for p in proposals if isinstance(p, dict)],
+    }
+    reply = await coordinator_brain_openrouter.ainvoke([SystemMessage(DECISION_PROMPT), HumanMessage(_dumps(summary))])
+    answer = parse_json_loose(_text(reply))
+    answer = answer if isinstance(answer, dict) else {}
+
+    decision = answer.get("decision")
+    fix_id = answer.get("fix_id")
+    if decision == "apply" and fix_by_id(proposals, fix_id) is None:
+        decision = "stop"
+    if decision not in ("apply", "regenerate", "stop"):
+        decision = "stop"
+    logger.info(f"🧭 Coordinator decided '{decision}' on an ambiguous verdict ({answer.get('reason')})")
+    return decision, fix_id
+
+
+async def create_jira(state: PipelineState) -> dict:
+    fix = fix_by_id(state.get("proposals", []), state.get("fix_id")) or {}
+    payload = fix.get("jira_payload") or {}
+    jira = await acreate_jira_bug_wrapper(
+        title=payload.get("title") or fix.get("title") or state.get("fix_id"),
+        description=payload.get("description") or fix.get("description") or "",
+        priority=payload.get("priority", "Medium"),
+        labels=payload.get("labels"),
+        components=payload.get("components"),
+    )
+    return {"jira": jira, "outputs": [("create_jira_bug", _dumps(jira))]}
+
+
+_fix_application_agent = None
+
+
+async def apply_fix(state: PipelineState) -> dict:
+    global _fix_application_agent
+    if _fix_application_agent is None:
+        _fix_application_agent = build_fix_application_agent()
+
+    fix = dict(fix_by_id(state.get("proposals", []), state.get("fix_id")) or {})
+    faulty = (state.get("context") or {}).get("salesforce_context", {}).get("faulty_class") or {}
+    if faulty.get("Name"):
+        fix.setdefault("faulty_class", {"name": faulty["Name"], "path": f"{faulty['Name']}.cls"})
+    payload = {"jira": {"key": state["jira"].get("jira_key")}, "faulty_class": faulty, "fixes": [fix]}
+
+    result = await _fix_application_agent.ainvoke({"messages": [HumanMessage(_dumps(payload))]})
+    final = next((m for m in reversed(result.get("messages", [])) if isinstance(m, AIMessage) and m.content), None)
+    text = _text(final) if final is not None else ""
+    return {"messages": [AIMessage(text, name="fix-application")], "outputs": [("fix-application", text)]}
+
+
+async def finish(state: PipelineState) -> dict:
+    verdict = state.get("judge") or {}
+    jira = state.get("jira") or {}
+    if jira.get("jira_key"):
+        text = f"Approved fix {state.get('fix_id')}; Jira {jira['jira_key']} ({jira.get('jira_url')})."
+    else:
+        reasons = "; ".join(str(r) for r in verdict.get("reasons") or []) or "no approved fix"
+        text = f"No fix approved after {state.get('rounds', 0)} proposal round(s): {reasons}"
+    return {"messages": [AIMessage(text)]}
+
+
+# ---------- Graph ----------
+
+def after_judge(state: PipelineState) -> str:
+    return {"apply": "create_jira_bug", "regenerate": "fix-proposal"}.get(state.get("decision"), "finish")
+
+
+def after_propose(state: PipelineState) -> str:
+    # A fan-out round has already been judged.
+    return after_judge(state) if state.get("fanned_out") else "judge-fix"
+
+
+def _stage(fn, name: str):
+    # Tagged so RunRecorder times each stage like a subagent call.
+    return RunnableLambda(fn, name=name).with_config(tags=[stage_tag(name)])
+
+
+def create_pipeline(checkpointer=None):
+    graph = StateGraph(PipelineState)
+    graph.add_node("context-retrieval", _stage(retrieve, "context-retrieval"))
+    graph.add_node("fix-proposal", _stage(propose, "fix-proposal"))
+    graph.add_node("judge-fix", _stage(judge, "judge-fix"))
+    graph.add_node("create_jira_bug", _stage(create_jira, "create_jira_bug"))
+    graph.add_node("fix-application", _stage(apply_fix, "fix-application"))
+    graph.add_node("finish", finish)
+
+    graph.add_edge(START, "context-retrieval")
+    graph.add_edge("context-retrieval", "fix-proposal")
+    graph.add_conditional_edges("fix-proposal", after_propose, ["judge-fix", "create_jira_bug", "fix-proposal", "finish"])
+    graph.add_conditional_edges("judge-fix", after_judge, ["create_jira_bug", "fix-proposal", "finish"])
+    graph.add_edge("create_jira_bug", "fix-application" if PIPELINE_APPLY_FIXES else "finish")
+    graph.add_edge("fix-application", "finish")
+    graph.add_edge("finish", END)
+
+    return graph.compile(checkpointer=checkpointer)
@@ -0,0 +1,67 @@
+# agents/core/artifacts.py
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from agents.core.config import data_path
+
+# Large orchestrator outputs (transcripts, retrieved context, patches) live
+# here; Kafka results only carry their hashes.
+ARTIFACT_STORE_DIR = os.getenv("ARTIFACT_STORE_DIR") or data_path("artifacts")
+
+
+def canonical_bytes(obj: Any) -> bytes:
+    """Stable JSON encoding, so equal content always hashes to the same key."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+class ArtifactStore:
+    """
+    Content-addressed, gzip-compressed JSON blobs on local disk.
+
+    Files are named by the SHA-256 of their canonical JSON and written via a
+    temp file + rename, so concurrent workers storing the same artifact just
+    race to write identical bytes, and readers never see a partial file.
+    """
+
+    def __init__(self, root: str = ARTIFACT_STORE_DIR):
+        self.root = root
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.json.gz")
+
+    def put(self, obj: Any, kind: Optional[str] = None) -> Dict[str, Any]:
+        """Store `obj` and return its reference: {"sha256", "bytes", "kind"}."""
+        data = canonical_bytes(obj)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=6))
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+
+        ref = {"sha256": digest, "bytes": len(data)}
+        if kind:
+            ref["kind"] = kind
+        return ref
+
+    def get(self, digest: str) -> Any:
+        with open(self.path_for(digest), "rb") as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+
+artifact_store = ArtifactStore()
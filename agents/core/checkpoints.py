@@ -0,0 +1,147 @@
+# agents/core/checkpoints.py
+"""
+Durable orchestration state.
+
+Checkpoints: the orchestrator graph is compiled with a Postgres-backed
+LangGraph checkpointer, keyed by thread id `event-<referenceId>`. A redelivered
+event resumes from its last completed super-step instead of starting over.
+
+Side effects: a step that was running when the worker died is replayed on
+resume, so tools with external effects (Jira issues, pull requests) record
+their result per event in a ledger and return it on replay instead of
+acting twice.
+
+Checkpointing is enabled only in processes that call `open_checkpointer()`
+(the worker); elsewhere the graph runs without one, as before.
+"""
+import json
+import os
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+from loguru import logger
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "postgres").lower()  # postgres | none
+CHECKPOINT_DB_URI = os.getenv("CHECKPOINT_DB_URI") or (
+    f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+    f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}/{os.getenv('DB_NAME')}"
+)
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "10"))
+# Ledger rows outlive checkpoints: a result can be published and the event
+# still redelivered before its offset is committed.
+SIDE_EFFECT_RETENTION_DAYS = int(os.getenv("SIDE_EFFECT_RETENTION_DAYS", "7"))
+
+LEDGER_TABLE = "orchestrator_side_effects"
+
+# Set for the duration of one orchestration; read by side-effecting tools.
+current_event_id: ContextVar[Optional[str]] = ContextVar("current_event_id", default=None)
+
+_pool = None
+_saver = None
+
+
+def thread_id_for(event_id: str) -> str:
+    return f"event-{event_id}"
+
+
+def get_checkpointer():
+    """The opened checkpointer, or None when checkpointing is off in this process."""
+    return _saver
+
+
+async def open_checkpointer():
+    global _pool, _saver
+    if _saver is not None or CHECKPOINT_BACKEND == "none":
+        return _saver
+
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    _pool = AsyncConnectionPool(
+        CHECKPOINT_DB_URI,
+        max_size=CHECKPOINT_POOL_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    await _pool.open()
+
+    saver = AsyncPostgresSaver(_pool)
+    await saver.setup()
+    async with _pool.connection() as conn:
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+                event_id   TEXT NOT NULL,
+                effect     TEXT NOT NULL,
+                effect_key TEXT NOT NULL,
+                result     JSONB NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (event_id, effect, effect_key)
+            )
+            """
+        )
+        await conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{LEDGER_TABLE}_created_at ON {LEDGER_TABLE} (created_at)")
+
+    _saver = saver
+    logger.info("💾 Durable orchestrator checkpoints enabled (postgres)")
+    return _saver
+
+
+async def close_checkpointer() -> None:
+    global _pool, _saver
+    if _pool is not None:
+        await _pool.close()
+    _pool = None
+    _saver = None
+
+
+# ---------- Side-Effect Ledger ----------
+
+async def side_effect_once(effect: str, action: Callable[[], Awaitable[Any]], key: str = "") -> Any:
+    """
+    Run `action` at most once per (event, effect, key) and return its result.
+    On replay the recorded result is returned without calling `action`.
+    `key` must be stable across replays, so never derive it from model output;
+    the default means once per event.
+    """
+    event_id = current_event_id.get()
+    if _pool is None or not event_id:
+        return await action()
+
+    async with _pool.connection() as conn:
+        cur = await conn.execute(
+            f"SELECT result FROM {LEDGER_TABLE} WHERE event_id = %s AND effect = %s AND effect_key = %s",
+            (event_id, effect, key),
+        )
+        row = await cur.fetchone()
+    if row is not None:
+        logger.info(f"↩ Reusing recorded {effect} for event_id={event_id}")
+        return row["result"]
+
+    result = await action()
+
+    async with _pool.connection() as conn:
+        await conn.execute(
+            f"INSERT INTO {LEDGER_TABLE} (event_id, effect, effect_key, result) VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT DO NOTHING",
+            (event_id, effect, key, json.dumps(result, default=str)),
+        )
+    return result
+
+
+# ---------- Garbage Collection ----------
+
+async def discard_checkpoints(event_id: str) -> None:
+    """Drop an event's checkpoints once its result is published (or it is dead-lettered)."""
+    if _saver is None or not event_id:
+        return
+    try:
+        await _saver.adelete_thread(thread_id_for(event_id))
+        async with _pool.connection() as conn:
+            await conn.execute(
+                f"DELETE FROM {LEDGER_TABLE} WHERE created_at < now() - make_interval(days => %s)",
+                (SIDE_EFFECT_RETENTION_DAYS,),
+            )
+    except Exception as e:
+        logger.warning(f"⚠ Could not discard checkpoints for event_id={event_id}: {e}")
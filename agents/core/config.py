@@ -7,4 +7,16 @@ load_dotenv()
 
 SALESFORCE_API_KEY = os.getenv("SALESFORCE_API_KEY")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-JIRA_TOKEN = os.getenv("JIRA_TOKEN")
\ No newline at end of file
+JIRA_TOKEN = os.getenv("JIRA_TOKEN")
+
+# Local stores (LLM, context and Apex caches, artifacts) live under one
+# directory, kept out of git; AGENT_DATA_DIR moves them all.
+AGENT_DATA_DIR = os.path.abspath(
+    os.getenv("AGENT_DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+)
+
+
+def data_path(name: str) -> str:
+    """Absolute path of `name` inside AGENT_DATA_DIR (created if missing)."""
+    os.makedirs(AGENT_DATA_DIR, exist_ok=True)
+    return os.path.join(AGENT_DATA_DIR, name)
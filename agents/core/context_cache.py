@@ -0,0 +1,201 @@
+# agents/core/context_cache.py
+"""
+Two-tier cache for external context lookups: sObject describes, Weaviate
+hits and Tavily results.
+
+Tier 1 is an in-process LRU; tier 2 is a SQLite file (WAL, shared by the
+worker processes on a host and kept across restarts). A tier-2 hit is
+promoted to tier 1. Each namespace has its own TTL, and empty results get
+CONTEXT_CACHE_NEGATIVE_TTL_S so a missing object or a blip in a search
+service isn't remembered for long. Loader exceptions are never cached.
+
+Search keys come from normalize_query, which drops record ids, UUIDs,
+timestamps, line/column positions and numbers, so the same error raised
+on another record or line hits the same entry.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+from prometheus_client import Counter, Gauge
+
+from agents.core.config import data_path
+
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+CONTEXT_CACHE_PATH = os.getenv("CONTEXT_CACHE_PATH") or data_path("context_cache.sqlite3")
+CONTEXT_CACHE_MEMORY_ENTRIES = int(os.getenv("CONTEXT_CACHE_MEMORY_ENTRIES", "2000"))
+CONTEXT_CACHE_NEGATIVE_TTL_S = int(os.getenv("CONTEXT_CACHE_NEGATIVE_TTL_S", "300"))
+# Expired rows are purged from SQLite every N writes.
+PURGE_EVERY_WRITES = 200
+
+
+@dataclass(frozen=True)
+class Namespace:
+    name: str
+    ttl_s: int
+    negative_ttl_s: int = CONTEXT_CACHE_NEGATIVE_TTL_S
+
+
+DESCRIBE = Namespace("describe", int(os.getenv("CONTEXT_CACHE_TTL_DESCRIBE_S", str(24 * 3600))))
+WEAVIATE = Namespace("weaviate", int(os.getenv("CONTEXT_CACHE_TTL_WEAVIATE_S", str(6 * 3600))))
+TAVILY = Namespace("tavily", int(os.getenv("CONTEXT_CACHE_TTL_TAVILY_S", str(24 * 3600))))
+
+CONTEXT_CACHE_REQUESTS = Counter(
+    "agent_context_cache_requests_total",
+    "Context cache lookups by namespace and result",
+    ["namespace", "result"],  # memory | disk | miss | error
+)
+CONTEXT_CACHE_HIT_RATIO = Gauge(
+    "agent_context_cache_hit_ratio",
+    "Share of lookups served from either tier since process start",
+    ["namespace"],
+)
+
+_SF_ID = re.compile(r"\b[a-zA-Z0-9]{5}0[a-zA-Z0-9]{9}(?:[a-zA-Z0-9]{3})?\b")
+_UUID = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE)
+_TIMESTAMP = re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?")
+_LINE_COL = re.compile(r"line \d+, column \d+", re.IGNORECASE)
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercased query text without ids, timestamps, positions or numbers."""
+    for pattern, repl in ((_TIMESTAMP, "<ts>"), (_UUID, "<uuid>"), (_LINE_COL, " "), (_SF_ID, "<id>"), (_NUMBER, "<n>")):
+        text = pattern.sub(repl, text)
+    return " ".join(text.lower().split())
+
+
+class TieredCache:
+    def __init__(self, path: str = CONTEXT_CACHE_PATH, memory_entries: int = CONTEXT_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._counts_lock = threading.Lock()
+
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS context_cache (
+                namespace   TEXT NOT NULL,
+                key         TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                expires_at  REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS ix_context_cache_expires_at ON context_cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL + busy timeout for other processes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- Tiers ----------
+
+    def _remember(self, slot: Tuple[str, str], expires_at: float, value: Any) -> None:
+        with self._memory_lock:
+            self._memory[slot] = (expires_at, value)
+            self._memory.move_to_end(slot)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, namespace: Namespace, result: str) -> None:
+        CONTEXT_CACHE_REQUESTS.labels(namespace=namespace.name, result=result).inc()
+        with self._counts_lock:
+            counts = self._counts.setdefault(namespace.name, {"memory": 0, "disk": 0, "miss": 0, "error": 0})
+            counts[result] += 1
+            ratio = (counts["memory"] + counts["disk"]) / sum(counts.values())
+        CONTEXT_CACHE_HIT_RATIO.labels(namespace=namespace.name).set(ratio)
+
+    def get(self, namespace: Namespace, key: str) -> Tuple[bool, Any]:
+        """(found, value); expired entries count as missing."""
+        slot, now = (namespace.name, key), time.time()
+        with self._memory_lock:
+            entry = self._memory.get(slot)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(slot)
+                else:
+                    del self._memory[slot]
+                    entry = None
+        if entry is not None:
+            self._count(namespace, "memory")
+            return True, entry[1]
+
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM context_cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace.name, key, now),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠ Context cache lookup failed: {e}")
+            self._count(namespace, "error")
+            return False, None
+        if row is None:
+            self._count(namespace, "miss")
+            return False, None
+
+        value = json.loads(row[0])
+        self._remember(slot, row[1], value)
+        self._count(namespace, "disk")
+        return True, value
+
+    def put(self, namespace: Namespace, key: str, value: Any, negative: bool = False) -> None:
+        expires_at = time.time() + (namespace.negative_ttl_s if negative else namespace.ttl_s)
+        self._remember((namespace.name, key), expires_at, value)
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO context_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace.name, key, json.dumps(value, default=str), expires_at),
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"⚠ Context cache update failed: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self.purge()
+
+    def get_or_load(self, namespace: Namespace, key: str, loader: Callable[[], Any],
+                    is_negative: Callable[[Any], bool] = lambda v: not v) -> Any:
+        """Cached value, or `loader()` stored with the namespace (or negative) TTL. Loader errors propagate."""
+        found, value = self.get(namespace, key)
+        if found:
+            return value
+        value = loader()
+        self.put(namespace, key, value, negative=is_negative(value))
+        return value
+
+    def purge(self) -> None:
+        try:
+            self._conn().execute("DELETE FROM context_cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠ Context cache purge failed: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        with self._counts_lock:
+            snapshot = {name: dict(counts) for name, counts in self._counts.items()}
+        for name, counts in snapshot.items():
+            total = sum(counts.values())
+            out[name] = {**counts, "hit_ratio": round((counts["memory"] + counts["disk"]) / total, 3) if total else 0.0}
+        return out
+
+
+context_cache: Optional[TieredCache] = TieredCache() if CONTEXT_CACHE_ENABLED else None
@@ -0,0 +1,283 @@
+# agents/core/fix_store.py
+"""
+Knowledge store of fixes that were already judged and approved.
+
+Approved results are saved to Postgres (resolved_fixes) keyed by an error
+fingerprint. Each worker keeps an in-memory TF-IDF index over them, so a new
+event is matched first exactly by fingerprint, then by cosine similarity of
+its normalized error text, before any LLM work is scheduled.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import re
+from collections import Counter as TermCounter
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from loguru import logger
+from prometheus_client import Counter
+
+from agents.core.results import RESULT_SCHEMA_VERSION
+from DataIngestion.app.db.session import get_session_factory
+from DataIngestion.app.services.resolved_fix_service import (
+    list_resolved_fixes,
+    record_fix_reuse,
+    save_resolved_fix,
+)
+
+FIX_REUSE_ENABLED = os.getenv("FIX_REUSE_ENABLED", "true").lower() == "true"
+FIX_REUSE_THRESHOLD = float(os.getenv("FIX_REUSE_THRESHOLD", "0.92"))
+FIX_REUSE_MIN_QUALITY = float(os.getenv("FIX_REUSE_MIN_QUALITY", "80"))
+FIX_STORE_REFRESH_INTERVAL_S = int(os.getenv("FIX_STORE_REFRESH_INTERVAL_S", "300"))
+
+FIX_LOOKUPS = Counter(
+    "worker_fix_lookup_total",
+    "Known-fix lookups at the start of an event, by outcome",
+    ["result"],
+)
+
+_SF_ID = re.compile(r"\b[a-zA-Z0-9]{5}0[a-zA-Z0-9]{9}(?:[a-zA-Z0-9]{3})?\b")
+_QUOTED = re.compile(r"(['\"]).*?\1")
+_LINE_COL = re.compile(r"line \d+, column \d+", re.IGNORECASE)
+_NUMBER = re.compile(r"\b\d+\b")
+_TOP_FRAME = re.compile(r"Class\.([A-Za-z0-9_]+)\.([A-Za-z0-9_]+)")
+_TOKEN = re.compile(r"[a-z_][a-z0-9_]+")
+
+
+# ---------- Normalization ----------
+
+def normalize_error(event: dict) -> str:
+    """Error text with record ids, literals, numbers and line positions removed."""
+    message = str(event.get("message") or "")
+    for pattern, repl in ((_LINE_COL, " "), (_SF_ID, "<id>"), (_QUOTED, "<str>"), (_NUMBER, "<n>")):
+        message = pattern.sub(repl, message)
+
+    frame = _TOP_FRAME.search(str(event.get("stackTrace") or ""))
+    parts = [
+        " ".join(message.lower().split()),
+        str(event.get("function") or "").lower(),
+        f"{frame.group(1)}.{frame.group(2)}".lower() if frame else "",
+    ]
+    return " | ".join(parts)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# ---------- Index ----------
+
+@dataclass
+class KnownFix:
+    id: Optional[int]
+    fingerprint: str
+    normalized_text: str
+    source_event_id: Optional[str]
+    fix_id: Optional[str]
+    fix_artifact: Optional[str]
+    jira_key: Optional[str]
+    jira_url: Optional[str]
+    pr_url: Optional[str]
+    quality_score: Optional[float]
+
+
+@dataclass
+class FixMatch:
+    fix: KnownFix
+    method: str  # "fingerprint" | "similarity"
+    score: float
+
+
+class TfidfIndex:
+    """Sparse TF-IDF with an inverted index; IDF is recomputed lazily after writes."""
+
+    def __init__(self):
+        self._docs: Dict[str, TermCounter] = {}
+        self._postings: Dict[str, set] = {}
+        self._idf: Dict[str, float] = {}
+        self._norms: Dict[str, float] = {}
+        self._dirty = False
+
+    @staticmethod
+    def tokens(text: str) -> TermCounter:
+        return TermCounter(_TOKEN.findall(text.lower()))
+
+    def add(self, key: str, text: str) -> None:
+        self.remove(key)
+        terms = self.tokens(text)
+        self._docs[key] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(key)
+        self._dirty = True
+
+    def remove(self, key: str) -> None:
+        for term in self._docs.pop(key, ()):
+            self._postings.get(term, set()).discard(key)
+        self._dirty = True
+
+    def _weights(self, terms: TermCounter) -> Dict[str, float]:
+        return {t: (1 + math.log(c)) * self._idf.get(t, 0.0) for t, c in terms.items()}
+
+    def _reindex(self) -> None:
+        n = len(self._docs)
+        self._idf = {t: math.log((1 + n) / (1 + len(keys))) + 1 for t, keys in self._postings.items() if keys}
+        self._norms = {
+            key: math.sqrt(sum(w * w for w in self._weights(terms).values())) or 1.0
+            for key, terms in self._docs.items()
+        }
+        self._dirty = False
+
+    def best(self, text: str) -> Optional[tuple]:
+        """(key, cosine) of the most similar document, or None."""
+        if self._dirty:
+            self._reindex()
+        query = self._weights(self.tokens(text))
+        query_norm = math.sqrt(sum(w * w for w in query.values()))
+        if not query_norm:
+            return None
+
+        scores: Dict[str, float] = {}
+        for term, weight in query.items():
+            idf = self._idf.get(term)
+            if not idf:
+                continue
+            for key in self._postings.get(term, ()):
+                doc_weight = (1 + math.log(self._docs[key][term])) * idf
+                scores[key] = scores.get(key, 0.0) + weight * doc_weight
+        if not scores:
+            return None
+
+        key, dot = max(scores.items(), key=lambda kv: kv[1])
+        return key, dot / (query_norm * self._norms[key])
+
+
+# ---------- Store ----------
+
+class FixKnowledgeStore:
+    def __init__(self, threshold: float = FIX_REUSE_THRESHOLD, min_quality: float = FIX_REUSE_MIN_QUALITY):
+        self.threshold = threshold
+        self.min_quality = min_quality
+        self._by_fingerprint: Dict[str, KnownFix] = {}
+        self._index = TfidfIndex()
+
+    def _add(self, fix: KnownFix) -> None:
+        self._by_fingerprint[fix.fingerprint] = fix
+        self._index.add(fix.fingerprint, fix.normalized_text)
+
+    async def load(self) -> None:
+        async with get_session_factory()() as session:
+            rows = await list_resolved_fixes(session)
+
+        self._by_fingerprint = {}
+        self._index = TfidfIndex()
+        for row in rows:
+            self._add(KnownFix(
+                id=row.id, fingerprint=row.fingerprint, normalized_text=row.normalized_text,
+                source_event_id=row.source_event_id, fix_id=row.fix_id, fix_artifact=row.fix_artifact,
+                jira_key=row.jira_key, jira_url=row.jira_url, pr_url=row.pr_url, quality_score=row.quality_score,
+            ))
+        logger.info(f"🧩 Loaded {len(rows)} known fixes")
+
+    async def run_refresher(self) -> None:
+        """Pick up fixes saved by other workers."""
+        while True:
+            await asyncio.sleep(FIX_STORE_REFRESH_INTERVAL_S)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.warning(f"⚠ Known-fix refresh failed: {e}")
+
+    def lookup(self, event: dict) -> Optional[FixMatch]:
+        if not FIX_REUSE_ENABLED:
+            return None
+
+        normalized = normalize_error(event)
+        exact = self._by_fingerprint.get(fingerprint(normalized))
+        if exact is not None:
+            FIX_LOOKUPS.labels(result="fingerprint").inc()
+            return FixMatch(exact, "fingerprint", 1.0)
+
+        best = self._index.best(normalized)
+        if best is not None and best[1] >= self.threshold:
+            FIX_LOOKUPS.labels(result="similarity").inc()
+            return FixMatch(self._by_fingerprint[best[0]], "similarity", round(best[1], 4))
+
+        FIX_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    async def remember(self, event: dict, result: dict) -> None:
+        """Save an approved result with a Jira issue so later equivalent errors can reuse it."""
+        scores = result.get("scores") or {}
+        jira = result.get("jira") or {}
+        quality = scores.get("quality")
+        if not scores.get("approved") or not jira.get("key"):
+            return
+        if not isinstance(quality, (int, float)) or quality < self.min_quality:
+            return
+
+        normalized = normalize_error(event)
+        fix = KnownFix(
+            id=None,
+            fingerprint=fingerprint(normalized),
+            normalized_text=normalized,
+            source_event_id=result.get("event_id"),
+            fix_id=result.get("fix_id"),
+            fix_artifact=((result.get("artifacts") or {}).get("fix_proposals") or {}).get("sha256"),
+            jira_key=jira.get("key"),
+            jira_url=jira.get("url"),
+            pr_url=result.get("pr_url"),
+            quality_score=float(quality),
+        )
+        try:
+            async with get_session_factory()() as session:
+                await save_resolved_fix(
+                    session,
+                    fingerprint=fix.fingerprint,
+                    normalized_text=fix.normalized_text,
+                    source_event_id=fix.source_event_id,
+                    fix_id=fix.fix_id,
+                    fix_artifact=fix.fix_artifact,
+                    jira_key=fix.jira_key,
+                    jira_url=fix.jira_url,
+                    pr_url=fix.pr_url,
+                    quality_score=fix.quality_score,
+                    hallucination_score=scores.get("hallucination"),
+                    confidence=scores.get("confidence"),
+                )
+        except Exception as e:
+            logger.warning(f"⚠ Could not save resolved fix: {e}")
+            return
+
+        current = self._by_fingerprint.get(fix.fingerprint)
+        if current is None or (current.quality_score or 0) <= fix.quality_score:
+            self._add(fix)
+
+    async def record_reuse(self, match: FixMatch) -> None:
+        if match.fix.id is None:
+            return  # Saved by this worker since the last load; counted after the next refresh.
+        try:
+            async with get_session_factory()() as session:
+                await record_fix_reuse(session, match.fix.id)
+        except Exception as e:
+            logger.warning(f"⚠ Could not record fix reuse: {e}")
+
+
+def reuse_result(event_id: Optional[str], match: FixMatch) -> dict:
+    """Compact result (see agents.core.results) for an event answered from the store."""
+    fix = match.fix
+    return {
+        "schema": RESULT_SCHEMA_VERSION,
+        "event_id": event_id,
+        "status": "reused",
+        "fix_id": fix.fix_id,
+        "jira": {"key": fix.jira_key, "url": fix.jira_url} if fix.jira_key else None,
+        "pr_url": fix.pr_url,
+        "scores": {"quality": fix.quality_score},
+        "reused_from": {"event_id": fix.source_event_id, "method": match.method, "similarity": match.score},
+        "artifacts": {"fix_proposals": {"sha256": fix.fix_artifact, "kind": "fix_proposals"}} if fix.fix_artifact else {},
+    }
+
+
+fix_store = FixKnowledgeStore()
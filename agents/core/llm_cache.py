@@ -0,0 +1,251 @@
+# agents/core/llm_cache.py
+"""
+Persistent response cache for the agents' chat models.
+
+Responses are only cached for calls made at temperature 0 (set on the model
+or passed at call time), so a replayed event, a redelivery or a regeneration
+round with identical inputs can reuse the earlier response. A model with no
+explicit temperature runs at its provider's default and is not cached.
+Plugged into each model through LangChain's `cache=` hook; the key is a
+SHA-256 of the model parameters (bound tools included) and the messages,
+with per-run message ids stripped so equal conversations hash equally.
+
+Backed by SQLite in WAL mode, so several worker processes on one host can
+share the file. Entries expire after LLM_CACHE_TTL_S and the least recently
+used are evicted beyond LLM_CACHE_MAX_ENTRIES / LLM_CACHE_MAX_MB.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from loguru import logger
+from prometheus_client import Counter
+
+from agents.core.config import data_path
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or data_path("llm_cache.sqlite3")
+LLM_CACHE_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+# Eviction scans the table, so only run it every N writes.
+EVICT_EVERY_WRITES = 100
+# Skip the access-time write on hits that were touched recently.
+TOUCH_INTERVAL_S = 60
+
+LLM_CACHE_REQUESTS = Counter(
+    "agent_llm_cache_requests_total",
+    "LLM cache lookups by model and result",
+    ["model", "result"],
+)
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+# Call-time parameters: str(sorted(kwargs.items())), the whole llm_string for non-serializable models.
+_MODEL = re.compile(r"'(?:model_name|model)',\s*'([^']+)'")
+_TEMPERATURE = re.compile(r"'temperature',\s*([0-9.]+)")
+
+
+@contextmanager
+def bypass_llm_cache():
+    """Force fresh LLM calls (and don't store them) within this block."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def llm_params(llm_string: str) -> Dict[str, Any]:
+    """
+    Model name and temperature from LangChain's llm_string. Serializable
+    models give `json.dumps(model) + "---" + str(sorted(call_kwargs))`: the
+    constructor's kwargs come from the JSON, overridden by the call-time tail.
+    """
+    params: Dict[str, Any] = {}
+    tail = llm_string
+    try:
+        head, end = json.JSONDecoder().raw_decode(llm_string)
+    except ValueError:
+        head, end = None, 0
+    if isinstance(head, dict) and llm_string.startswith("---", end):
+        kwargs = head.get("kwargs") or {}
+        model = kwargs.get("model_name") or kwargs.get("model")
+        if isinstance(model, str):
+            params["model"] = model
+        temperature = kwargs.get("temperature")
+        if isinstance(temperature, (int, float)) and not isinstance(temperature, bool):
+            params["temperature"] = float(temperature)
+        tail = llm_string[end + 3:]
+
+    m = _MODEL.search(tail)
+    if m:
+        params["model"] = m.group(1)
+    m = _TEMPERATURE.search(tail)
+    if m:
+        params["temperature"] = float(m.group(1))
+    return params
+
+
+def model_of(llm_string: str) -> str:
+    return llm_params(llm_string).get("model", "unknown")
+
+
+def _strip_run_ids(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {
+            k: _strip_run_ids(v) for k, v in obj.items()
+            # Serialized class paths ("id": [...]) are kept; run and provider ids are not.
+            if k not in ("id", "tool_call_id", "response_metadata", "usage_metadata") or isinstance(v, list)
+        }
+    if isinstance(obj, list):
+        return [_strip_run_ids(v) for v in obj]
+    return obj
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    try:
+        canonical = json.dumps(_strip_run_ids(json.loads(prompt)), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = prompt
+    return hashlib.sha256(f"{llm_string}\x00{canonical}".encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_s: int = LLM_CACHE_TTL_S,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key         TEXT PRIMARY KEY,
+                model       TEXT NOT NULL,
+                value       BLOB NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL + busy timeout for other processes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _cacheable(params: Dict[str, Any]) -> bool:
+        if _bypass.get():
+            return False
+        # No explicit temperature means the provider's default, which samples.
+        return params.get("temperature") == 0.0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence]:
+        return self._lookup(prompt, llm_string, count_misses=True)
+
+    def peek(self, prompt: str, llm_string: str) -> Optional[Sequence]:
+        """lookup() that only counts hits: for a caller (the router) whose miss goes on to the model's own lookup."""
+        return self._lookup(prompt, llm_string, count_misses=False)
+
+    def _lookup(self, prompt: str, llm_string: str, count_misses: bool) -> Optional[Sequence]:
+        params = llm_params(llm_string)
+        model = params.get("model", "unknown")
+        if not self._cacheable(params):
+            if count_misses:
+                LLM_CACHE_REQUESTS.labels(model=model, result="bypass").inc()
+            return None
+
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                "SELECT value, created_at, accessed_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_s:
+                if count_misses:
+                    LLM_CACHE_REQUESTS.labels(model=model, result="miss").inc()
+                return None
+            if now - row[2] > TOUCH_INTERVAL_S:
+                self._conn().execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            generations = [loads(g) for g in json.loads(zlib.decompress(row[0]))]
+        except Exception as e:
+            # The cache must never fail a model call.
+            logger.warning(f"⚠ LLM cache lookup failed: {e}")
+            LLM_CACHE_REQUESTS.labels(model=model, result="error").inc()
+            return None
+
+        LLM_CACHE_REQUESTS.labels(model=model, result="hit").inc()
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence) -> None:
+        params = llm_params(llm_string)
+        if not self._cacheable(params):
+            return
+        try:
+            value = zlib.compress(json.dumps([dumps(g) for g in return_val]).encode("utf-8"))
+            now = time.time()
+            self._conn().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(prompt, llm_string), params.get("model", "unknown"), value, len(value), now, now),
+            )
+        except Exception as e:
+            logger.warning(f"⚠ LLM cache update failed: {e}")
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY_WRITES == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones beyond the count and size bounds."""
+        conn = self._conn()
+        try:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_s,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "  SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total > self.max_bytes:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "  SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running"
+                    "  FROM llm_cache) WHERE running > ?)",
+                    (self.max_bytes,),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠ LLM cache eviction failed: {e}")
+
+    def clear(self, **kwargs: Any) -> None:
+        self._conn().execute("DELETE FROM llm_cache")
+
+
+llm_cache: Optional[SQLiteLLMCache] = SQLiteLLMCache() if LLM_CACHE_ENABLED else None
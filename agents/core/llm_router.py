@@ -0,0 +1,447 @@
+# agents/core/llm_router.py
+"""
+Rate-limit-aware routing between chat model providers.
+
+A RoutedChatModel wraps an ordered list of routes (model + provider + API
+key). Each call goes to the first route that is not cooling down after a 429
+and has budget, waiting for budget only when every route is short:
+
+- token buckets per API key and per model (requests and tokens per minute);
+- a concurrency cap per provider, shared by every in-flight orchestration in
+  the process;
+- 429s put the API key in cooldown for Retry-After (every route on that key,
+  across models), and timeouts/5xx put the model in a short error cooldown;
+  the call fails over to the next route (OpenRouter to Gemini and back).
+
+The wrapped models should have their own retries disabled: retrying inside
+the SDK is what used to stall a whole stage on one exhausted key.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import get_llm_cache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableBinding
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram
+from pydantic import ConfigDict
+
+ROUTER_CALL_TIMEOUT_S = float(os.getenv("ROUTER_CALL_TIMEOUT_S", "120"))
+ROUTER_MAX_WAIT_S = float(os.getenv("ROUTER_MAX_WAIT_S", "300"))
+ROUTER_ERROR_COOLDOWN_S = float(os.getenv("ROUTER_ERROR_COOLDOWN_S", "15"))
+ROUTER_DEFAULT_RETRY_AFTER_S = float(os.getenv("ROUTER_DEFAULT_RETRY_AFTER_S", "30"))
+
+ROUTER_QUEUE_DEPTH = Gauge(
+    "agent_llm_router_queue_depth",
+    "LLM calls waiting for budget or a provider slot",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+ROUTER_WAIT = Histogram(
+    "agent_llm_router_wait_seconds",
+    "Time an LLM call waited for budget and a provider slot",
+    ["provider"],
+    buckets=(0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+ROUTER_FAILOVERS = Counter(
+    "agent_llm_router_failovers_total",
+    "LLM calls moved off a route, by reason",
+    ["model", "reason"],
+)
+
+
+# ---------- Budgets ----------
+
+class RateBudget:
+    """Per-minute token bucket that can go into debt: reserving returns the wait instead of blocking."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def peek(self, amount: float) -> float:
+        if self.per_minute <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            short = amount - self.level
+        return max(0.0, short * 60 / self.per_minute)
+
+    def reserve(self, amount: float) -> float:
+        if self.per_minute <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+            short = -self.level
+        return max(0.0, short * 60 / self.per_minute)
+
+    def settle(self, delta: float) -> None:
+        """Charge (or refund, if negative) the difference between estimate and actual."""
+        if self.per_minute > 0:
+            with self._lock:
+                self.level -= delta
+
+
+class ConcurrencyCap:
+    """In-flight limit shared by async callers and sync (thread) callers."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    async def acquire_async(self) -> None:
+        # Polls instead of parking a thread per waiter; slots free up on a seconds scale.
+        delay = 0.01
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class ProviderLimits:
+    """Budgets and concurrency cap shared by every route of one provider."""
+
+    def __init__(self, name: str):
+        env = name.upper()
+        self.name = name
+        self.key_rpm = float(os.getenv(f"ROUTER_{env}_KEY_RPM", "20"))
+        self.key_tpm = float(os.getenv(f"ROUTER_{env}_KEY_TPM", "0"))
+        self.model_rpm = float(os.getenv(f"ROUTER_{env}_MODEL_RPM", "0"))
+        self.model_tpm = float(os.getenv(f"ROUTER_{env}_MODEL_TPM", "0"))
+        self.slots = ConcurrencyCap(int(os.getenv(f"ROUTER_{env}_CONCURRENCY", "4")))
+
+
+_providers: Dict[str, ProviderLimits] = {}
+_key_budgets: Dict[str, tuple] = {}
+_model_budgets: Dict[str, tuple] = {}
+# Cooldown deadlines (monotonic), shared by every route on the same key or model.
+_key_cooldowns: Dict[str, float] = {}
+_model_cooldowns: Dict[str, float] = {}
+_registry_lock = threading.Lock()
+
+
+def _provider(name: str) -> ProviderLimits:
+    with _registry_lock:
+        if name not in _providers:
+            _providers[name] = ProviderLimits(name)
+        return _providers[name]
+
+
+def _budgets(registry: Dict[str, tuple], key: str, rpm: float, tpm: float) -> tuple:
+    with _registry_lock:
+        if key not in registry:
+            registry[key] = (RateBudget(rpm), RateBudget(tpm))
+        return registry[key]
+
+
+# ---------- Routes ----------
+
+class Route:
+    def __init__(self, model: BaseChatModel, provider: str, key_id: str):
+        self.model = model
+        self.provider = _provider(provider)
+        self.key_id = key_id
+        self.name = getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+        self.key = f"{provider}:{key_id}"
+        self.model_key = f"{provider}:{self.name}"
+        self.key_budgets = _budgets(_key_budgets, self.key, self.provider.key_rpm, self.provider.key_tpm)
+        self.model_budgets = _budgets(_model_budgets, self.model_key, self.provider.model_rpm, self.provider.model_tpm)
+
+    def cooling_for(self, now: float) -> float:
+        until = max(_key_cooldowns.get(self.key, 0.0), _model_cooldowns.get(self.model_key, 0.0))
+        return max(0.0, until - now)
+
+    def cool_down(self, seconds: float, reason: str) -> None:
+        """A 429 cools the API key for every model on it; other failures cool this model on every key."""
+        registry, key = (_key_cooldowns, self.key) if reason == "rate_limited" else (_model_cooldowns, self.model_key)
+        with _registry_lock:
+            registry[key] = max(registry.get(key, 0.0), time.monotonic() + seconds)
+
+    def wait_for(self, tokens: float) -> float:
+        requests, token_budget = self.key_budgets
+        model_requests, model_tokens = self.model_budgets
+        return max(requests.peek(1), token_budget.peek(tokens), model_requests.peek(1), model_tokens.peek(tokens))
+
+    def reserve(self, tokens: float) -> float:
+        requests, token_budget = self.key_budgets
+        model_requests, model_tokens = self.model_budgets
+        return max(requests.reserve(1), token_budget.reserve(tokens), model_requests.reserve(1), model_tokens.reserve(tokens))
+
+    def settle(self, delta: float) -> None:
+        self.key_budgets[1].settle(delta)
+        self.model_budgets[1].settle(delta)
+
+
+# SDK exception types by class name, so no provider SDK has to be importable here.
+_RATE_LIMIT_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+_CONNECTION_ERRORS = {"APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout", "ReadTimeout",
+                      "TimeoutException", "ServiceUnavailable", "DeadlineExceeded"}
+
+
+def _status_of(error: BaseException) -> Optional[int]:
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(response, "status_code", None),
+                   getattr(error, "code", None)):
+        if isinstance(status, int) and not isinstance(status, bool):
+            return status
+    return None
+
+
+def _retry_after(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return ROUTER_DEFAULT_RETRY_AFTER_S
+
+
+def classify_error(error: BaseException) -> tuple:
+    """
+    (reason, retry_after_s) for errors worth failing over on; reason is None
+    for fatal ones. Decided by HTTP status and exception type, following
+    the cause chain through wrappers such as LangChain's provider errors.
+    """
+    seen = 0
+    while error is not None and seen < 5:
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            return "timeout", ROUTER_ERROR_COOLDOWN_S
+
+        status = _status_of(error)
+        names = {cls.__name__ for cls in type(error).__mro__}
+        if status == 429 or names & _RATE_LIMIT_ERRORS:
+            return "rate_limited", _retry_after(error)
+        if status is not None and status >= 500:
+            return "server_error", ROUTER_ERROR_COOLDOWN_S
+        if isinstance(error, ConnectionError) or names & _CONNECTION_ERRORS:
+            return "connection", ROUTER_ERROR_COOLDOWN_S
+        if status is not None:
+            return None, 0.0
+
+        error, seen = error.__cause__ or error.__context__, seen + 1
+    return None, 0.0
+
+
+def estimate_tokens(messages: Sequence[BaseMessage], max_tokens: int = 2048) -> float:
+    chars = sum(len(m.content) if isinstance(m.content, str) else len(str(m.content)) for m in messages)
+    return chars / 4 + max_tokens
+
+
+# ---------- Chat Model ----------
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model that sends each call to the best available route."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True, protected_namespaces=())
+
+    routes: List[Any]
+    model_name: str = ""
+    bound_tools: Optional[tuple] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"routes": [f"{r.provider.name}:{r.name}" for r in self.routes]}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"bound_tools": (tools, kwargs)})
+
+    def _target(self, route: Route):
+        if self.bound_tools is None:
+            return route.model
+        tools, kwargs = self.bound_tools
+        return route.model.bind_tools(tools, **kwargs)
+
+    def _cached(self, messages, stop, kwargs) -> Optional[ChatResult]:
+        """
+        A cached response from any route's model, looked up the way the model
+        itself would. Done before budgets, cooldowns and provider slots, so
+        replayed calls neither wait for nor spend request budget.
+        """
+        prompt = None
+        for route in self.routes:
+            cache = route.model.cache
+            if not isinstance(cache, BaseCache):
+                cache = get_llm_cache() if cache is None or cache is True else None
+            if cache is None:
+                continue
+            target = self._target(route)
+            params = {**target.kwargs, **kwargs} if isinstance(target, RunnableBinding) else kwargs
+            prompt = prompt or dumps(messages)
+            try:
+                # peek: a miss is counted once, by the model's own lookup.
+                generations = getattr(cache, "peek", cache.lookup)(
+                    prompt, route.model._get_llm_string(stop=stop, **params)
+                )
+            except Exception as e:
+                logger.warning(f"⚠ LLM cache lookup in router failed: {e}")
+                continue
+            if generations:
+                return ChatResult(generations=list(generations))
+        return None
+
+    def _choose(self, tokens: float) -> tuple:
+        """(route, wait_s) for the route that can start soonest, preferring earlier routes on ties."""
+        now = time.monotonic()
+        best = None
+        for route in self.routes:
+            wait = max(route.cooling_for(now), route.wait_for(tokens))
+            if best is None or wait < best[1]:
+                best = (route, wait)
+            if wait == 0:
+                break
+        return best
+
+    @staticmethod
+    def _result(message: AIMessage, route: Route, tokens: float) -> ChatResult:
+        usage = message.usage_metadata or {}
+        if usage:
+            route.settle(usage.get("total_tokens", tokens) - tokens)
+        message.response_metadata.setdefault("model_name", route.name)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cached = await asyncio.to_thread(self._cached, messages, stop, kwargs)
+        if cached is not None:
+            return cached
+
+        tokens = estimate_tokens(messages)
+        deadline = time.monotonic() + ROUTER_MAX_WAIT_S
+        last_error: Optional[BaseException] = None
+
+        for _ in range(len(self.routes) * 3):
+            route, wait = self._choose(tokens)
+            if time.monotonic() + wait > deadline:
+                break
+
+            async with self._slot(route, tokens):
+                try:
+                    message = await asyncio.wait_for(
+                        # callbacks=[]: the router's own run already reports this call
+                        self._target(route).ainvoke(messages, stop=stop, config={"callbacks": []}, **kwargs),
+                        timeout=ROUTER_CALL_TIMEOUT_S,
+                    )
+                    return self._result(message, route, tokens)
+                except Exception as e:
+                    reason, cooldown = classify_error(e)
+                    if reason is None:
+                        raise
+                    self._failed(route, reason, cooldown, e)
+                    last_error = e
+
+        raise last_error or TimeoutError(f"No LLM route available within {ROUTER_MAX_WAIT_S:.0f}s")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cached = self._cached(messages, stop, kwargs)
+        if cached is not None:
+            return cached
+
+        tokens = estimate_tokens(messages)
+        deadline = time.monotonic() + ROUTER_MAX_WAIT_S
+        last_error: Optional[BaseException] = None
+
+        for _ in range(len(self.routes) * 3):
+            route, wait = self._choose(tokens)
+            if time.monotonic() + wait > deadline:
+                break
+
+            with self._sync_slot(route, tokens):
+                try:
+                    message = self._target(route).invoke(messages, stop=stop, config={"callbacks": []}, **kwargs)
+                    return self._result(message, route, tokens)
+                except Exception as e:
+                    reason, cooldown = classify_error(e)
+                    if reason is None:
+                        raise
+                    self._failed(route, reason, cooldown, e)
+                    last_error = e
+
+        raise last_error or TimeoutError(f"No LLM route available within {ROUTER_MAX_WAIT_S:.0f}s")
+
+    @staticmethod
+    def _failed(route: Route, reason: str, cooldown: float, error: BaseException) -> None:
+        route.cool_down(cooldown, reason)
+        ROUTER_FAILOVERS.labels(model=route.name, reason=reason).inc()
+        logger.warning(f"⤳ LLM route {route.provider.name}:{route.name} {reason} ({error}); "
+                       f"cooling down {cooldown:.0f}s and failing over")
+
+    @asynccontextmanager
+    async def _slot(self, route: Route, tokens: float):
+        provider = route.provider.name
+        started = time.monotonic()
+        ROUTER_QUEUE_DEPTH.labels(provider=provider).inc()
+        try:
+            wait = max(route.cooling_for(started), route.reserve(tokens))
+            if wait:
+                await asyncio.sleep(wait)
+            await route.provider.slots.acquire_async()
+        finally:
+            ROUTER_QUEUE_DEPTH.labels(provider=provider).dec()
+        ROUTER_WAIT.labels(provider=provider).observe(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            route.provider.slots.release()
+
+    @contextmanager
+    def _sync_slot(self, route: Route, tokens: float):
+        provider = route.provider.name
+        started = time.monotonic()
+        ROUTER_QUEUE_DEPTH.labels(provider=provider).inc()
+        try:
+            wait = max(route.cooling_for(started), route.reserve(tokens))
+            if wait:
+                time.sleep(wait)
+            route.provider.slots.acquire()
+        finally:
+            ROUTER_QUEUE_DEPTH.labels(provider=provider).dec()
+        ROUTER_WAIT.labels(provider=provider).observe(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            route.provider.slots.release()
+
+
+def route(primary: BaseChatModel, provider: str, key_id: str, alternates: Sequence[tuple] = ()) -> RoutedChatModel:
+    """
+    Build a routed model: `primary` first, then each `(model, provider, key_id)`
+    alternate in order.
+    """
+    routes = [Route(primary, provider, key_id), *(Route(m, p, k) for m, p, k in alternates)]
+    # cache=False: the wrapped models cache their own responses; _cached reads them before routing.
+    return RoutedChatModel(routes=routes, model_name=routes[0].name, cache=False)
@@ -0,0 +1,22 @@
+# agents/core/offload.py
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+# Dedicated, bounded pool for tool code that must stay synchronous (SDK
+# clients for Weaviate, Tavily, Salesforce, psycopg2). Native-async paths
+# never touch it, so hundreds of orchestrations can wait on HTTP in one
+# process while only this many threads ever block.
+TOOL_THREADS = int(os.getenv("AGENT_TOOL_THREADS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="agent-tool")
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the bounded tool pool (context vars included, like asyncio.to_thread)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, partial(ctx.run, fn, *args, **kwargs))
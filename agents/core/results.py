@@ -0,0 +1,283 @@
+# agents/core/results.py
+"""
+Compact orchestrator results.
+
+The raw LangGraph state holds every agent message, tool call and the full
+Apex bodies fetched during retrieval. Published results keep only what
+downstream consumers act on (status, chosen fix, Jira, PR, scores, timings,
+tokens); the bulky parts go to the artifact store and are referenced by hash.
+"""
+import ast
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from agents.core.artifacts import ArtifactStore, canonical_bytes
+
+RESULT_SCHEMA_VERSION = 1
+# Well under Kafka's default 1 MB message.max.bytes.
+RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", str(64 * 1024)))
+SUMMARY_MAX_CHARS = 2000
+
+# Tag of a pipeline stage run (see agents.coordinator.pipeline); child runs inherit
+# it under their own name, so only the run named like the tag counts as the stage.
+STAGE_TAG_PREFIX = "stage:"
+
+_PR_URL = re.compile(r"https://github\.com/[\w.-]+/[\w.-]+/pull/\d+")
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+# ---------- Run Recorder ----------
+
+def stage_tag(name: str) -> str:
+    return f"{STAGE_TAG_PREFIX}{name}"
+
+
+class RunRecorder(BaseCallbackHandler):
+    """
+    Collects per-stage timings, token usage and applied patches while the
+    graph runs. Callbacks propagate into subagent graphs, so this also sees
+    the LLM calls and tools that never appear in the coordinator's history.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self.patches: List[dict] = []
+        self._open: Dict[Any, tuple] = {}
+
+    @staticmethod
+    def stage_name(serialized: Optional[dict], inputs: Optional[dict]) -> str:
+        name = (serialized or {}).get("name") or "tool"
+        # Subagents are invoked through deepagents' `task` tool.
+        if name == "task" and isinstance(inputs, dict) and inputs.get("subagent_type"):
+            return inputs["subagent_type"]
+        return name
+
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        stage = self.stage_name(serialized, inputs)
+        self._open[run_id] = (stage, time.perf_counter())
+        if stage == "apply_apex_patch" and isinstance(inputs, dict):
+            self.patches.append({"file_path": inputs.get("file_path"), "content": inputs.get("content")})
+
+    def _close(self, run_id, ok: bool) -> None:
+        opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        stage, started = opened
+        entry = self.stages.setdefault(stage, {"calls": 0, "errors": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["errors"] += 0 if ok else 1
+        entry["seconds"] += time.perf_counter() - started
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name and stage_tag(name) in (tags or []):
+            self._open[run_id] = (name, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._close(run_id, ok=True)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._close(run_id, ok=False)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._close(run_id, ok=True)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._close(run_id, ok=False)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        llm_output = response.llm_output or {}
+        for generations in response.generations:
+            for gen in generations:
+                message = getattr(gen, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                metadata = getattr(message, "response_metadata", None) or {}
+                model = metadata.get("model_name") or llm_output.get("model_name") or "unknown"
+                entry = self.tokens.setdefault(model, {"calls": 0, "input": 0, "output": 0})
+                entry["calls"] += 1
+                entry["input"] += usage.get("input_tokens", 0)
+                entry["output"] += usage.get("output_tokens", 0)
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self.started
+
+
+# ---------- Transcript Parsing ----------
+
+def serialize_messages(messages) -> List[dict]:
+    """Full, JSON-safe transcript (stored as an artifact, never published inline)."""
+    out = []
+    for m in messages or []:
+        if not isinstance(m, BaseMessage):
+            out.append({"type": "unknown", "content": str(m)})
+            continue
+        item = {"type": m.type, "content": m.content}
+        if isinstance(m, AIMessage) and m.tool_calls:
+            item["tool_calls"] = [{"id": c.get("id"), "name": c.get("name"), "args": c.get("args")} for c in m.tool_calls]
+        if isinstance(m, ToolMessage):
+            item["name"] = m.name
+            item["tool_call_id"] = m.tool_call_id
+        out.append(item)
+    return out
+
+
+def parse_json_loose(text: Any) -> Any:
+    """Best-effort JSON from an agent's reply (fenced, prefixed or Python-repr'd)."""
+    if not isinstance(text, str):
+        return text
+    s = _FENCE.sub("", text.strip())
+    for candidate in (s, s[s.find("{"): s.rfind("}") + 1], s[s.find("["): s.rfind("]") + 1]):
+        if not candidate:
+            continue
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+        try:
+            return ast.literal_eval(candidate)
+        except (ValueError, SyntaxError):
+            pass
+    return None
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "\n".join(c.get("text", "") if isinstance(c, dict) else str(c) for c in content)
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def tool_outputs(messages) -> List[tuple]:
+    """[(stage, content)] for every tool result, with subagent calls labelled by subagent name."""
+    labels = {}
+    for m in messages or []:
+        if isinstance(m, AIMessage):
+            for call in m.tool_calls or []:
+                args = call.get("args") or {}
+                labels[call.get("id")] = args.get("subagent_type") or call.get("name")
+    return [
+        (labels.get(m.tool_call_id) or m.name, _text(m.content))
+        for m in messages or [] if isinstance(m, ToolMessage)
+    ]
+
+
+# ---------- Compact Result ----------
+
+def _reasons(value: Any) -> Optional[List[str]]:
+    """The judge's reasons as a list of strings; models sometimes return one string."""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return [r if isinstance(r, str) else json.dumps(r, default=str) for r in value]
+    return [value if isinstance(value, str) else json.dumps(value, default=str)]
+
+
+def build_result(event_id: Optional[str], raw_result: Any, recorder: Optional[RunRecorder] = None,
+                 store: Optional[ArtifactStore] = None) -> Dict[str, Any]:
+    """
+    Reduce the raw orchestrator state to the compact result schema.
+    Writes artifacts when a store is given (blocking file I/O).
+    """
+    messages = raw_result.get("messages", []) if isinstance(raw_result, dict) else []
+    outputs = tool_outputs(messages)
+    # Pipeline mode records stage outputs in its state rather than as tool messages.
+    if isinstance(raw_result, dict):
+        outputs += [tuple(o) for o in raw_result.get("outputs") or []]
+
+    def last_output(stage: str):
+        for name, content in reversed(outputs):
+            if name == stage:
+                return content
+        return None
+
+    judge = parse_json_loose(last_output("judge-fix")) or {}
+    if not isinstance(judge, dict):
+        judge = {}
+    jira = parse_json_loose(last_output("create_jira_bug")) or {}
+    if not isinstance(jira, dict):
+        jira = {}
+
+    pr_urls = [u for _, content in outputs for u in _PR_URL.findall(content)]
+    final = next((m for m in reversed(messages) if isinstance(m, AIMessage) and m.content), None)
+    summary = _text(final.content) if final is not None else ""
+    pr_urls += _PR_URL.findall(summary)
+
+    if pr_urls:
+        status = "fix_applied"
+    elif jira.get("jira_key"):
+        status = "ticket_created"
+    elif judge.get("approved") is False:
+        status = "rejected"
+    else:
+        status = "completed"
+
+    result: Dict[str, Any] = {
+        "schema": RESULT_SCHEMA_VERSION,
+        "event_id": event_id,
+        "status": status,
+        "fix_id": judge.get("best_fix_id"),
+        "jira": {"key": jira.get("jira_key"), "url": jira.get("jira_url")} if jira.get("jira_key") else None,
+        "pr_url": pr_urls[-1] if pr_urls else None,
+        "scores": {
+            "approved": judge.get("approved"),
+            "quality": judge.get("quality_score"),
+            "hallucination": judge.get("hallucination_score"),
+            "confidence": judge.get("confidence"),
+        },
+        "reasons": _reasons(judge.get("reasons")),
+        "summary": summary[:SUMMARY_MAX_CHARS],
+    }
+
+    if recorder is not None:
+        result["timings"] = {
+            "total_s": round(recorder.elapsed_s, 3),
+            "stages": {k: {**v, "seconds": round(v["seconds"], 3)} for k, v in recorder.stages.items()},
+        }
+        result["tokens"] = {
+            "input": sum(t["input"] for t in recorder.tokens.values()),
+            "output": sum(t["output"] for t in recorder.tokens.values()),
+            "by_model": recorder.tokens,
+        }
+
+    if store is not None:
+        artifacts = {"transcript": store.put(serialize_messages(messages), kind="transcript")}
+        for stage, kind in (("context-retrieval", "context"), ("fix-proposal", "fix_proposals")):
+            content = last_output(stage)
+            if content:
+                artifacts[kind] = store.put(parse_json_loose(content) or content, kind=kind)
+        if recorder is not None and recorder.patches:
+            artifacts["patches"] = store.put(recorder.patches, kind="patches")
+        result["artifacts"] = artifacts
+
+    return cap_payload(result)
+
+
+def cap_payload(result: Dict[str, Any], max_bytes: int = RESULT_MAX_BYTES) -> Dict[str, Any]:
+    """Shed free text, then per-stage detail, until the encoded result fits."""
+    if len(canonical_bytes(result)) <= max_bytes:
+        return result
+
+    result = dict(result, truncated=True)
+    steps = (
+        lambda r: r.update(summary=r.get("summary", "")[:200]),
+        lambda r: r.update(reasons=[str(x)[:200] for x in (r.get("reasons") or [])[:5]]),
+        lambda r: r.pop("reasons", None),
+        lambda r: r.get("tokens", {}).pop("by_model", None),
+        lambda r: r.get("timings", {}).pop("stages", None),
+        lambda r: r.pop("summary", None),
+    )
+    for step in steps:
+        step(result)
+        if len(canonical_bytes(result)) <= max_bytes:
+            break
+    return result
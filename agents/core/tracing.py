@@ -0,0 +1,269 @@
+# agents/core/tracing.py
+"""
+Per-stage tracing for the agent pipeline.
+
+Every LLM call, tool call and subagent run (via a LangChain callback) and
+every `@traced` function (Weaviate, Tavily, Salesforce queries) becomes a span
+with its duration, status, model, token usage, retries and payload sizes,
+tagged with the event id being processed.
+
+Spans feed Prometheus histograms on the worker metrics endpoint and, when
+AGENT_TRACE_FILE is set, one JSON line per span. Nothing here does I/O on the
+hot path except the optional buffered file write.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import Counter, Histogram
+
+from agents.core.checkpoints import current_event_id
+
+TRACING_ENABLED = os.getenv("AGENT_TRACING", "true").lower() == "true"
+TRACE_FILE = os.getenv("AGENT_TRACE_FILE")
+
+SPAN_DURATION = Histogram(
+    "agent_span_duration_seconds",
+    "Duration of agent pipeline spans",
+    ["kind", "name", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+SPAN_PAYLOAD = Histogram(
+    "agent_span_payload_bytes",
+    "Input/output payload size of agent pipeline spans",
+    ["kind", "name", "direction"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+LLM_TOKENS = Counter(
+    "agent_llm_tokens_total",
+    "Tokens used by LLM calls",
+    ["model", "direction"],
+)
+SPAN_RETRIES = Counter(
+    "agent_span_retries_total",
+    "Retries reported by LangChain runnables",
+    ["name"],
+)
+
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+# ---------- Sink ----------
+
+class JsonlSink:
+    """Appends one JSON object per finished span; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=64 * 1024)
+
+    def write(self, span: Dict[str, Any]) -> None:
+        line = json.dumps(span, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+
+_sink: Optional[JsonlSink] = JsonlSink(TRACE_FILE) if TRACING_ENABLED and TRACE_FILE else None
+
+
+def flush_traces() -> None:
+    if _sink is not None:
+        _sink.flush()
+
+
+def _payload_size(value: Any) -> Optional[int]:
+    # Only sizes that are free to compute: never serialize a payload just to measure it.
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    content = getattr(value, "content", None)
+    if isinstance(content, str):
+        return len(content)
+    return None
+
+
+def record_span(span: Dict[str, Any]) -> None:
+    kind, name, status = span["kind"], span["name"], span["status"]
+    SPAN_DURATION.labels(kind=kind, name=name, status=status).observe(span["duration_s"])
+    for direction in ("in", "out"):
+        size = span.get(f"bytes_{direction}")
+        if size is not None:
+            SPAN_PAYLOAD.labels(kind=kind, name=name, direction=direction).observe(size)
+    model = span.get("model")
+    if model:
+        for direction in ("input", "output"):
+            tokens = span.get(f"tokens_{direction}")
+            if tokens:
+                LLM_TOKENS.labels(model=model, direction=direction).inc(tokens)
+    if _sink is not None:
+        _sink.write(span)
+
+
+# ---------- Function Spans ----------
+
+@contextmanager
+def span(name: str, kind: str = "function", **attrs):
+    """Time a block as a child of the current span. Yields a dict for extra attributes."""
+    span_id = uuid.uuid4().hex[:16]
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    extra: Dict[str, Any] = dict(attrs)
+    started_at = time.time()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield extra
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_span.reset(token)
+        record_span({
+            "event_id": current_event_id.get(),
+            "span_id": span_id,
+            "parent_id": parent,
+            "kind": kind,
+            "name": name,
+            "status": status,
+            "started_at": started_at,
+            "duration_s": time.perf_counter() - start,
+            **extra,
+        })
+
+
+def traced(name: Optional[str] = None, kind: str = "function"):
+    """Decorator form of `span` for sync and async functions."""
+
+    def decorate(fn):
+        span_name = name or fn.__name__
+        if not TRACING_ENABLED:
+            return fn
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind) as extra:
+                    result = await fn(*args, **kwargs)
+                    _annotate_result(extra, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind) as extra:
+                result = fn(*args, **kwargs)
+                _annotate_result(extra, result)
+                return result
+        return wrapper
+
+    return decorate
+
+
+def _annotate_result(extra: Dict[str, Any], result: Any) -> None:
+    size = _payload_size(result)
+    if size is not None:
+        extra["bytes_out"] = size
+    elif isinstance(result, (list, tuple)):
+        extra["items_out"] = len(result)
+
+
+# ---------- LangChain Callback ----------
+
+class TracingCallback(BaseCallbackHandler):
+    """
+    Turns LangChain runs into spans. Subagents are invoked through deepagents'
+    `task` tool and are reported as kind="subagent" under their own name.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._open: Dict[Any, Dict[str, Any]] = {}
+
+    def _start(self, run_id, parent_run_id, kind: str, name: str, **attrs) -> None:
+        self._open[run_id] = {
+            "event_id": current_event_id.get(),
+            "span_id": str(run_id),
+            "parent_id": str(parent_run_id) if parent_run_id else None,
+            "kind": kind,
+            "name": name,
+            "started_at": time.time(),
+            "_start": time.perf_counter(),
+            "retries": 0,
+            **attrs,
+        }
+
+    def _end(self, run_id, status: str, **attrs) -> None:
+        opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        opened["duration_s"] = time.perf_counter() - opened.pop("_start")
+        opened["status"] = status
+        opened.update(attrs)
+        record_span(opened)
+
+    # Tools and subagents
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, inputs=None, **kwargs):
+        name = (serialized or {}).get("name") or "tool"
+        kind = "tool"
+        if name == "task" and isinstance(inputs, dict) and inputs.get("subagent_type"):
+            name, kind = inputs["subagent_type"], "subagent"
+        self._start(run_id, parent_run_id, kind, name, bytes_in=_payload_size(input_str))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, "ok", bytes_out=_payload_size(output))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error", error=type(error).__name__)
+
+    # LLM calls
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        size = sum(len(m.content) for batch in messages for m in batch if isinstance(m.content, str))
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, parent_run_id, "llm", model, model=model, bytes_in=size)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, parent_run_id, "llm", model, model=model, bytes_in=sum(len(p) for p in prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tokens_in = tokens_out = 0
+        size = 0
+        for generations in response.generations:
+            for gen in generations:
+                size += len(gen.text or "")
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+        self._end(run_id, "ok", tokens_input=tokens_in, tokens_output=tokens_out, bytes_out=size)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error", error=type(error).__name__)
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        opened = self._open.get(run_id)
+        if opened is not None:
+            opened["retries"] += 1
+            SPAN_RETRIES.labels(name=opened["name"]).inc()
+
+
+def with_tracing(config: Optional[dict]) -> Optional[dict]:
+    """Add a TracingCallback to a run config (a no-op when tracing is disabled)."""
+    if not TRACING_ENABLED:
+        return config
+    config = dict(config or {})
+    config["callbacks"] = [*(config.get("callbacks") or []), TracingCallback()]
+    return config
@@ -2,7 +2,7 @@
 import os
 from deepagents import create_deep_agent
 
-from agents.tools.github.git import apply_apex_patch, git_create_branch, git_commit, git_push
+from agents.tools.github.git import apply_apex_patch, read_apex_class, git_create_branch, git_commit, git_push
 from agents.tools.github.github import github_create_pr
 from agents.LLMs import fix_application_brain_openrouter
 
@@ -31,6 +31,7 @@ def build_agent(model_instance=None):
         model=model_to_use,
         tools=[
             # File modification
+            read_apex_class,
             apply_apex_patch,
 
             # Git operations
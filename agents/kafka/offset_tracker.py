@@ -0,0 +1,72 @@
+# agents/kafka/offset_tracker.py
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from aiokafka.structs import TopicPartition, OffsetAndMetadata
+
+
+@dataclass
+class PartitionOffsets:
+    """Offsets of one partition between the last commit and the fetch position."""
+    pending: set = field(default_factory=set)
+    highest_seen: int = -1
+    committed: Optional[int] = None
+
+
+class OffsetTracker:
+    """
+    Tracks concurrently processed messages and exposes, per partition, the
+    contiguous low watermark: the lowest offset still pending, or one past the
+    highest finished offset when nothing is pending.
+
+    Committing that watermark instead of `msg.offset + 1` means a fast message
+    at offset 105 can never commit past a slow one at 101. Using the lowest
+    pending offset (rather than counting up from the last commit) also copes
+    with offset gaps from compaction and transaction markers.
+    """
+
+    def __init__(self):
+        self._partitions: Dict[TopicPartition, PartitionOffsets] = {}
+
+    def start(self, tp: TopicPartition, offset: int) -> None:
+        state = self._partitions.setdefault(tp, PartitionOffsets())
+        state.pending.add(offset)
+        state.highest_seen = max(state.highest_seen, offset)
+
+    def complete(self, tp: TopicPartition, offset: int) -> None:
+        state = self._partitions.get(tp)
+        if state is not None:
+            state.pending.discard(offset)
+
+    def watermark(self, tp: TopicPartition) -> Optional[int]:
+        state = self._partitions.get(tp)
+        if state is None or state.highest_seen < 0:
+            return None
+        return min(state.pending) if state.pending else state.highest_seen + 1
+
+    def committable(self, partitions: Optional[Iterable[TopicPartition]] = None) -> Dict[TopicPartition, OffsetAndMetadata]:
+        """Watermarks that moved since the last `mark_committed`."""
+        offsets = {}
+        for tp in (partitions if partitions is not None else list(self._partitions)):
+            state = self._partitions.get(tp)
+            mark = self.watermark(tp)
+            if state is None or mark is None:
+                continue
+            if state.committed is None or mark > state.committed:
+                offsets[tp] = OffsetAndMetadata(mark, "")
+        return offsets
+
+    def mark_committed(self, offsets: Dict[TopicPartition, OffsetAndMetadata]) -> None:
+        for tp, meta in offsets.items():
+            state = self._partitions.get(tp)
+            if state is not None:
+                state.committed = meta.offset
+
+    def pending_count(self, tp: TopicPartition) -> int:
+        state = self._partitions.get(tp)
+        return len(state.pending) if state else 0
+
+    def forget(self, partitions: Iterable[TopicPartition]) -> None:
+        """Drop state for partitions this consumer no longer owns."""
+        for tp in partitions:
+            self._partitions.pop(tp, None)
@@ -0,0 +1,101 @@
+# agents/kafka/replay_dlq.py
+"""
+Replay dead-lettered events back onto the input topic.
+
+Replayed events start over with a fresh attempt count. DLQ offsets are
+committed under their own consumer group, so each record is replayed once.
+Targeted replays (--event-id) and dry runs never commit.
+
+    python -m agents.kafka.replay_dlq --dry-run
+    python -m agents.kafka.replay_dlq --limit 100 --event-id a00g5000003KesQ
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka.structs import OffsetAndMetadata
+from loguru import logger
+from prometheus_client import Counter
+
+from agents.kafka.retry import RetryPolicy
+
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:29092")
+INPUT_TOPIC = os.getenv("INPUT_TOPIC", "error_events")
+
+DLQ_REPLAYED = Counter(
+    "worker_dlq_replayed_total",
+    "Dead-lettered events republished to the input topic",
+)
+
+
+async def replay(limit: int | None, event_id: str | None, dry_run: bool, idle_timeout_ms: int) -> int:
+    policy = RetryPolicy.from_env(INPUT_TOPIC)
+
+    consumer = AIOKafkaConsumer(
+        policy.dlq_topic,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS.split(","),
+        group_id=f"{policy.dlq_topic}.replay",
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+    )
+    producer = AIOKafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS.split(","))
+
+    await consumer.start()
+    await producer.start()
+
+    replayed = 0
+    try:
+        while limit is None or replayed < limit:
+            batches = await consumer.getmany(timeout_ms=idle_timeout_ms, max_records=100)
+            if not batches:
+                break
+
+            for tp, messages in batches.items():
+                for msg in messages:
+                    record = json.loads(msg.value.decode("utf-8"))
+                    event = record.get("event")
+                    ref = event.get("referenceId") if isinstance(event, dict) else None
+
+                    if event_id and ref != event_id:
+                        continue
+
+                    logger.info(
+                        f"{'[dry-run] ' if dry_run else ''}Replaying event_id={ref} "
+                        f"(attempts={record.get('attempts')}, reason={record.get('failure_reason')})"
+                    )
+                    if not dry_run:
+                        await producer.send_and_wait(
+                            INPUT_TOPIC,
+                            json.dumps(event, default=str).encode("utf-8"),
+                            key=msg.key,
+                        )
+                        DLQ_REPLAYED.inc()
+                    replayed += 1
+
+                    if limit is not None and replayed >= limit:
+                        break
+
+                if not dry_run and not event_id:
+                    await consumer.commit({tp: OffsetAndMetadata(msg.offset + 1, "")})
+
+                if limit is not None and replayed >= limit:
+                    break
+    finally:
+        await consumer.stop()
+        await producer.stop()
+
+    return replayed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=None, help="Replay at most N events")
+    parser.add_argument("--event-id", default=None, help="Only replay events with this referenceId")
+    parser.add_argument("--dry-run", action="store_true", help="List events without republishing or committing")
+    parser.add_argument("--idle-timeout-ms", type=int, default=5000, help="Stop after this long without new records")
+    args = parser.parse_args()
+
+    count = asyncio.run(replay(args.limit, args.event_id, args.dry_run, args.idle_timeout_ms))
+    logger.info(f"{'Would replay' if args.dry_run else 'Replayed'} {count} dead-lettered events")
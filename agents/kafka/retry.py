@@ -0,0 +1,169 @@
+# agents/kafka/retry.py
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from loguru import logger
+from prometheus_client import Counter
+
+
+RETRY_SCHEDULED = Counter(
+    "worker_retry_scheduled_total",
+    "Failed events sent to a retry tier",
+    ["tier"],
+)
+RETRY_ATTEMPTS = Counter(
+    "worker_retry_attempts_total",
+    "Events processed from a retry tier, by outcome",
+    ["tier", "outcome"],
+)
+DEAD_LETTERED = Counter(
+    "worker_dead_lettered_total",
+    "Events sent to the dead-letter topic after exhausting every retry tier",
+)
+
+HEADER_ATTEMPT = "x-talos-attempt"
+HEADER_NOT_BEFORE = "x-talos-not-before-ms"
+HEADER_HISTORY = "x-talos-history"
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_delay(spec: str) -> int:
+    """'90s' / '10m' / '1h' -> seconds."""
+    spec = spec.strip().lower()
+    if spec[-1] in _UNITS:
+        return int(float(spec[:-1]) * _UNITS[spec[-1]])
+    return int(spec)
+
+
+@dataclass(frozen=True)
+class RetryTier:
+    name: str
+    delay_s: int
+    topic: str
+
+
+def _headers(msg) -> Dict[str, bytes]:
+    return {k: v for k, v in (msg.headers or ())}
+
+
+def attempt_of(msg) -> int:
+    """Attempts already made for this event (0 for a message on the input topic)."""
+    raw = _headers(msg).get(HEADER_ATTEMPT)
+    return int(raw) if raw else 0
+
+
+def history_of(msg) -> List[dict]:
+    raw = _headers(msg).get(HEADER_HISTORY)
+    if not raw:
+        return []
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return []
+
+
+def delay_remaining_s(msg, now: Optional[float] = None) -> float:
+    """Seconds until a retry message is due; 0 for anything already due."""
+    raw = _headers(msg).get(HEADER_NOT_BEFORE)
+    if not raw:
+        return 0.0
+    now_ms = (now if now is not None else time.time()) * 1000
+    return max(0.0, (int(raw) - now_ms) / 1000)
+
+
+class RetryPolicy:
+    """
+    Routes failed events through tiered retry topics, then a dead-letter topic.
+
+    Retrying inline would hold a concurrency slot for the whole backoff, so a
+    failure is republished to `<input>.retry.<tier>` with a not-before header
+    and the original offset is released. Each tier has a fixed delay, so
+    messages in a tier partition are due in the order they were written and
+    the consumer only ever has to wait on the head of a partition.
+    """
+
+    def __init__(self, input_topic: str, tiers: List[RetryTier], dlq_topic: str):
+        self.input_topic = input_topic
+        self.tiers = tiers
+        self.dlq_topic = dlq_topic
+        self._tier_by_topic = {t.topic: t for t in tiers}
+
+    @classmethod
+    def from_env(cls, input_topic: str) -> "RetryPolicy":
+        specs = os.getenv("WORKER_RETRY_TIERS", "1m,10m,1h")
+        tiers = [
+            RetryTier(name=spec.strip(), delay_s=parse_delay(spec), topic=f"{input_topic}.retry.{spec.strip()}")
+            for spec in specs.split(",") if spec.strip()
+        ]
+        dlq_topic = os.getenv("WORKER_DLQ_TOPIC", f"{input_topic}.dlq")
+        return cls(input_topic, tiers, dlq_topic)
+
+    @property
+    def retry_topics(self) -> List[str]:
+        return [t.topic for t in self.tiers]
+
+    def tier_for_topic(self, topic: str) -> Optional[RetryTier]:
+        return self._tier_by_topic.get(topic)
+
+    def record_outcome(self, msg, ok: bool) -> None:
+        tier = self.tier_for_topic(msg.topic)
+        if tier is not None:
+            RETRY_ATTEMPTS.labels(tier=tier.name, outcome="ok" if ok else "failed").inc()
+
+    async def route_failure(self, producer, msg, error: BaseException) -> str:
+        """
+        Publish a failed message to its next tier or the DLQ.
+        Returns the destination topic; raises if the publish failed.
+        """
+        attempt = attempt_of(msg) + 1
+        history = history_of(msg) + [{
+            "attempt": attempt,
+            "topic": msg.topic,
+            "error_type": type(error).__name__,
+            "error": str(error)[:2000],
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+        }]
+
+        if attempt <= len(self.tiers):
+            tier = self.tiers[attempt - 1]
+            not_before_ms = int((time.time() + tier.delay_s) * 1000)
+            await producer.send_and_wait(
+                tier.topic,
+                msg.value,
+                key=msg.key,
+                headers=[
+                    (HEADER_ATTEMPT, str(attempt).encode()),
+                    (HEADER_NOT_BEFORE, str(not_before_ms).encode()),
+                    (HEADER_HISTORY, json.dumps(history).encode()),
+                ],
+            )
+            RETRY_SCHEDULED.labels(tier=tier.name).inc()
+            logger.warning(f"🔁 Scheduled retry {attempt}/{len(self.tiers)} in {tier.name} ({tier.topic})")
+            return tier.topic
+
+        try:
+            event = json.loads(msg.value.decode("utf-8"))
+        except ValueError:
+            event = msg.value.decode("utf-8", errors="replace")
+
+        record = {
+            "event": event,
+            "failure_reason": f"{type(error).__name__}: {error}"[:2000],
+            "attempts": attempt,
+            "history": history,
+            "dead_lettered_at": datetime.now(timezone.utc).isoformat(),
+        }
+        await producer.send_and_wait(
+            self.dlq_topic,
+            json.dumps(record, default=str).encode("utf-8"),
+            key=msg.key,
+            headers=[(HEADER_ATTEMPT, str(attempt).encode())],
+        )
+        DEAD_LETTERED.inc()
+        logger.error(f"☠ Dead-lettered event after {attempt} attempts ({self.dlq_topic})")
+        return self.dlq_topic
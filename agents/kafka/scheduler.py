@@ -0,0 +1,215 @@
+# agents/kafka/scheduler.py
+import asyncio
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Gauge, Histogram
+
+# Lower is more urgent.
+PRIORITY_CLASSES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+_CLASS_RANK = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+DEFAULT_CLASS = "MEDIUM"
+DEFAULT_LOGCODE_PRIORITY = "FATAL=CRITICAL,ERROR=HIGH,WARN=LOW,WARNING=LOW,INFO=LOW,DEBUG=LOW"
+
+QUEUE_WAIT = Histogram(
+    "worker_queue_wait_seconds",
+    "Time a consumed event waited for an orchestrator slot, by priority class",
+    ["priority"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+QUEUE_PENDING = Gauge(
+    "worker_queue_pending",
+    "Consumed events waiting for an orchestrator slot, by priority class",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+
+
+def parse_mapping(spec: str) -> Dict[str, str]:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}"""
+    pairs = (item.split("=", 1) for item in spec.split(",") if "=" in item)
+    return {k.strip(): v.strip() for k, v in pairs}
+
+
+def priority_class(event: dict, logcode_classes: Dict[str, str]) -> str:
+    """Priority class of an event: its severity, else the class of its logCode."""
+    severity = str(event.get("severity") or "").upper()
+    if severity in _CLASS_RANK:
+        return severity
+    priority = logcode_classes.get(str(event.get("logCode") or "").upper(), DEFAULT_CLASS)
+    return priority if priority in _CLASS_RANK else DEFAULT_CLASS
+
+
+@dataclass
+class Ticket:
+    """One consumed event waiting for (or holding) an orchestrator slot."""
+    priority: str
+    source: str
+    group: Tuple[str, ...]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    seq: int = 0
+    granted: Optional[asyncio.Future] = None
+
+
+class FairScheduler:
+    """
+    Hands out the worker's orchestrator slots by priority instead of arrival order.
+
+    Every consumed event takes a ticket and waits here until picked:
+
+    1. Strict priority class (severity, else logCode). A ticket is promoted
+       one class per `aging_s` it has waited, so LOW events still drain and
+       never hold the partition's commit watermark indefinitely.
+    2. Within the class, start-time fair queueing across sources: each pick
+       advances the source's virtual clock by 1/weight, and a source that was
+       idle restarts at the current virtual time instead of banking credit.
+       A burst from one source therefore gets its weighted share, not the
+       whole worker.
+    3. Within the source, the largest error group first (same function,
+       logCode and message), then the oldest.
+
+    Events finish out of order, which the OffsetTracker watermark already
+    handles; the bounded in-flight window caps how much is buffered.
+    """
+
+    def __init__(self, slots: int, weights: Optional[Dict[str, float]] = None,
+                 logcode_classes: Optional[Dict[str, str]] = None, aging_s: float = 300.0):
+        self.slots = slots
+        self.running = 0
+        self.weights = weights or {}
+        self.logcode_classes = {k.upper(): v.upper() for k, v in (logcode_classes or {}).items()}
+        self.aging_s = aging_s
+
+        self.closed = False
+
+        self._pending: List[Ticket] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._finish: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls, slots: int) -> "FairScheduler":
+        weights = {k: float(v) for k, v in parse_mapping(os.getenv("WORKER_SOURCE_WEIGHTS", "")).items()}
+        logcode_classes = parse_mapping(os.getenv("WORKER_LOGCODE_PRIORITY", DEFAULT_LOGCODE_PRIORITY))
+        aging_s = float(os.getenv("WORKER_PRIORITY_AGING_S", "300"))
+        return cls(slots, weights, logcode_classes, aging_s)
+
+    # ---------- Classification ----------
+
+    def ticket_for(self, event: dict) -> Ticket:
+        priority = priority_class(event, self.logcode_classes)
+        log_code = str(event.get("logCode") or "").upper()
+
+        # The API key's source is trusted; the payload's `source` is a fallback for older events.
+        source = str(event.get("ingestSource") or event.get("source") or "unknown")
+        message = str(event.get("message") or "").strip().splitlines()
+        group = (source, str(event.get("function") or ""), log_code, message[0][:200] if message else "")
+        return Ticket(priority=priority, source=source, group=group, seq=next(self._seq))
+
+    # ---------- Slots ----------
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket):
+        ticket.granted = asyncio.get_running_loop().create_future()
+        if self.closed:
+            # Shutting down: nothing new starts (raises CancelledError below).
+            ticket.granted.cancel()
+        else:
+            self._pending.append(ticket)
+            QUEUE_PENDING.labels(priority=ticket.priority).inc()
+            self._dispatch()
+
+        try:
+            await ticket.granted
+        except asyncio.CancelledError:
+            if ticket in self._pending:
+                self._drop(ticket)
+            elif ticket.granted.done() and not ticket.granted.cancelled():
+                # Granted in the same tick we were cancelled: hand the slot back.
+                self._release()
+            raise
+
+        QUEUE_WAIT.labels(priority=ticket.priority).observe(time.monotonic() - ticket.enqueued_at)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def close(self) -> int:
+        """
+        Stop granting slots: every waiting ticket, and any taken later, fails
+        with CancelledError. Events holding a slot are unaffected. Returns the
+        number of waiters cancelled.
+        """
+        self.closed = True
+        waiting = [t for t in self._pending if not t.granted.done()]
+        for ticket in waiting:
+            ticket.granted.cancel()
+        return len(waiting)
+
+    def _drop(self, ticket: Ticket) -> None:
+        self._pending.remove(ticket)
+        QUEUE_PENDING.labels(priority=ticket.priority).dec()
+
+    def _release(self) -> None:
+        self.running -= 1
+        try:
+            self._dispatch()
+        finally:
+            # Never leave free slots behind queued tickets, whatever dispatch hit.
+            if self.running < self.slots and self._pending:
+                asyncio.get_running_loop().call_soon(self._dispatch)
+
+    def _dispatch(self) -> None:
+        # A ticket whose waiter was cancelled stays queued until that waiter
+        # runs its cleanup; its future is already done and can't be granted.
+        for ticket in [t for t in self._pending if t.granted.done()]:
+            self._drop(ticket)
+
+        while self.running < self.slots and self._pending:
+            ticket = self._pick()
+            self._drop(ticket)
+            ticket.granted.set_result(None)
+            self.running += 1
+
+    # ---------- Selection ----------
+
+    def _effective_rank(self, ticket: Ticket, now: float) -> int:
+        promoted = int((now - ticket.enqueued_at) // self.aging_s) if self.aging_s > 0 else 0
+        return max(0, _CLASS_RANK[ticket.priority] - promoted)
+
+    def _pick(self) -> Ticket:
+        now = time.monotonic()
+        best_rank = min(self._effective_rank(t, now) for t in self._pending)
+        candidates = [t for t in self._pending if self._effective_rank(t, now) == best_rank]
+
+        # Fair share across sources.
+        def start_tag(source: str) -> float:
+            return max(self._virtual_time, self._finish.get(source, 0.0))
+
+        source = min({t.source for t in candidates}, key=lambda s: (start_tag(s), s))
+        tag = start_tag(source)
+        self._virtual_time = tag
+        self._finish[source] = tag + 1.0 / self.weights.get(source, 1.0)
+
+        # Largest (then oldest) error group within the source.
+        group_size: Dict[Tuple[str, ...], int] = {}
+        group_since: Dict[Tuple[str, ...], float] = {}
+        for t in self._pending:
+            group_size[t.group] = group_size.get(t.group, 0) + 1
+            group_since[t.group] = min(group_since.get(t.group, t.enqueued_at), t.enqueued_at)
+
+        return min(
+            (t for t in candidates if t.source == source),
+            key=lambda t: (-group_size[t.group], group_since[t.group], t.seq),
+        )
+
+    def stats(self) -> dict:
+        by_class = {name: 0 for name in PRIORITY_CLASSES}
+        for t in self._pending:
+            by_class[t.priority] += 1
+        return {"running": self.running, "pending": by_class}
@@ -11,7 +11,10 @@ from fastapi import FastAPI, HTTPException, Request
 from pymongo import MongoClient
 
 # Import your orchestrator
-from agents.coordinator.agent import run_orchestrator
+from agents.coordinator.agent import arun_orchestrator
+from agents.core.artifacts import artifact_store
+from agents.core.offload import run_blocking
+from agents.core.results import RunRecorder, build_result
 
 load_dotenv()
 
@@ -55,19 +58,17 @@ def prepare_doc(payload: Dict[str, Any]) -> Dict[str, Any]:
 
 async def call_orchestrator_and_store(doc: Dict[str, Any]) -> None:
     """
-    Call the orchestrator (sync or async) and store the result in the DB.
-    - If run_orchestrator is synchronous, run it in a thread via asyncio.to_thread.
-    - If it is async, await it directly.
+    Call the orchestrator and store the result in the DB.
+    The graph runs natively on the event loop via arun_orchestrator.
     """
     # Keep a stable reference to the source document ID and data
     source_doc_id = doc.get("_id")
     try:
-        # Detect if run_orchestrator is coroutine function or not
-        if asyncio.iscoroutinefunction(run_orchestrator):
-            result = await run_orchestrator(doc)
-        else:
-            # Run blocking function in a thread so we don't block the event loop
-            result = await asyncio.to_thread(run_orchestrator, doc)
+        recorder = RunRecorder()
+        raw_result = await arun_orchestrator(doc, config={"callbacks": [recorder]}, event=serialize_doc(doc))
+        result = await run_blocking(
+            build_result, str(source_doc_id) if source_doc_id is not None else None, raw_result, recorder, artifact_store
+        )
 
         # Save result to DB for auditing/debugging
         res_doc = {
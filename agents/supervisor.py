@@ -0,0 +1,151 @@
+# agents/supervisor.py
+"""
+Multi-process supervisor for the orchestrator worker.
+
+Starts N `agents.worker` processes in the same consumer group (Kafka spreads
+partitions across them), restarts crashed children with exponential
+backoff, forwards SIGTERM/SIGINT so children drain gracefully, and serves
+the children's aggregated Prometheus metrics on one port.
+
+    python -m agents.supervisor --workers 4 --concurrency 3
+"""
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from loguru import logger
+
+RESTART_BACKOFF_INITIAL_S = 1.0
+RESTART_BACKOFF_MAX_S = 60.0
+# A child that stayed up this long is considered healthy again.
+STABLE_AFTER_S = 60.0
+DRAIN_TIMEOUT_S = float(os.getenv("SUPERVISOR_DRAIN_TIMEOUT_S", "120"))
+
+
+@dataclass
+class Child:
+    index: int
+    process: Optional[subprocess.Popen] = None
+    started_at: float = 0.0
+    backoff_s: float = RESTART_BACKOFF_INITIAL_S
+    restart_at: float = 0.0
+    restarts: int = 0
+
+
+class Supervisor:
+    def __init__(self, workers: int, env: dict):
+        self.children = [Child(index=i) for i in range(workers)]
+        self.env = env
+        self.stopping = False
+
+    def spawn(self, child: Child) -> None:
+        env = dict(self.env, WORKER_INDEX=str(child.index))
+        child.process = subprocess.Popen([sys.executable, "-m", "agents.worker"], env=env)
+        child.started_at = time.monotonic()
+        logger.info(f"▶ Started worker #{child.index} (pid={child.process.pid})")
+
+    def reap(self, child: Child) -> None:
+        from prometheus_client import multiprocess
+
+        code = child.process.returncode
+        multiprocess.mark_process_dead(child.process.pid)
+
+        if time.monotonic() - child.started_at >= STABLE_AFTER_S:
+            child.backoff_s = RESTART_BACKOFF_INITIAL_S
+
+        child.restart_at = time.monotonic() + child.backoff_s
+        logger.warning(
+            f"💥 Worker #{child.index} (pid={child.process.pid}) exited with code {code}; "
+            f"restarting in {child.backoff_s:.0f}s"
+        )
+        child.backoff_s = min(child.backoff_s * 2, RESTART_BACKOFF_MAX_S)
+        child.restarts += 1
+        child.process = None
+
+    def forward(self, signum: int) -> None:
+        for child in self.children:
+            if child.process and child.process.poll() is None:
+                child.process.send_signal(signum)
+
+    def handle_signal(self, signum, _frame) -> None:
+        if self.stopping:
+            # Second signal: stop waiting for the drain.
+            logger.warning("Second signal received, killing workers")
+            self.forward(signal.SIGKILL)
+            return
+        logger.info(f"🛑 Received {signal.Signals(signum).name}, draining workers...")
+        self.stopping = True
+        self.forward(signal.SIGTERM)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+
+        for child in self.children:
+            self.spawn(child)
+
+        while not self.stopping:
+            now = time.monotonic()
+            for child in self.children:
+                if child.process is not None and child.process.poll() is not None:
+                    self.reap(child)
+                if child.process is None and now >= child.restart_at and not self.stopping:
+                    self.spawn(child)
+            time.sleep(0.5)
+
+        deadline = time.monotonic() + DRAIN_TIMEOUT_S
+        for child in self.children:
+            if child.process is None:
+                continue
+            try:
+                child.process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"Worker #{child.index} did not drain in time, killing it")
+                child.process.kill()
+                child.process.wait()
+
+        logger.info("👋 All workers stopped")
+
+
+def serve_metrics(port: int) -> None:
+    from prometheus_client import CollectorRegistry, start_http_server, multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    logger.info(f"📈 Aggregated worker metrics on :{port}/metrics")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SUPERVISOR_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--concurrency", type=int, default=None, help="WORKER_MAX_CONCURRENCY for each child")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("WORKER_METRICS_PORT", "9100")))
+    args = parser.parse_args(argv)
+
+    # Children write metric samples here; the supervisor aggregates them.
+    # Must be set before prometheus_client is imported anywhere in this process.
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="talos-metrics-")
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    env = dict(os.environ)
+    if args.concurrency is not None:
+        env["WORKER_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    serve_metrics(args.metrics_port)
+
+    logger.info(f"🚀 Supervising {args.workers} orchestrator workers")
+    Supervisor(args.workers, env).run()
+
+
+if __name__ == "__main__":
+    main()
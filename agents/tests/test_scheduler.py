@@ -0,0 +1,61 @@
+# agents/tests/test_scheduler.py
+import asyncio
+
+from agents.kafka.scheduler import FairScheduler
+
+
+def _event(n: int) -> dict:
+    return {"severity": "HIGH", "ingestSource": "svc", "message": f"boom {n}"}
+
+
+async def _hold(scheduler: FairScheduler, n: int, entered: asyncio.Event, gate: asyncio.Event) -> None:
+    async with scheduler.slot(scheduler.ticket_for(_event(n))):
+        entered.set()
+        await gate.wait()
+
+
+async def _cancel_holder_and_waiter(holder_first: bool) -> FairScheduler:
+    scheduler = FairScheduler(slots=1)
+    gate = asyncio.Event()
+    holder_in, waiter_in = asyncio.Event(), asyncio.Event()
+
+    holder = asyncio.create_task(_hold(scheduler, 1, holder_in, gate))
+    await holder_in.wait()
+    waiter = asyncio.create_task(_hold(scheduler, 2, waiter_in, gate))
+    await asyncio.sleep(0)
+    assert scheduler.stats()["pending"]["HIGH"] == 1
+
+    # Both cancelled in the same tick: the holder's release dispatches while
+    # the waiter's future is cancelled but its cleanup hasn't run.
+    for task in ((holder, waiter) if holder_first else (waiter, holder)):
+        task.cancel()
+    results = await asyncio.gather(holder, waiter, return_exceptions=True)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert not waiter_in.is_set()
+    return scheduler
+
+
+async def _assert_slot_free(scheduler: FairScheduler) -> None:
+    assert scheduler.running == 0
+    assert scheduler.stats()["pending"]["HIGH"] == 0
+
+    entered, gate = asyncio.Event(), asyncio.Event()
+    gate.set()
+    await asyncio.wait_for(_hold(scheduler, 3, entered, gate), timeout=1)
+    assert entered.is_set()
+
+
+def test_cancel_holder_then_waiter_frees_slot():
+    async def run():
+        scheduler = await _cancel_holder_and_waiter(holder_first=True)
+        await _assert_slot_free(scheduler)
+
+    asyncio.run(run())
+
+
+def test_cancel_waiter_then_holder_frees_slot():
+    async def run():
+        scheduler = await _cancel_holder_and_waiter(holder_first=False)
+        await _assert_slot_free(scheduler)
+
+    asyncio.run(run())
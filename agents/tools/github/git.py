@@ -1,6 +1,10 @@
+import asyncio
 import os
 import subprocess
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
+
+from agents.core.offload import run_blocking
+from agents.core.tracing import span
 
 
 def _repo_path():
@@ -11,37 +15,76 @@ def _repo_path():
 
 
 def _run(cmd):
-    subprocess.run(
-        cmd,
-        cwd=_repo_path(),
-        check=True,
-        text=True
-    )
-
-
-@tool
-def apply_apex_patch(file_path: str, content: str) -> str:
-    """
-    Overwrite an Apex class file with the provided content.
-    Path must be relative to force-app/main/default/classes inside the repo.
-    """
+    with span(f"git_{cmd[1]}", kind="subprocess"):
+        subprocess.run(
+            cmd,
+            cwd=_repo_path(),
+            check=True,
+            text=True
+        )
+
+
+async def _arun(cmd, check=True):
+    """Async twin of _run: no thread is held while git works."""
+    with span(f"git_{cmd[1]}", kind="subprocess"):
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=_repo_path(),
+            stdout=asyncio.subprocess.PIPE,
+        )
+        stdout, _ = await proc.communicate()
+        if check and proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+        return proc.returncode, stdout.decode()
+
+
+def _apex_path(file_path: str) -> str:
     if file_path.startswith("/") or ".." in file_path:
         raise ValueError("Invalid file path")
 
-    full_path = os.path.join(_repo_path(), "force-app", "main", "default", "classes", file_path)
+    return os.path.join(_repo_path(), "force-app", "main", "default", "classes", file_path)
 
+
+def _write_file(full_path: str, content: str) -> None:
     # Ensure the folder exists
     os.makedirs(os.path.dirname(full_path), exist_ok=True)
 
     with open(full_path, "w", encoding="utf-8") as f:
         f.write(content)
 
+
+def _apply_apex_patch(file_path: str, content: str) -> str:
+    """
+    Overwrite an Apex class file with the provided content.
+    Path must be relative to force-app/main/default/classes inside the repo.
+    """
+    _write_file(_apex_path(file_path), content)
+    return f"Updated {file_path}"
+
+
+async def _aapply_apex_patch(file_path: str, content: str) -> str:
+    await run_blocking(_write_file, _apex_path(file_path), content)
     return f"Updated {file_path}"
 
-    
 
-@tool
-def git_create_branch(branch_name: str) -> str:
+def _read_file(full_path: str) -> str:
+    with open(full_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_apex_class(file_path: str) -> str:
+    """
+    Return the full content of an Apex class file.
+    Path must be relative to force-app/main/default/classes inside the repo.
+    """
+    return _read_file(_apex_path(file_path))
+
+
+async def _aread_apex_class(file_path: str) -> str:
+    return await run_blocking(_read_file, _apex_path(file_path))
+
+
+def _git_create_branch(branch_name: str) -> str:
     """
     Create and switch to a new git branch.
     """
@@ -49,8 +92,12 @@ def git_create_branch(branch_name: str) -> str:
     return branch_name
 
 
-@tool
-def git_commit(message: str) -> str:
+async def _agit_create_branch(branch_name: str) -> str:
+    await _arun(["git", "checkout", "-b", branch_name])
+    return branch_name
+
+
+def _git_commit(message: str) -> str:
     """
     Stage all changes and create a git commit if there are changes.
     """
@@ -69,8 +116,19 @@ def git_commit(message: str) -> str:
     _run(["git", "commit", "-m", message])
     return message
 
-@tool
-def git_push(branch_name: str) -> str:
+
+async def _agit_commit(message: str) -> str:
+    await _arun(["git", "add", "."])
+
+    returncode, _ = await _arun(["git", "diff", "--cached", "--quiet"], check=False)
+    if returncode == 0:
+        return "Nothing to commit"
+
+    await _arun(["git", "commit", "-m", message])
+    return message
+
+
+def _git_push(branch_name: str) -> str:
     """
     Push a branch to origin and set upstream, then return to the original branch.
     """
@@ -91,6 +149,44 @@ def git_push(branch_name: str) -> str:
     #if current_branch and current_branch != branch_name:
     #    _run(["git", "checkout", current_branch])
     _run(["git", "checkout", "main"])
-    
+
 
     return f"Pushed {branch_name}, returned to {current_branch}"
+
+
+async def _agit_push(branch_name: str) -> str:
+    _, stdout = await _arun(["git", "branch", "--show-current"])
+    current_branch = stdout.strip()
+
+    await _arun(["git", "push", "-u", "origin", branch_name])
+    await _arun(["git", "checkout", "main"])
+
+    return f"Pushed {branch_name}, returned to {current_branch}"
+
+
+# Each tool has a sync and a native-async implementation; ainvoke uses the latter.
+apply_apex_patch = StructuredTool.from_function(
+    func=_apply_apex_patch,
+    coroutine=_aapply_apex_patch,
+    name="apply_apex_patch",
+)
+read_apex_class = StructuredTool.from_function(
+    func=_read_apex_class,
+    coroutine=_aread_apex_class,
+    name="read_apex_class",
+)
+git_create_branch = StructuredTool.from_function(
+    func=_git_create_branch,
+    coroutine=_agit_create_branch,
+    name="git_create_branch",
+)
+git_commit = StructuredTool.from_function(
+    func=_git_commit,
+    coroutine=_agit_commit,
+    name="git_commit",
+)
+git_push = StructuredTool.from_function(
+    func=_git_push,
+    coroutine=_agit_push,
+    name="git_push",
+)
@@ -1,23 +1,15 @@
 import os
+import httpx
 import requests
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from dotenv import load_dotenv
 
+from agents.core.checkpoints import side_effect_once
+
 load_dotenv()
 
 
-@tool
-def github_create_pr(
-    head: str,
-    base: str,
-    title: str,
-    body: str
-) -> dict:
-    """
-    Create a GitHub pull request.
-    Handles fine-grained PAT behavior where PR is created
-    but API may return 403 on response expansion.
-    """
+def _pr_request(head: str, base: str, title: str, body: str):
     token = os.getenv("GITHUB_TOKEN")
     owner = os.getenv("GITHUB_OWNER")
     repo = os.getenv("GITHUB_REPO")
@@ -39,22 +31,77 @@ def github_create_pr(
         "body": body
     }
 
-    r = requests.post(url, headers=headers, json=payload)
+    return url, headers, payload, f"https://github.com/{owner}/{repo}/pulls"
+
 
+def _pr_result(status_code: int, data, fallback_url: str):
     # ✅ PR CREATED (201)
-    if r.status_code == 201:
-        pr = r.json()
+    if status_code == 201:
         return {
-            "url": pr["html_url"],
-            "number": pr["number"]
+            "url": data["html_url"],
+            "number": data["number"]
         }
 
     # ⚠️ Fine-grained token: PR created but response forbidden
-    if r.status_code == 403:
+    if status_code == 403:
         return {
-            "url": f"https://github.com/{owner}/{repo}/pulls",
+            "url": fallback_url,
             "number": None
         }
 
+    return None
+
+
+def _github_create_pr(
+    head: str,
+    base: str,
+    title: str,
+    body: str
+) -> dict:
+    """
+    Create a GitHub pull request.
+    Handles fine-grained PAT behavior where PR is created
+    but API may return 403 on response expansion.
+    """
+    url, headers, payload, fallback_url = _pr_request(head, base, title, body)
+
+    r = requests.post(url, headers=headers, json=payload)
+
+    result = _pr_result(r.status_code, r.json() if r.status_code == 201 else None, fallback_url)
+    if result is not None:
+        return result
+
+    # ❌ Real failure
+    r.raise_for_status()
+
+
+async def _agithub_create_pr(
+    head: str,
+    base: str,
+    title: str,
+    body: str
+) -> dict:
+    # A resumed orchestration replays this call; reuse the PR opened the first time.
+    # Keyed by the event alone: the branch name is model output and can change on replay.
+    return await side_effect_once("pull_request", lambda: _agithub_open_pr(head, base, title, body))
+
+
+async def _agithub_open_pr(head: str, base: str, title: str, body: str) -> dict:
+    url, headers, payload, fallback_url = _pr_request(head, base, title, body)
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        r = await client.post(url, headers=headers, json=payload)
+
+    result = _pr_result(r.status_code, r.json() if r.status_code == 201 else None, fallback_url)
+    if result is not None:
+        return result
+
     # ❌ Real failure
-    r.raise_for_status()
\ No newline at end of file
+    r.raise_for_status()
+
+
+github_create_pr = StructuredTool.from_function(
+    func=_github_create_pr,
+    coroutine=_agithub_create_pr,
+    name="github_create_pr",
+)
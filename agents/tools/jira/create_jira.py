@@ -1,4 +1,5 @@
 import os
+import httpx
 import requests
 import json
 import ast
@@ -9,6 +10,9 @@ from langchain_core.tools import StructuredTool
 import psycopg2
 from psycopg2 import Error
 
+from agents.core.checkpoints import side_effect_once
+from agents.core.offload import run_blocking
+
 load_dotenv()
 
 # =========================
@@ -308,7 +312,8 @@ def update_postgres_severity(
 # =========================
 # Jira Creation Logic
 # =========================
-def create_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
+def build_jira_issue(payload: Dict[str, Any]):
+    """Normalize the tool payload and build the Jira issue body (ADF description)."""
     title = payload.get("title")
     description = normalize_description(payload.get("description"))
 
@@ -367,24 +372,15 @@ def create_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
     print(json.dumps(issue_payload["fields"]["description"], indent=2)[:1500])
     print("=========================")
 
-    url = f"{JIRA_BASE_URL}/rest/api/3/issue"
-    response = requests.post(
-        url,
-        json=issue_payload,
-        auth=(JIRA_EMAIL, JIRA_API_TOKEN),
-        headers={
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        },
-        timeout=15
-    )
+    return issue_payload, description
+
 
-    if response.status_code not in (200, 201):
+def _jira_result(status_code: int, text: str, data, description) -> Dict[str, str]:
+    if status_code not in (200, 201):
         raise RuntimeError(
-            f"Jira creation failed: {response.status_code} - {response.text}"
+            f"Jira creation failed: {status_code} - {text}"
         )
 
-    data = response.json()
     jira_key = data["key"]
     jira_url = f"{JIRA_BASE_URL}/browse/{jira_key}"
 
@@ -397,6 +393,45 @@ def create_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
 
     return {"jira_key": jira_key, "jira_url": jira_url}
 
+
+JIRA_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json"
+}
+
+
+def create_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
+    issue_payload, description = build_jira_issue(payload)
+
+    url = f"{JIRA_BASE_URL}/rest/api/3/issue"
+    response = requests.post(
+        url,
+        json=issue_payload,
+        auth=(JIRA_EMAIL, JIRA_API_TOKEN),
+        headers=JIRA_HEADERS,
+        timeout=15
+    )
+
+    ok = response.status_code in (200, 201)
+    return _jira_result(response.status_code, response.text, response.json() if ok else None, description)
+
+
+async def acreate_jira_bug(payload: Dict[str, Any]) -> Dict[str, str]:
+    # Building the description can touch Postgres (psycopg2), so keep it off the loop.
+    issue_payload, description = await run_blocking(build_jira_issue, payload)
+
+    url = f"{JIRA_BASE_URL}/rest/api/3/issue"
+    async with httpx.AsyncClient(timeout=15) as client:
+        response = await client.post(
+            url,
+            json=issue_payload,
+            auth=(JIRA_EMAIL, JIRA_API_TOKEN),
+            headers=JIRA_HEADERS,
+        )
+
+    ok = response.status_code in (200, 201)
+    return _jira_result(response.status_code, response.text, response.json() if ok else None, description)
+
 # =========================
 # StructuredTool Wrapper
 # =========================
@@ -416,11 +451,31 @@ def create_jira_bug_wrapper(
     }
     return create_jira_bug(payload)
 
+
+async def acreate_jira_bug_wrapper(
+    title: str,
+    description: Union[str, Dict[str, Any]],
+    priority: str = "Medium",
+    labels: Optional[List[str]] = None,
+    components: Optional[List[str]] = None
+) -> Dict[str, str]:
+    payload = {
+        "title": title,
+        "description": description,
+        "priority": priority,
+        "labels": labels or [],
+        "components": components or [],
+    }
+    # A resumed orchestration replays this call; reuse the issue created the first time.
+    # Keyed by the event alone: the title is model output and can be reworded on replay.
+    return await side_effect_once("jira_issue", lambda: acreate_jira_bug(payload))
+
 # =========================
 # Tool Instance
 # =========================
 jira_create_tool = StructuredTool.from_function(
     func=create_jira_bug_wrapper,
+    coroutine=acreate_jira_bug_wrapper,
     name="create_jira_bug",
     description=(
         "Create a Jira Bug with rich description. "
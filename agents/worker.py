@@ -1,46 +1,45 @@
 import os
 import asyncio
 import json
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
-from aiokafka.structs import TopicPartition, OffsetAndMetadata
+import signal
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, ConsumerRebalanceListener
+from aiokafka.structs import TopicPartition
 from loguru import logger
-from langchain_core.messages import BaseMessage
-
-from agents.coordinator.agent import run_orchestrator
+from prometheus_client import start_http_server
+
+from agents.context_retrieval.agent import apex_cache, prefetch_describes
+from agents.context_retrieval.packer import (
+    CHARS_PER_TOKEN,
+    PROBLEM_STACK_TOKENS,
+    estimate_tokens,
+    format_frames,
+    parse_stack_trace,
+)
+from agents.coordinator.agent import arun_orchestrator, warm_orchestrator
+from agents.core.artifacts import artifact_store, canonical_bytes
+from agents.core.checkpoints import close_checkpointer, discard_checkpoints, open_checkpointer
+from agents.core.fix_store import fix_store, reuse_result
+from agents.core.offload import run_blocking
+from agents.core.tracing import flush_traces
+from agents.core.results import RunRecorder, build_result
+from agents.kafka.offset_tracker import OffsetTracker
+from agents.kafka.retry import RetryPolicy, delay_remaining_s
+from agents.kafka.scheduler import FairScheduler
 from DataIngestion.app.db.session import get_session_factory
-from DataIngestion.app.services.error_event_service import mark_error_resolved
+from DataIngestion.app.services.error_event_service import mark_error_resolved, update_error_status
 from DataIngestion.app.db.engine import init_engine
 from DataIngestion.app.db.init_db import create_schema, create_tables, validate_connection
 
 # ---------- Utils ----------
 
-def serialize_result(result):
-    if isinstance(result, dict):
-        out = {}
-        for k, v in result.items():
-            if isinstance(v, list):
-                out[k] = [
-                    {
-                        "type": m.type,
-                        "content": m.content,
-                    } if isinstance(m, BaseMessage) else str(m)
-                    for m in v
-                ]
-            elif isinstance(v, BaseMessage):
-                out[k] = {
-                    "type": v.type,
-                    "content": v.content,
-                }
-            else:
-                out[k] = v
-        return out
-    return str(result)
-
-
 def build_problem(event: dict) -> str:
     stack = event.get("stackTrace") or ""
-    if len(stack) > 2000:
-        stack = stack[:2000] + "\n...[truncated]"
+    frames = parse_stack_trace(stack)
+    if frames:
+        # Context retrieval slices the code around these; the coordinator only needs the frames.
+        stack = format_frames(frames)
+    elif estimate_tokens(stack) > PROBLEM_STACK_TOKENS:
+        stack = stack[:PROBLEM_STACK_TOKENS * CHARS_PER_TOKEN] + "\n...[truncated]"
 
     return (
         f"Error event:\n"
@@ -61,66 +60,242 @@ INPUT_TOPIC = os.getenv("INPUT_TOPIC", "error_events")
 OUTPUT_TOPIC = os.getenv("OUTPUT_TOPIC", "orchestrator_results")
 GROUP_ID = "orchestrator-workers"
 
-MAX_CONCURRENCY = 3
-semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+# Concurrent orchestrator pipelines per process.
+MAX_CONCURRENCY = int(os.getenv("WORKER_MAX_CONCURRENCY", "3"))
+# Messages taken from Kafka but not finished yet (running + waiting for a slot).
+# The waiting part is what the scheduler gets to choose from.
+MAX_IN_FLIGHT = max(MAX_CONCURRENCY, int(os.getenv("WORKER_MAX_IN_FLIGHT", str(MAX_CONCURRENCY * 4))))
+FETCH_BATCH_SIZE = int(os.getenv("WORKER_FETCH_BATCH_SIZE", "50"))
+FETCH_TIMEOUT_MS = int(os.getenv("WORKER_FETCH_TIMEOUT_MS", "1000"))
+COMMIT_INTERVAL_MS = int(os.getenv("WORKER_COMMIT_INTERVAL_MS", "5000"))
+REVOKE_DRAIN_TIMEOUT_S = float(os.getenv("WORKER_REVOKE_DRAIN_TIMEOUT_S", "30"))
+METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+retry_policy = RetryPolicy.from_env(INPUT_TOPIC)
+
+scheduler = FairScheduler.from_env(MAX_CONCURRENCY)
 
 shutdown_event = asyncio.Event()
 
 
+class InFlightWindow:
+    """
+    Bounds how many consumed messages exist in memory at once.
+    The consumer loop only fetches as many records as there are free slots.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.count = 0
+        self._freed = asyncio.Event()
+
+    @property
+    def free(self) -> int:
+        return self.size - self.count
+
+    def acquire(self) -> None:
+        self.count += 1
+
+    def release(self) -> None:
+        self.count -= 1
+        self._freed.set()
+
+    async def wait_for_slot(self) -> None:
+        while self.free <= 0:
+            self._freed.clear()
+            await self._freed.wait()
+
+
 # ---------- Worker ----------
 
-async def handle_task(consumer, producer, msg):
-    async with semaphore:
+async def publish_and_resolve(producer, event_id, payload: dict) -> None:
+    await producer.send_and_wait(
+        OUTPUT_TOPIC,
+        canonical_bytes(payload),
+    )
+    # Update DB status → resolved
+
+    session_factory = get_session_factory()
+    session = session_factory()
+    try:
+        await mark_error_resolved(session, event_id)
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def handle_task(producer, msg) -> None:
+    """Run the orchestrator for one message. Raises if it could not be fully handled."""
+    task = json.loads(msg.value.decode("utf-8"))
+
+    # Same error already fixed and approved: link the existing Jira/PR, skip the LLM pipeline
+    match = fix_store.lookup(task)
+    if match is not None:
+        event_id = task.get("referenceId")
+        logger.info(f"♻ Reusing fix {match.fix.fix_id} ({match.fix.jira_key}) for event_id={event_id} "
+                    f"[{match.method}, score={match.score}]")
+        await publish_and_resolve(producer, event_id, reuse_result(event_id, match))
+        await fix_store.record_reuse(match)
+        return
+
+    # Waits until the scheduler picks this event (priority, then fair share per source).
+    async with scheduler.slot(scheduler.ticket_for(task)):
+        event_id = task.get("referenceId")
+
+        logger.info(f"🧠 Running orchestrator for event_id={event_id}")
+
+        problem = build_problem(task)
+
+        # The graph runs natively on the loop; blocking tools use their own pool
+        recorder = RunRecorder()
+        raw_result = await arun_orchestrator(problem, event_id, config={"callbacks": [recorder]}, event=task)
+
+        # Compact result on the topic; transcript, context and patches go to the artifact store
+        payload = await run_blocking(build_result, event_id, raw_result, recorder, artifact_store)
+
+        # Publish result
+        await publish_and_resolve(producer, event_id, payload)
+        await fix_store.remember(task, payload)
+
+        # Published and recorded: the durable checkpoints are no longer needed
+        await discard_checkpoints(event_id)
+
+       # logger.info(f"📤 Published result for {event_id}")
+
+
+def event_id_of(msg):
+    try:
+        return json.loads(msg.value.decode("utf-8")).get("referenceId")
+    except (ValueError, AttributeError):
+        return None
+
+
+async def set_event_status(msg, status: str) -> None:
+    """Best-effort status update so failed events don't sit in 'processing'."""
+    try:
+        event_id = event_id_of(msg)
+        if not event_id:
+            return
+        async with get_session_factory()() as session:
+            await update_error_status(session, event_id, status)
+    except Exception as e:
+        logger.warning(f"⚠ Could not set event status to {status}: {e}")
+
+
+async def process_message(producer, msg, tracker: OffsetTracker) -> None:
+    tp = TopicPartition(msg.topic, msg.partition)
+    try:
+        await handle_task(producer, msg)
+        retry_policy.record_outcome(msg, ok=True)
+    except Exception as e:
+        logger.exception(f"❌ Orchestrator task failed: {e}")
+        retry_policy.record_outcome(msg, ok=False)
         try:
-            task = json.loads(msg.value.decode("utf-8"))
-            event_id = task.get("referenceId")
+            destination = await retry_policy.route_failure(producer, msg, e)
+        except Exception as publish_error:
+            # Keep the offset pending: the watermark stays below it, so it is
+            # redelivered after a restart or rebalance instead of being skipped.
+            logger.error(f"⏸ Could not hand off failed message ({publish_error}); holding commit for "
+                         f"{tp.topic}[{tp.partition}] at offset {msg.offset}")
+            return
+        if destination == retry_policy.dlq_topic:
+            await set_event_status(msg, "dead_lettered")
+            # A DLQ replay starts over, so keep nothing around for it.
+            await discard_checkpoints(event_id_of(msg))
+        else:
+            # Checkpoints are kept so the retry resumes where this attempt stopped.
+            await set_event_status(msg, "retrying")
+
+    tracker.complete(tp, msg.offset)
+
+
+# ---------- Offset Commits ----------
+
+async def commit_offsets(consumer, tracker: OffsetTracker, partitions=None) -> None:
+    offsets = tracker.committable(partitions)
+    if not offsets:
+        return
+    try:
+        await consumer.commit(offsets=offsets)
+        tracker.mark_committed(offsets)
+    except Exception as e:
+        logger.warning(f"⚠ Offset commit failed, will retry: {e}")
 
-            logger.info(f"🧠 Running orchestrator for event_id={event_id}")
 
-            problem = build_problem(task)
+async def commit_loop(consumer, tracker: OffsetTracker) -> None:
+    """One commit RPC per interval instead of one per message."""
+    while True:
+        await asyncio.sleep(COMMIT_INTERVAL_MS / 1000)
+        await commit_offsets(consumer, tracker)
 
-            # run blocking AI outside event loop
-            raw_result = await asyncio.to_thread(run_orchestrator, problem)
-            result = serialize_result(raw_result)
 
-            payload = {
-                "event_id": event_id,
-                "result": result,
-            }
-            # Publish result
-            await producer.send_and_wait(
-                OUTPUT_TOPIC,
-                json.dumps(payload).encode("utf-8"),
-            )
-            # Update DB status → resolved
+class DrainOnRevoke(ConsumerRebalanceListener):
+    """
+    Before giving partitions away, wait (bounded) for their in-flight messages,
+    commit what finished, and abandon the rest so the new owner redelivers them.
+    """
+
+    def __init__(self, consumer, tracker: OffsetTracker, tasks_by_partition: dict, deferred: dict):
+        self.consumer = consumer
+        self.tracker = tracker
+        self.tasks_by_partition = tasks_by_partition
+        self.deferred = deferred
+
+    async def on_partitions_revoked(self, revoked):
+        in_flight = [t for tp in revoked for t in self.tasks_by_partition.get(tp, ())]
+        if in_flight:
+            logger.info(f"🔁 Draining {len(in_flight)} in-flight messages from revoked partitions")
+            _, not_done = await asyncio.wait(in_flight, timeout=REVOKE_DRAIN_TIMEOUT_S)
+            if not_done:
+                logger.warning(f"⚠ Abandoning {len(not_done)} unfinished messages; the new owner will redeliver them")
+                for t in not_done:
+                    t.cancel()
+
+        await commit_offsets(self.consumer, self.tracker, revoked)
+        self.tracker.forget(revoked)
+        for tp in revoked:
+            self.tasks_by_partition.pop(tp, None)
+            self.deferred.pop(tp, None)
+
+    async def on_partitions_assigned(self, assigned):
+        logger.info(f"📥 Assigned partitions: {sorted((tp.topic, tp.partition) for tp in assigned)}")
+
 
-            session_factory = get_session_factory()
-            session = session_factory()
-            try:
-                await mark_error_resolved(session, event_id)
-                await session.commit()
-            except Exception as e:
-                await session.rollback()
-                raise
-            finally:
-                await session.close()
+# ---------- Retry Delays ----------
 
-            # ✅ commit ONLY this message offset
-            tp = TopicPartition(msg.topic, msg.partition)
-            offsets = {tp: OffsetAndMetadata(msg.offset + 1, "")}
-            await consumer.commit(offsets=offsets)
+def defer_partition(consumer, deferred: dict, tp: TopicPartition, offset: int, delay_s: float) -> None:
+    """Rewind to a not-yet-due retry message and park its partition until it is due."""
+    consumer.seek(tp, offset)
+    consumer.pause(tp)
+    deferred[tp] = asyncio.get_running_loop().time() + delay_s
 
-           # logger.info(f"📤 Published result for {event_id}")
 
-        except Exception as e:
-            logger.exception(f"❌ Orchestrator task failed: {e}")
+def resume_partitions(consumer, deferred: dict) -> None:
+    """Resume paused partitions, except retry partitions whose head is not due yet."""
+    now = asyncio.get_running_loop().time()
+    for tp, due in list(deferred.items()):
+        if due <= now:
+            del deferred[tp]
+    consumer.resume(*(tp for tp in consumer.paused() if tp not in deferred))
 
 
 # ---------- Consumer Loop ----------
 
+async def wait_for_slot_or_shutdown(window: InFlightWindow) -> None:
+    slot = asyncio.ensure_future(window.wait_for_slot())
+    stop = asyncio.ensure_future(shutdown_event.wait())
+    try:
+        await asyncio.wait({slot, stop}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        slot.cancel()
+        stop.cancel()
+
+
 async def consume_loop():
     consumer = AIOKafkaConsumer(
-        INPUT_TOPIC,
         bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS.split(","),
         group_id=GROUP_ID,
         enable_auto_commit=False,
@@ -133,21 +308,68 @@ async def consume_loop():
         bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS.split(",")
     )
 
+    tracker = OffsetTracker()
+    tasks: set[asyncio.Task] = set()
+    tasks_by_partition: dict[TopicPartition, set[asyncio.Task]] = {}
+    window = InFlightWindow(MAX_IN_FLIGHT)
+    deferred: dict[TopicPartition, float] = {}
+
+    consumer.subscribe(
+        [INPUT_TOPIC, *retry_policy.retry_topics],
+        listener=DrainOnRevoke(consumer, tracker, tasks_by_partition, deferred),
+    )
+
     await consumer.start()
     await producer.start()
 
-    logger.info(f"🚀 Orchestrator worker started — listening on '{INPUT_TOPIC}'")
+    logger.info(
+        f"🚀 Orchestrator worker started — listening on '{INPUT_TOPIC}' "
+        f"(concurrency={MAX_CONCURRENCY}, in-flight window={MAX_IN_FLIGHT})"
+    )
 
-    tasks: set[asyncio.Task] = set()
+    committer = asyncio.create_task(commit_loop(consumer, tracker))
+
+    def track(tp: TopicPartition, task: asyncio.Task) -> None:
+        tasks.add(task)
+        tasks_by_partition.setdefault(tp, set()).add(task)
+
+        def on_task_done(t: asyncio.Task) -> None:
+            tasks.discard(t)
+            tasks_by_partition.get(tp, set()).discard(t)
+            window.release()
+
+        task.add_done_callback(on_task_done)
 
     try:
-        async for msg in consumer:
-            if shutdown_event.is_set():
-                break
+        while not shutdown_event.is_set():
+            if window.free <= 0:
+                # Stop the fetcher from buffering more records while we are full.
+                consumer.pause(*consumer.assignment())
+                await wait_for_slot_or_shutdown(window)
+                if shutdown_event.is_set():
+                    break
+
+            resume_partitions(consumer, deferred)
+
+            batches = await consumer.getmany(
+                timeout_ms=FETCH_TIMEOUT_MS,
+                max_records=min(FETCH_BATCH_SIZE, window.free),
+            )
 
-            task = asyncio.create_task(handle_task(consumer, producer, msg))
-            tasks.add(task)
-            task.add_done_callback(tasks.discard)
+            for tp, messages in batches.items():
+                if shutdown_event.is_set():
+                    # Not started, so not tracked: the committed watermark stays below them.
+                    break
+                for msg in messages:
+                    delay = delay_remaining_s(msg)
+                    if delay > 0:
+                        # The rest of this batch is refetched once the partition resumes.
+                        defer_partition(consumer, deferred, tp, msg.offset, delay)
+                        break
+
+                    window.acquire()
+                    tracker.start(tp, msg.offset)
+                    track(tp, asyncio.create_task(process_message(producer, msg, tracker)))
 
     except asyncio.CancelledError:
         pass
@@ -156,11 +378,19 @@ async def consume_loop():
         shutdown_event.set()
         logger.info("🛑 Shutting down orchestrator worker...")
 
+        # Events still waiting for an orchestrator slot are abandoned (their
+        # offsets stay uncommitted and are redelivered); only running ones are awaited.
+        abandoned = scheduler.close()
         if tasks:
+            logger.info(f"⏳ Waiting for {len(tasks) - abandoned} running events; {abandoned} queued ones abandoned")
             await asyncio.gather(*tasks, return_exceptions=True)
 
+        committer.cancel()
+        await commit_offsets(consumer, tracker)
+
         await consumer.stop()
         await producer.stop()
+        flush_traces()
 
         logger.info("👋 Worker stopped cleanly")
 
@@ -168,13 +398,54 @@ async def consume_loop():
 
 # ---------- Entry Point ----------
 
+# Refreshers and syncers that run for the life of the worker. The loop only
+# keeps weak references to tasks, so they're held here until shutdown.
+background_tasks: set[asyncio.Task] = set()
+
+
+def spawn_background(coro, name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    background_tasks.add(task)
+
+    def on_done(t: asyncio.Task) -> None:
+        background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error(f"❌ Background task '{name}' failed: {t.exception()!r}")
+
+    task.add_done_callback(on_done)
+    return task
+
+
 async def main():
     """Main entry point for the worker."""
     await init_engine()  # Initialize engine
     await create_schema()  # Ensure schema exists
     await create_tables()  # Create tables if they don't exist
     await validate_connection()  # Validate DB connection
-    await consume_loop()
+    await open_checkpointer()  # Durable graph state, so redelivered events resume
+    await fix_store.load()  # Approved fixes that later equivalent errors can reuse
+    spawn_background(fix_store.run_refresher(), "fix-store-refresher")
+    if apex_cache is not None:
+        spawn_background(apex_cache.run_syncer(), "apex-cache-syncer")  # Local ApexClass copy, synced incrementally
+    spawn_background(run_blocking(prefetch_describes), "prefetch-describes")  # Common sObject describes into the context cache
+    await asyncio.to_thread(warm_orchestrator)  # Compile agent graphs once, before consuming
+
+    # Under agents.supervisor, metrics are aggregated and served by the parent.
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        start_http_server(METRICS_PORT)
+
+    # SIGTERM (deploys, supervisor) stops fetching and drains in-flight work.
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, shutdown_event.set)
+
+    try:
+        await consume_loop()
+    finally:
+        for task in list(background_tasks):
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await close_checkpointer()
 
 
 if __name__ == "__main__":